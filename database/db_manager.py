@@ -1,9 +1,25 @@
 import sqlite3
+import hashlib
+import json
 from datetime import datetime
 
+from database.delta import compress_text, decompress_text, make_delta, make_segment_delta, apply_delta
+
 class DBManager:
+    # 每隔多少个版本保存一次完整快照，限制还原时需要应用的差异数量
+    FULL_SNAPSHOT_INTERVAL = 20
+    # 间隔重复调度状态（user_progress 表）
+    REVIEW_COLUMNS = (
+        ('ease_factor', 'REAL NOT NULL DEFAULT 2.5'),
+        ('interval_days', 'REAL NOT NULL DEFAULT 0'),
+        ('repetitions', 'INTEGER NOT NULL DEFAULT 0'),
+        ('due_at', "TEXT NOT NULL DEFAULT ''"),
+    )
+    
     def __init__(self, db_path='file_system.db'):
+        self.db_path = db_path
         self.conn = sqlite3.connect(db_path)
+        self._content_listeners = []
         self.create_tables()
     
     def create_tables(self):
@@ -20,36 +36,191 @@ class DBManager:
             upload_date TEXT,
             last_modified TEXT,
             content TEXT,
-            metadata TEXT
+            metadata TEXT,
+            content_hash TEXT
+        )
+        ''')
+        
+        # 旧数据库没有 content_hash 列
+        cursor.execute('PRAGMA table_info(files)')
+        if 'content_hash' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE files ADD COLUMN content_hash TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_content_hash ON files (content_hash)')
+        
+        # Create segments table (edited content stored paragraph by paragraph)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS segments (
+            file_id TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            PRIMARY KEY (file_id, ordinal)
+        )
+        ''')
+        
+        # Create revisions table (full snapshots plus deltas against the previous revision)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS revisions (
+            file_id TEXT NOT NULL,
+            revision INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            data BLOB NOT NULL,
+            content_size INTEGER,
+            metadata TEXT,
+            created_at TEXT,
+            PRIMARY KEY (file_id, revision)
+        )
+        ''')
+        
+        # Create artifacts table (analysis results tied to the content they were computed from)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS artifacts (
+            file_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            model TEXT NOT NULL,
+            params TEXT NOT NULL DEFAULT '',
+            content_digest TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created_at TEXT,
+            PRIMARY KEY (file_id, kind, model, params)
+        )
+        ''')
+        
+        # Learning tables: words, users and per-user progress on each word
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS words (
+            id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL UNIQUE,
+            translation TEXT,
+            difficulty_level INTEGER NOT NULL,
+            examples TEXT
         )
         ''')
+        # 按难度取词时按 id 顺序走索引，不需要排序
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_words_difficulty ON words (difficulty_level, id)')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL UNIQUE,
+            email TEXT,
+            level INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_progress (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            word_id INTEGER NOT NULL REFERENCES words (id),
+            status TEXT NOT NULL DEFAULT 'new',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            correct_attempts INTEGER NOT NULL DEFAULT 0,
+            last_reviewed TEXT,
+            ease_factor REAL NOT NULL DEFAULT 2.5,
+            interval_days REAL NOT NULL DEFAULT 0,
+            repetitions INTEGER NOT NULL DEFAULT 0,
+            due_at TEXT NOT NULL DEFAULT '',
+            UNIQUE (user_id, word_id)
+        )
+        ''')
+        
+        # 旧数据库的进度表没有复习调度列；due_at 为空串表示立即到期
+        cursor.execute('PRAGMA table_info(user_progress)')
+        progress_columns = [row[1] for row in cursor.fetchall()]
+        for column, definition in self.REVIEW_COLUMNS:
+            if column not in progress_columns:
+                cursor.execute(f'ALTER TABLE user_progress ADD COLUMN {column} {definition}')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_progress_status ON user_progress (user_id, status)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_progress_due ON user_progress (user_id, due_at, word_id)')
         
         self.conn.commit()
     
-    def insert_file(self, file_id, original_name, stored_path, file_type, file_size, content, metadata):
-        """Insert a new file record into the database."""
+    def add_content_listener(self, listener):
+        """Register a callable(file_id) invoked after a file's content is inserted or changed."""
+        self._content_listeners.append(listener)
+    
+    def _notify_content_changed(self, file_id):
+        for listener in self._content_listeners:
+            try:
+                listener(file_id)
+            except Exception as e:
+                # 索引等附加处理失败不应影响保存本身
+                print(f"Error in content listener for {file_id}: {e}")
+    
+    @staticmethod
+    def segment_hash(text):
+        """Hash used to detect whether a segment has changed."""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+    
+    def insert_file(self, file_id, original_name, stored_path, file_type, file_size, content, metadata,
+                    content_hash=None):
+        """Insert a new file record into the database.
+        
+        `content_hash` is the SHA-256 of the stored file's bytes.
+        """
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         cursor = self.conn.cursor()
         cursor.execute('''
-        INSERT INTO files (id, original_name, stored_path, file_type, file_size, upload_date, last_modified, content, metadata)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (file_id, original_name, stored_path, file_type, file_size, current_time, current_time, content, metadata))
+        INSERT INTO files (id, original_name, stored_path, file_type, file_size, upload_date, last_modified, content, metadata, content_hash)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (file_id, original_name, stored_path, file_type, file_size, current_time, current_time, content, metadata,
+              content_hash))
         
         self.conn.commit()
+        self._notify_content_changed(file_id)
     
-    def update_file(self, file_id, content, metadata):
-        """Update content and metadata for existing file."""
+    def update_file(self, file_id, content, metadata, record_revision=True):
+        """Update content and metadata for existing file.
+        
+        `record_revision=False` is used when the content is re-derived from the
+        stored file (e.g. text extraction) rather than edited by the user.
+        """
         last_modified = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
+        with self.conn:
+            cursor = self.conn.cursor()
+            old_content, old_metadata = self._current_state(cursor, file_id)
+            
+            cursor.execute('''
+            UPDATE files
+            SET content = ?, metadata = ?, last_modified = ?
+            WHERE id = ?
+            ''', (content, metadata, last_modified, file_id))
+            
+            # 整体覆盖内容后，content 列重新成为唯一来源
+            cursor.execute('DELETE FROM segments WHERE file_id = ?', (file_id,))
+            
+            if record_revision:
+                self._record_revision(cursor, file_id, old_content, old_metadata, content, metadata, last_modified)
+        
+        self._notify_content_changed(file_id)
+    
+    def delete_file(self, file_id):
+        """Delete a file record with its segments, revisions and artifacts; returns its stored path."""
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT stored_path FROM files WHERE id = ?', (file_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            for table in ('segments', 'revisions', 'artifacts'):
+                cursor.execute(f'DELETE FROM {table} WHERE file_id = ?', (file_id,))
+            cursor.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        return row[0]
+    
+    def find_files_by_hash(self, content_hash):
+        """Files whose stored bytes have the given SHA-256 hash, as (id, original_name, upload_date)."""
         cursor = self.conn.cursor()
         cursor.execute('''
-        UPDATE files
-        SET content = ?, metadata = ?, last_modified = ?
-        WHERE id = ?
-        ''', (content, metadata, last_modified, file_id))
+        SELECT id, original_name, upload_date
+        FROM files
+        WHERE content_hash = ?
+        ''', (content_hash,))
         
-        self.conn.commit()
+        return cursor.fetchall()
     
     def get_all_files(self):
         """Get information about all files."""
@@ -62,16 +233,22 @@ class DBManager:
         return cursor.fetchall()
     
     def search_files(self, name_search, type_search):
-        """Search files by name and type."""
+        """Search files by name and type (substring match, wildcards are literal)."""
         cursor = self.conn.cursor()
         cursor.execute('''
         SELECT id, original_name, file_type, file_size, upload_date, last_modified
         FROM files
-        WHERE original_name LIKE ? AND file_type LIKE ?
-        ''', (f"%{name_search}%", f"%{type_search}%"))
+        WHERE original_name LIKE ? ESCAPE '\\' AND file_type LIKE ? ESCAPE '\\'
+        ORDER BY upload_date DESC
+        ''', (f"%{self._escape_like(name_search)}%", f"%{self._escape_like(type_search)}%"))
         
         return cursor.fetchall()
     
+    @staticmethod
+    def _escape_like(text):
+        """Escape LIKE wildcards so user input is matched literally."""
+        return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    
     def get_file_content(self, file_id):
         """Get file content."""
         cursor = self.conn.cursor()
@@ -82,7 +259,7 @@ class DBManager:
         ''', (file_id,))
         
         result = cursor.fetchone()
-        return result[0] if result else None
+        return self._resolve_content(file_id, result[0]) if result else None
     
     def get_file_for_edit(self, file_id):
         """Get file information for editing."""
@@ -93,10 +270,17 @@ class DBManager:
         WHERE id = ?
         ''', (file_id,))
         
-        return cursor.fetchone()
+        result = cursor.fetchone()
+        if result:
+            original_name, content, metadata = result
+            return original_name, self._resolve_content(file_id, content), metadata
+        return None
     
-    def get_file_for_query(self, file_id):
-        """Get complete file information for querying and future LLM interaction."""
+    def get_file_for_query(self, file_id, with_content=True):
+        """Get complete file information for querying and future LLM interaction.
+        
+        With `with_content=False` the (possibly large) content is not assembled.
+        """
         cursor = self.conn.cursor()
         cursor.execute('''
         SELECT id, original_name, stored_path, file_type, file_size, upload_date, last_modified, content, metadata
@@ -115,13 +299,493 @@ class DBManager:
                 "file_size": result[4],
                 "upload_date": result[5],
                 "last_modified": result[6],
-                "content": result[7],
+                "content": self._resolve_content(file_id, result[7]) if with_content else None,
                 "metadata": result[8]
             }
             return file_info
         else:
             return None
     
+    def _resolve_content(self, file_id, content):
+        """Return the current content: stored segments take precedence over the content column."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT text
+        FROM segments
+        WHERE file_id = ?
+        ORDER BY ordinal
+        ''', (file_id,))
+        
+        segments = [row[0] for row in cursor]
+        return "\n\n".join(segments) if segments else content
+    
+    def get_segment_count(self, file_id):
+        """Get the number of stored segments for a file (0 if never segmented)."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM segments WHERE file_id = ?', (file_id,))
+        return cursor.fetchone()[0]
+    
+    def get_segment(self, file_id, ordinal):
+        """Get a single segment as (text, hash)."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT text, hash
+        FROM segments
+        WHERE file_id = ? AND ordinal = ?
+        ''', (file_id, ordinal))
+        
+        return cursor.fetchone()
+    
+    def store_segments(self, file_id, segments, metadata=None):
+        """Replace all segments of a file in one transaction.
+        
+        `segments` may be any iterable of strings; it is read into a list
+        before the transaction starts.
+        """
+        last_modified = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        segments = list(segments)
+        
+        with self.conn:
+            cursor = self.conn.cursor()
+            old_content, old_metadata = self._current_state(cursor, file_id)
+            
+            cursor.execute('DELETE FROM segments WHERE file_id = ?', (file_id,))
+            cursor.executemany('''
+            INSERT INTO segments (file_id, ordinal, text, hash)
+            VALUES (?, ?, ?, ?)
+            ''', ((file_id, ordinal, text, self.segment_hash(text))
+                  for ordinal, text in enumerate(segments)))
+            self._touch_file(cursor, file_id, metadata, last_modified)
+            
+            new_metadata = old_metadata if metadata is None else metadata
+            self._record_revision(cursor, file_id, old_content, old_metadata,
+                                  "\n\n".join(segments), new_metadata, last_modified)
+        
+        self._notify_content_changed(file_id)
+    
+    def save_segments(self, file_id, changes, metadata=None):
+        """Write only the changed segments ({ordinal: text}) in one transaction.
+        
+        The revision is built from the changed segments and the lengths of
+        the others, so a small edit neither rebuilds nor diffs the whole
+        document unless a full snapshot is due.
+        """
+        last_modified = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        with self.conn:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT metadata FROM files WHERE id = ?', (file_id,))
+            row = cursor.fetchone()
+            cursor.execute('''
+            SELECT LENGTH(text)
+            FROM segments
+            WHERE file_id = ?
+            ORDER BY ordinal
+            ''', (file_id,))
+            lengths = [length for length, in cursor.fetchall()]
+            changes = {ordinal: text for ordinal, text in changes.items() if 0 <= ordinal < len(lengths)}
+            cursor.execute(f'''
+            SELECT ordinal, text
+            FROM segments
+            WHERE file_id = ? AND ordinal IN ({",".join("?" * len(changes))})
+            ''', [file_id, *changes])
+            old_texts = dict(cursor.fetchall())
+            
+            old_metadata = row[0] if row else None
+            new_metadata = old_metadata if metadata is None else metadata
+            delta = make_segment_delta(lengths, changes)
+            cursor.execute('SELECT MAX(revision) FROM revisions WHERE file_id = ?', (file_id,))
+            latest = cursor.fetchone()[0]
+            snapshot_due = latest is None or not (latest + 1) % self.FULL_SNAPSHOT_INTERVAL or not lengths
+            old_content = self._current_state(cursor, file_id)[0] if snapshot_due else None
+            
+            cursor.executemany('''
+            UPDATE segments
+            SET text = ?, hash = ?
+            WHERE file_id = ? AND ordinal = ?
+            ''', ((text, self.segment_hash(text), file_id, ordinal)
+                  for ordinal, text in changes.items()))
+            self._touch_file(cursor, file_id, metadata, last_modified)
+            
+            if snapshot_due:
+                # 需要版本 0 或完整快照：旧文本只重建一次，新文本由增量还原
+                new_content = apply_delta(old_content, delta) if old_content is not None and lengths else old_content
+                self._record_revision(cursor, file_id, old_content, old_metadata,
+                                      new_content, new_metadata, last_modified)
+            elif row and (new_metadata != old_metadata
+                          or any(old_texts[ordinal] != text for ordinal, text in changes.items())):
+                new_lengths = [len(changes[ordinal]) if ordinal in changes else length
+                               for ordinal, length in enumerate(lengths)]
+                cursor.execute('''
+                INSERT INTO revisions (file_id, revision, kind, data, content_size, metadata, created_at)
+                VALUES (?, ?, 'delta', ?, ?, ?, ?)
+                ''', (file_id, latest + 1, delta, sum(new_lengths) + 2 * (len(new_lengths) - 1),
+                      new_metadata, last_modified))
+        
+        if changes:
+            self._notify_content_changed(file_id)
+    
+    def _touch_file(self, cursor, file_id, metadata, last_modified):
+        """Update last_modified (and metadata if given) for a file."""
+        if metadata is None:
+            cursor.execute('UPDATE files SET last_modified = ? WHERE id = ?', (last_modified, file_id))
+        else:
+            cursor.execute('''
+            UPDATE files
+            SET metadata = ?, last_modified = ?
+            WHERE id = ?
+            ''', (metadata, last_modified, file_id))
+    
+    def _current_state(self, cursor, file_id):
+        """Get (content, metadata) as currently visible, inside an open transaction."""
+        cursor.execute('SELECT content, metadata FROM files WHERE id = ?', (file_id,))
+        result = cursor.fetchone()
+        if not result:
+            return None, None
+        return self._resolve_content(file_id, result[0]), result[1]
+    
+    def _record_revision(self, cursor, file_id, old_content, old_metadata, new_content, new_metadata, created_at):
+        """Append a revision for new content, as a delta unless a full snapshot is due."""
+        if old_content is None:
+            return
+        old_content = old_content or ""
+        new_content = new_content or ""
+        
+        cursor.execute('SELECT MAX(revision) FROM revisions WHERE file_id = ?', (file_id,))
+        latest = cursor.fetchone()[0]
+        if latest is None:
+            # 第一次修改：先把原始内容保存为版本 0
+            cursor.execute('''
+            INSERT INTO revisions (file_id, revision, kind, data, content_size, metadata, created_at)
+            VALUES (?, 0, 'full', ?, ?, ?, ?)
+            ''', (file_id, compress_text(old_content), len(old_content), old_metadata, created_at))
+            latest = 0
+        if old_content == new_content and old_metadata == new_metadata:
+            return
+        
+        revision = latest + 1
+        full = compress_text(new_content)
+        kind, data = 'full', full
+        if revision % self.FULL_SNAPSHOT_INTERVAL:
+            delta = make_delta(old_content, new_content)
+            if len(delta) < len(full):
+                kind, data = 'delta', delta
+        
+        cursor.execute('''
+        INSERT INTO revisions (file_id, revision, kind, data, content_size, metadata, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (file_id, revision, kind, data, len(new_content), new_metadata, created_at))
+    
+    def list_revisions(self, file_id):
+        """List revisions of a file, newest first."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT revision, kind, content_size, length(data), created_at
+        FROM revisions
+        WHERE file_id = ?
+        ORDER BY revision DESC
+        ''', (file_id,))
+        
+        return cursor.fetchall()
+    
+    def get_revision(self, file_id, revision):
+        """Reconstruct (content, metadata) of a revision from the nearest full snapshot."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT MAX(revision)
+        FROM revisions
+        WHERE file_id = ? AND revision <= ? AND kind = 'full'
+        ''', (file_id, revision))
+        
+        base = cursor.fetchone()[0]
+        if base is None:
+            return None
+        
+        cursor.execute('''
+        SELECT revision, kind, data, metadata
+        FROM revisions
+        WHERE file_id = ? AND revision BETWEEN ? AND ?
+        ORDER BY revision
+        ''', (file_id, base, revision))
+        
+        content = metadata = None
+        for _, kind, data, metadata in cursor.fetchall():
+            content = decompress_text(data) if kind == 'full' else apply_delta(content, data)
+        return content, metadata
+    
+    def revert_to_revision(self, file_id, revision):
+        """Restore an earlier revision; the revert itself is recorded as a new revision."""
+        result = self.get_revision(file_id, revision)
+        if result is None:
+            return False
+        content, metadata = result
+        self.update_file(file_id, content, metadata)
+        return True
+    
+    def content_digest(self, file_id):
+        """Digest of a file's current content, used to validate stored artifacts."""
+        content = self.get_file_content(file_id)
+        return self.segment_hash(content) if content is not None else None
+    
+    def save_artifact(self, file_id, kind, model, result, params='', content_digest=None):
+        """Store an analysis result (summary, difficulty, quiz, grammar...) for a file.
+        
+        `content_digest` should be the digest of the content the result was
+        computed from; it defaults to the current content.
+        """
+        if content_digest is None:
+            content_digest = self.content_digest(file_id)
+            if content_digest is None:
+                return
+        
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        INSERT OR REPLACE INTO artifacts (file_id, kind, model, params, content_digest, result, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (file_id, kind, model, params or '', content_digest, result,
+              datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        self.conn.commit()
+    
+    def get_artifact(self, file_id, kind, model, params='', content_digest=None):
+        """Get a stored result if it was computed from the file's current content."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT content_digest, result FROM artifacts
+        WHERE file_id = ? AND kind = ? AND model = ? AND params = ?
+        ''', (file_id, kind, model, params or ''))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        current_digest = self.content_digest(file_id) if content_digest is None else None
+        if row[0] == (content_digest or current_digest):
+            return row[1]
+        if current_digest is None:
+            current_digest = self.content_digest(file_id)
+        
+        # 只清除不是基于文件当前内容的结果；调用方持有的摘要可能已经过时
+        cursor.execute('''
+        DELETE FROM artifacts WHERE file_id = ? AND content_digest != ?
+        ''', (file_id, current_digest or ''))
+        self.conn.commit()
+        return None
+    
+    WORD_COLUMNS = ('id', 'text', 'translation', 'difficulty_level', 'examples')
+    
+    @classmethod
+    def _word_dict(cls, row):
+        word = dict(zip(cls.WORD_COLUMNS, row))
+        word['examples'] = json.loads(word['examples']) if word['examples'] else []
+        return word
+    
+    def add_words(self, words):
+        """Insert or update words from an iterable of (text, translation, difficulty_level, examples).
+        
+        Existing words (matched by text) keep their id, so progress stays attached.
+        """
+        with self.conn:
+            self.conn.executemany('''
+            INSERT INTO words (text, translation, difficulty_level, examples)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (text) DO UPDATE SET
+                translation = excluded.translation,
+                difficulty_level = excluded.difficulty_level,
+                examples = excluded.examples
+            ''', ((text, translation, difficulty_level, json.dumps(list(examples or []), ensure_ascii=False))
+                  for text, translation, difficulty_level, examples in words))
+    
+    def add_word(self, text, translation, difficulty_level, examples=None):
+        """Insert or update a single word and return its id."""
+        self.add_words([(text, translation, difficulty_level, examples)])
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT id FROM words WHERE text = ?', (text,))
+        return cursor.fetchone()[0]
+    
+    def get_word(self, word_id):
+        """Get a word as a dict, or None."""
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT {", ".join(self.WORD_COLUMNS)} FROM words WHERE id = ?', (word_id,))
+        row = cursor.fetchone()
+        return self._word_dict(row) if row else None
+    
+    def get_words_by_difficulty(self, difficulty_level, exclude_user_id=None, limit=None):
+        """Get words of a difficulty level as dicts, in id order.
+        
+        With `exclude_user_id`, words the user already has progress on are
+        skipped by an anti-join on the (user_id, word_id) index, so only the
+        returned rows are read no matter how many words or users exist.
+        """
+        query = f'''
+        SELECT {", ".join("w." + column for column in self.WORD_COLUMNS)}
+        FROM words w
+        WHERE w.difficulty_level = ?
+        '''
+        params = [difficulty_level]
+        if exclude_user_id is not None:
+            query += '''
+        AND NOT EXISTS (
+            SELECT 1 FROM user_progress p WHERE p.user_id = ? AND p.word_id = w.id
+        )
+        '''
+            params.append(exclude_user_id)
+        query += ' ORDER BY w.id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return [self._word_dict(row) for row in cursor]
+    
+    def add_user(self, username, email=None, level=1):
+        """Create a user and return its id."""
+        with self.conn:
+            cursor = self.conn.execute('''
+            INSERT INTO users (username, email, level, created_at)
+            VALUES (?, ?, ?, ?)
+            ''', (username, email, level, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        return cursor.lastrowid
+    
+    def get_user(self, user_id):
+        """Get a user as a dict, or None."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT id, username, email, level, created_at
+        FROM users
+        WHERE id = ?
+        ''', (user_id,))
+        row = cursor.fetchone()
+        return dict(zip(('id', 'username', 'email', 'level', 'created_at'), row)) if row else None
+    
+    def update_user_level(self, user_id, level):
+        """Set a user's level; returns True if the user exists."""
+        with self.conn:
+            cursor = self.conn.execute('UPDATE users SET level = ? WHERE id = ?', (level, user_id))
+        return cursor.rowcount > 0
+    
+    def get_user_words(self, user_id, status=None, limit=None):
+        """Get the words a user has progress on, as word dicts with the progress fields added."""
+        query = f'''
+        SELECT {", ".join("w." + column for column in self.WORD_COLUMNS)},
+               p.status, p.attempts, p.correct_attempts, p.last_reviewed
+        FROM user_progress p
+        JOIN words w ON w.id = p.word_id
+        WHERE p.user_id = ?
+        '''
+        params = [user_id]
+        if status is not None:
+            query += ' AND p.status = ?'
+            params.append(status)
+        query += ' ORDER BY p.last_reviewed, p.id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        words = []
+        for row in cursor:
+            word = self._word_dict(row[:len(self.WORD_COLUMNS)])
+            word.update(zip(('status', 'attempts', 'correct_attempts', 'last_reviewed'), row[len(self.WORD_COLUMNS):]))
+            words.append(word)
+        return words
+    
+    def get_user_progress(self, user_id, word_id):
+        """Get a user's progress on a word as a dict, or None if never answered."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT id, user_id, word_id, status, attempts, correct_attempts, last_reviewed
+        FROM user_progress
+        WHERE user_id = ? AND word_id = ?
+        ''', (user_id, word_id))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return dict(zip(('id', 'user_id', 'word_id', 'status', 'attempts', 'correct_attempts', 'last_reviewed'), row))
+    
+    def update_user_progress(self, user_id, word_id, status, attempts, correct_attempts, last_reviewed=None):
+        """Insert or update a user's progress on a word; returns the number of rows written."""
+        last_reviewed = last_reviewed or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            cursor = self.conn.execute('''
+            INSERT INTO user_progress (user_id, word_id, status, attempts, correct_attempts, last_reviewed)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, word_id) DO UPDATE SET
+                status = excluded.status,
+                attempts = excluded.attempts,
+                correct_attempts = excluded.correct_attempts,
+                last_reviewed = excluded.last_reviewed
+            ''', (user_id, word_id, status, attempts, correct_attempts, last_reviewed))
+        return cursor.rowcount
+    
+    REVIEW_CARD_FIELDS = ('status', 'attempts', 'correct_attempts', 'last_reviewed',
+                          'ease_factor', 'interval_days', 'repetitions', 'due_at')
+    
+    def _review_cards(self, where, params, limit=None):
+        query = f'''
+        SELECT {", ".join("w." + column for column in self.WORD_COLUMNS)},
+               {", ".join("p." + field for field in self.REVIEW_CARD_FIELDS)}
+        FROM user_progress p
+        JOIN words w ON w.id = p.word_id
+        WHERE {where}
+        ORDER BY p.due_at, p.word_id
+        '''
+        if limit is not None:
+            query += ' LIMIT ?'
+            params = list(params) + [limit]
+        
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        cards = []
+        for row in cursor:
+            card = self._word_dict(row[:len(self.WORD_COLUMNS)])
+            card.update(zip(self.REVIEW_CARD_FIELDS, row[len(self.WORD_COLUMNS):]))
+            cards.append(card)
+        return cards
+    
+    def get_review_queue(self, user_id, limit, after=None):
+        """Next review cards for a user in due order, as word dicts with progress and schedule fields.
+        
+        `after` is the (due_at, word_id) of the last card already fetched;
+        paging on it walks the (user_id, due_at, word_id) index, so each page
+        costs the same however large the deck is.
+        """
+        if after is None:
+            return self._review_cards('p.user_id = ?', (user_id,), limit)
+        return self._review_cards('p.user_id = ? AND (p.due_at, p.word_id) > (?, ?)',
+                                  (user_id, after[0], after[1]), limit)
+    
+    def get_review_card(self, user_id, word_id):
+        """A single review card, or None if the user has no progress on the word."""
+        cards = self._review_cards('p.user_id = ? AND p.word_id = ?', (user_id, word_id))
+        return cards[0] if cards else None
+    
+    def save_review(self, user_id, word_id, status, attempts, correct_attempts, last_reviewed,
+                    ease_factor, interval_days, repetitions, due_at):
+        """Insert or update a user's progress together with its review schedule."""
+        with self.conn:
+            self.conn.execute('''
+            INSERT INTO user_progress (user_id, word_id, status, attempts, correct_attempts, last_reviewed,
+                                       ease_factor, interval_days, repetitions, due_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, word_id) DO UPDATE SET
+                status = excluded.status,
+                attempts = excluded.attempts,
+                correct_attempts = excluded.correct_attempts,
+                last_reviewed = excluded.last_reviewed,
+                ease_factor = excluded.ease_factor,
+                interval_days = excluded.interval_days,
+                repetitions = excluded.repetitions,
+                due_at = excluded.due_at
+            ''', (user_id, word_id, status, attempts, correct_attempts, last_reviewed,
+                  ease_factor, interval_days, repetitions, due_at))
+    
+    def count_user_words_by_status(self, user_id, status):
+        """Count a user's words in a status (served by the (user_id, status) index)."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM user_progress WHERE user_id = ? AND status = ?', (user_id, status))
+        return cursor.fetchone()[0]
+    
     def get_files_for_selection(self):
         """Get file information for selection dialog."""
         cursor = self.conn.cursor()
@@ -136,3 +800,7 @@ class DBManager:
         """Close the database connection."""
         if self.conn:
             self.conn.close()
+
+
+# 学习相关代码使用的名称
+DatabaseManager = DBManager
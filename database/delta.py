@@ -0,0 +1,79 @@
+import difflib
+import json
+import zlib
+
+
+def compress_text(text):
+    """Compress a full text snapshot."""
+    return zlib.compress(text.encode('utf-8'))
+
+
+def decompress_text(data):
+    """Restore a full text snapshot."""
+    return zlib.decompress(data).decode('utf-8')
+
+
+def make_delta(old_text, new_text):
+    """Encode new_text as a compact line-based delta against old_text.
+
+    The delta is a list of operations: ["c", start, end] copies lines
+    old[start:end], ["i", text] inserts literal text.  It is stored as
+    zlib-compressed JSON, so its size tracks the size of the edit rather
+    than the size of the document.
+    """
+    old_lines = old_text.splitlines(keepends=True)
+    new_lines = new_text.splitlines(keepends=True)
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(["c", i1, i2])
+        elif j2 > j1:
+            # replace / insert 都只需要新文本；delete 不产生操作
+            ops.append(["i", "".join(new_lines[j1:j2])])
+
+    return _encode(ops)
+
+
+def make_segment_delta(lengths, changes, separator_length=2):
+    """Encode a segment edit as a delta without reading the unchanged segments.
+
+    `lengths` are the character lengths of the old segments in order and
+    `changes` maps ordinals to their new text; the segments are joined by a
+    separator of `separator_length` characters.  Unchanged runs become
+    ["s", start, end] operations, which copy old[start:end] by character.
+    """
+    ops = []
+    position = offset = 0
+    for ordinal, length in enumerate(lengths):
+        if ordinal in changes:
+            if offset > position:
+                ops.append(["s", position, offset])
+            ops.append(["i", changes[ordinal]])
+            position = offset + length
+        offset += length + separator_length
+    end = max(offset - separator_length, 0)
+    if end > position:
+        ops.append(["s", position, end])
+    return _encode(ops)
+
+
+def _encode(ops):
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def apply_delta(old_text, delta):
+    """Rebuild the new text from old_text and a delta produced by make_delta or make_segment_delta."""
+    old_lines = old_text.splitlines(keepends=True)
+    ops = json.loads(zlib.decompress(delta).decode('utf-8'))
+
+    parts = []
+    for op in ops:
+        if op[0] == "c":
+            parts.extend(old_lines[op[1]:op[2]])
+        elif op[0] == "s":
+            parts.append(old_text[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
@@ -127,6 +127,11 @@ class FileManagementSystem:
         ttk.Entry(search_frame, textvariable=self.search_type_var, width=10).grid(row=0, column=3, sticky=tk.W, padx=5, pady=5)
         
         ttk.Button(search_frame, text="搜索", command=self.search_files).grid(row=0, column=4, padx=5, pady=5)
+        
+        # 输入即搜索（停顿后再查询，避免每个按键都访问数据库）
+        self.search_after_id = None
+        self.search_name_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_type_var.trace_add("write", lambda *args: self.schedule_search())
         ttk.Button(search_frame, text="显示全部", command=self.load_all_files).grid(row=0, column=5, padx=5, pady=5)
         
         # 文件列表区域
@@ -244,7 +249,13 @@ class FileManagementSystem:
         except Exception as e:
             messagebox.showerror("错误", f"上传文件时出错: {str(e)}")
     
+    def schedule_search(self):
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(250, self.search_files)
+    
     def search_files(self):
+        self.search_after_id = None
         name_search = f"%{self.search_name_var.get()}%"
         type_search = f"%{self.search_type_var.get()}%"
         
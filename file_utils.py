@@ -1,6 +1,8 @@
 import os
 import chardet
 import tkinter as tk
+from services.extraction_pool import ExtractionError, get_extraction_pool
+from services.thumbnails import IMAGE_EXTENSIONS, get_thumbnail_cache
 
 # 调试信息
 print("FileUtils模块已加载 - 替代版本（不使用textract）", flush=True)
@@ -8,18 +10,29 @@ print("FileUtils模块已加载 - 替代版本（不使用textract）", flush=Tr
 class FileUtils:
     """工具类，用于处理文件读取和预览"""
     
+    # 支持的文件类型
+    TEXT_EXTENSIONS = ['.txt', '.py', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.java', '.c', '.cpp']
+    OFFICE_EXTENSIONS = ['.doc', '.docx', '.wps', '.rtf']
+    PDF_EXTENSIONS = ['.pdf']
+    # 不可信的二进制格式，在受监管的子进程中解析
+    SUPERVISED_EXTENSIONS = ['.doc', '.docx', '.pdf']
+    # 本地解析失败时还可以交给 Word（win32com）读取的格式
+    WORD_EXTENSIONS = ['.doc', '.docx']
+    IMAGE_EXTENSIONS = IMAGE_EXTENSIONS
+    
     @staticmethod
-    def detect_encoding(file_path):
-        """检测文件编码"""
+    def detect_encoding(file_path, max_bytes=None):
+        """检测文件编码；指定 max_bytes 时只读取并检测文件开头"""
         with open(file_path, 'rb') as file:
-            raw_data = file.read()
+            raw_data = file.read(max_bytes) if max_bytes else file.read()
             result = chardet.detect(raw_data)
             return result['encoding'], raw_data
     
     @staticmethod
     def read_file_content(file_path, max_chars=None):
         """读取文件内容，支持自动检测编码"""
-        encoding, raw_data = FileUtils.detect_encoding(file_path)
+        # 截断预览只需读取开头（每个字符最多 4 个字节）
+        encoding, raw_data = FileUtils.detect_encoding(file_path, max_chars * 4 if max_chars else None)
         if not encoding:
             return "无法检测文件编码", None
             
@@ -38,106 +51,180 @@ class FileUtils:
         file_size = os.path.getsize(file_path)
         return file_type, file_size
     
+    @staticmethod
+    def extract_text(file_path):
+        """提取文件的纯文本内容（不依赖界面），返回 (内容, 提取方式)；无法提取时抛出异常"""
+        file_type = os.path.splitext(file_path)[1].lower()
+
+        if file_type in FileUtils.TEXT_EXTENSIONS:
+            content, encoding = FileUtils.read_file_content(file_path)
+            if encoding is None:
+                raise ValueError(content)
+            return content, f"文本 ({encoding})"
+
+        if file_type in FileUtils.SUPERVISED_EXTENSIONS:
+            try:
+                content, _, method = get_extraction_pool().extract(file_path)
+            except ExtractionError:
+                if file_type not in FileUtils.WORD_EXTENSIONS:
+                    raise
+                # 本地解析失败时，最后尝试让 Word 打开（仅 Windows）
+                try:
+                    return FileUtils.read_with_word(file_path), "Word文档 (win32com)"
+                except Exception:
+                    pass
+                raise
+            return content, method
+
+        raise ValueError(f"不支持提取该文件类型的文本: {file_type}")
+
+    @staticmethod
+    def read_with_word(file_path):
+        """用 Word（win32com，仅 Windows）读取文档全文；没有 pywin32 时抛出 ImportError"""
+        import re
+        import win32com.client
+        try:
+            import pythoncom
+            pythoncom.CoInitialize()  # 后台线程中使用 COM 需要先初始化
+        except ImportError:
+            pythoncom = None
+        
+        try:
+            word = win32com.client.Dispatch("Word.Application")
+            word.Visible = False
+            try:
+                doc = word.Documents.Open(os.path.abspath(file_path), ReadOnly=True)
+                try:
+                    content = doc.Content.Text
+                finally:
+                    doc.Close(False)
+            finally:
+                word.Quit()
+        finally:
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+        
+        # 清理文本（移除多余的换行符）
+        return re.sub(r'\r+', '\n', content)
+    
+    @staticmethod
+    def metadata_preview(file_path, reason=None):
+        """无法提取正文时的预览：只显示文件的基本信息"""
+        file_type, file_size = FileUtils.get_file_info(file_path)
+        text = f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n"
+        if reason:
+            text += f"无法提取正文: {reason}\n"
+        return text
+
+    @staticmethod
+    def preview_image(file_path, preview_widget):
+        """在文本控件中显示图片缩略图（磁盘缓存），原图只在点击“查看原图”时解码"""
+        from PIL import Image, ImageTk
+        
+        try:
+            # 只读取文件头获取尺寸，不解码像素
+            with Image.open(file_path) as image:
+                width, height, image_format = image.width, image.height, image.format
+            thumbnail = ImageTk.PhotoImage(file=get_thumbnail_cache().get_thumbnail(file_path))
+        except Exception as e:
+            preview_widget.insert(tk.END, FileUtils.metadata_preview(file_path, f"无法读取图片: {e}"))
+            return "不适用"
+        
+        # PhotoImage 需要保持引用，否则会被回收
+        preview_widget.thumbnail_image = thumbnail
+        preview_widget.image_create(tk.END, image=thumbnail)
+        preview_widget.insert(tk.END, f"\n{width} × {height} 像素\n")
+        
+        old_button = getattr(preview_widget, 'full_image_button', None)
+        if old_button is not None:
+            old_button.destroy()
+        preview_widget.full_image_button = tk.Button(
+            preview_widget,
+            text="查看原图",
+            command=lambda: FileUtils.show_full_image(file_path, preview_widget.winfo_toplevel())
+        )
+        preview_widget.window_create(tk.END, window=preview_widget.full_image_button)
+        return f"图片 ({image_format})"
+    
+    @staticmethod
+    def show_full_image(file_path, parent):
+        """在新窗口中以原始分辨率显示图片（可滚动）"""
+        from PIL import Image, ImageTk
+        
+        window = tk.Toplevel(parent)
+        window.title(os.path.basename(file_path))
+        window.geometry("1000x800")
+        
+        canvas = tk.Canvas(window)
+        x_scrollbar = tk.Scrollbar(window, orient=tk.HORIZONTAL, command=canvas.xview)
+        y_scrollbar = tk.Scrollbar(window, orient=tk.VERTICAL, command=canvas.yview)
+        canvas.configure(xscrollcommand=x_scrollbar.set, yscrollcommand=y_scrollbar.set)
+        x_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
+        y_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        with Image.open(file_path) as image:
+            photo = ImageTk.PhotoImage(image)
+        canvas.full_image = photo
+        canvas.create_image(0, 0, image=photo, anchor=tk.NW)
+        canvas.configure(scrollregion=(0, 0, photo.width(), photo.height()))
+    
     @staticmethod
     def preview_file(file_path, preview_widget, max_chars=5000):
         """预览文件内容并写入到指定的 tk.Text 控件"""
         file_type, file_size = FileUtils.get_file_info(file_path)
         preview_widget.delete(1.0, tk.END)
         
-        # 支持的文件类型
-        text_extensions = ['.txt', '.py', '.md', '.csv', '.json', '.xml', '.html', '.css', '.js', '.java', '.c', '.cpp']
-        office_extensions = ['.doc', '.docx', '.wps', '.rtf']
-        pdf_extensions = ['.pdf']
-        
-        if file_type in text_extensions:
+        if file_type in FileUtils.TEXT_EXTENSIONS:
             content, encoding = FileUtils.read_file_content(file_path, max_chars)
             preview_widget.insert(tk.END, content)
             return encoding or "未知"
         
-        elif file_type in office_extensions:
-            # 尝试先使用python-docx（支持.docx格式）
+        elif file_type in FileUtils.SUPERVISED_EXTENSIONS:
+            # 在受监管的子进程中解析（超时、内存限制），失败时只显示文件信息
             try:
-                import docx
-                doc = docx.Document(file_path)
-                content = '\n'.join([para.text for para in doc.paragraphs])
-                if max_chars and len(content) > max_chars:
-                    content = content[:max_chars] + "...(内容已截断)"
-                preview_widget.insert(tk.END, content)
-                return "Word文档 (docx)"
-            except Exception as docx_error:
-                # 尝试使用win32com（适用于Windows系统，支持多种Office文档格式）
-                try:
-                    import win32com.client
-                    import os
-                    import re
-                    
-                    # 创建Word应用程序实例
-                    word = win32com.client.Dispatch("Word.Application")
-                    word.Visible = False
-                    
-                    # 打开文档
-                    doc = word.Documents.Open(os.path.abspath(file_path))
-                    
-                    # 提取文本
-                    content = doc.Content.Text
-                    
-                    # 关闭文档和Word应用
-                    doc.Close(False)
-                    word.Quit()
-                    
-                    # 清理文本（移除多余的换行符）
-                    content = re.sub(r'\r+', '\r', content)
-                    
-                    if max_chars and len(content) > max_chars:
-                        content = content[:max_chars] + "...(内容已截断)"
-                    
-                    preview_widget.insert(tk.END, content)
-                    return "Word文档 (win32com)"
-                except ImportError:
-                    preview_widget.insert(tk.END, f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n")
-                    preview_widget.insert(tk.END, "需要安装pywin32库来预览此类文档内容。\n")
-                    preview_widget.insert(tk.END, "安装方法: pip install pywin32\n")
-                    preview_widget.insert(tk.END, f"\n原始错误: {str(docx_error)}")
+                content, truncated, method = get_extraction_pool().extract(file_path, max_chars)
+            except ExtractionError as e:
+                if file_type not in FileUtils.WORD_EXTENSIONS:
+                    preview_widget.insert(tk.END, FileUtils.metadata_preview(file_path, str(e)))
                     return "不适用"
+                # 本地解析失败的 Word 文档，最后尝试 win32com
+                try:
+                    content = FileUtils.read_with_word(file_path)
                 except Exception as win32_error:
-                    preview_widget.insert(tk.END, f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n")
-                    preview_widget.insert(tk.END, f"无法使用python-docx预览此文档: {str(docx_error)}\n\n")
-                    preview_widget.insert(tk.END, f"同样无法使用win32com预览: {str(win32_error)}")
+                    preview_widget.insert(tk.END, FileUtils.metadata_preview(file_path, str(e)))
+                    if not isinstance(win32_error, ImportError):
+                        preview_widget.insert(tk.END, f"同样无法使用win32com预览: {win32_error}\n")
                     return "不适用"
+                method = "Word文档 (win32com)"
+                truncated = bool(max_chars) and len(content) > max_chars
+                content = content[:max_chars] if truncated else content
+            
+            if truncated:
+                content += "...(内容已截断)"
+            preview_widget.insert(tk.END, content)
+            return method
+        
+        elif file_type in FileUtils.IMAGE_EXTENSIONS:
+            return FileUtils.preview_image(file_path, preview_widget)
         
-        elif file_type in pdf_extensions:
-            # 尝试使用PyPDF2
+        elif file_type in FileUtils.OFFICE_EXTENSIONS:
+            # 其他 Office 格式（.wps、.rtf）只能通过 win32com 读取（适用于Windows系统）
             try:
-                import PyPDF2
-                with open(file_path, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    content = ''
-                    for i in range(min(5, len(reader.pages))):
-                        content += reader.pages[i].extract_text() + '\n'
-                    if max_chars and len(content) > max_chars:
-                        content = content[:max_chars] + "...(内容已截断)"
-                    preview_widget.insert(tk.END, content)
-                    return "PDF文档 (PyPDF2)"
-            except Exception as pdf_error:
-                # 尝试使用pdfminer
-                try:
-                    from pdfminer.high_level import extract_text
-                    content = extract_text(file_path)
-                    if max_chars and len(content) > max_chars:
-                        content = content[:max_chars] + "...(内容已截断)"
-                    preview_widget.insert(tk.END, content)
-                    return "PDF文档 (pdfminer)"
-                except ImportError:
-                    preview_widget.insert(tk.END, f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n")
-                    preview_widget.insert(tk.END, "需要安装pdfminer.six库来预览此PDF文档内容。\n")
-                    preview_widget.insert(tk.END, "安装方法: pip install pdfminer.six\n")
-                    preview_widget.insert(tk.END, f"\n原始错误: {str(pdf_error)}")
-                    return "不适用"
-                except Exception as pdfminer_error:
-                    preview_widget.insert(tk.END, f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n")
-                    preview_widget.insert(tk.END, f"无法使用PyPDF2预览此PDF: {str(pdf_error)}\n\n")
-                    preview_widget.insert(tk.END, f"同样无法使用pdfminer预览: {str(pdfminer_error)}")
-                    return "不适用"
+                content = FileUtils.read_with_word(file_path)
+                if max_chars and len(content) > max_chars:
+                    content = content[:max_chars] + "...(内容已截断)"
+                
+                preview_widget.insert(tk.END, content)
+                return "Word文档 (win32com)"
+            except ImportError:
+                preview_widget.insert(tk.END, FileUtils.metadata_preview(file_path))
+                preview_widget.insert(tk.END, "需要安装pywin32库来预览此类文档内容。\n")
+                preview_widget.insert(tk.END, "安装方法: pip install pywin32\n")
+                return "不适用"
+            except Exception as win32_error:
+                preview_widget.insert(tk.END, FileUtils.metadata_preview(file_path, f"无法使用win32com预览: {win32_error}"))
+                return "不适用"
         
         else:
             preview_widget.insert(tk.END, f"文件类型: {file_type}\n文件大小: {file_size} 字节\n路径: {file_path}\n\n")
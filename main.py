@@ -31,6 +31,7 @@ def main():
     
     # Create main window
     app = MainWindow(root, db_manager, llm_processor)
+    root.protocol("WM_DELETE_WINDOW", app.on_closing)
     
     # Start main loop
     root.mainloop()
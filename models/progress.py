@@ -0,0 +1,27 @@
+class UserProgress:
+    """Model representing a learner's progress on one word."""
+    
+    STATUSES = ("new", "learning", "reviewing", "mastered")
+    
+    def __init__(self, id=None, user_id=None, word_id=None, status="new", attempts=0,
+                 correct_attempts=0, last_reviewed=None):
+        if status not in self.STATUSES:
+            raise ValueError(f"无效的学习状态: {status}")
+        self.id = id
+        self.user_id = user_id
+        self.word_id = word_id
+        self.status = status
+        self.attempts = attempts
+        self.correct_attempts = correct_attempts
+        self.last_reviewed = last_reviewed
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create a UserProgress from a row dict returned by DBManager."""
+        return cls(id=data.get("id"), user_id=data.get("user_id"), word_id=data.get("word_id"),
+                   status=data.get("status", "new"), attempts=data.get("attempts", 0),
+                   correct_attempts=data.get("correct_attempts", 0), last_reviewed=data.get("last_reviewed"))
+    
+    def correct_ratio(self):
+        """Fraction of attempts answered correctly (0 before the first attempt)."""
+        return self.correct_attempts / self.attempts if self.attempts else 0.0
@@ -0,0 +1,30 @@
+import re
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class User:
+    """Model representing a learner."""
+    
+    MIN_LEVEL = 1
+    MAX_LEVEL = 10
+    
+    def __init__(self, id=None, username=None, email=None, level=1, created_at=None):
+        if not self.MIN_LEVEL <= level <= self.MAX_LEVEL:
+            raise ValueError(f"用户级别必须在 {self.MIN_LEVEL} 到 {self.MAX_LEVEL} 之间")
+        if email is not None and not EMAIL_PATTERN.match(email):
+            raise ValueError(f"无效的电子邮件地址: {email}")
+        self.id = id
+        self.username = username
+        self.email = email
+        self.level = level
+        self.created_at = created_at
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create a User from a row dict returned by DBManager."""
+        return cls(id=data.get("id"), username=data.get("username"), email=data.get("email"),
+                   level=data.get("level", 1), created_at=data.get("created_at"))
+    
+    def __str__(self):
+        return f"{self.username} (Lv.{self.level})"
@@ -0,0 +1,23 @@
+class Word:
+    """Model representing a vocabulary word."""
+    
+    MIN_DIFFICULTY = 1
+    MAX_DIFFICULTY = 5
+    
+    def __init__(self, id=None, text=None, translation=None, difficulty_level=1, examples=None):
+        if not self.MIN_DIFFICULTY <= difficulty_level <= self.MAX_DIFFICULTY:
+            raise ValueError(f"难度级别必须在 {self.MIN_DIFFICULTY} 到 {self.MAX_DIFFICULTY} 之间")
+        self.id = id
+        self.text = text
+        self.translation = translation
+        self.difficulty_level = difficulty_level
+        self.examples = list(examples or [])
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create a Word from a row dict returned by DBManager."""
+        return cls(id=data.get("id"), text=data.get("text"), translation=data.get("translation"),
+                   difficulty_level=data.get("difficulty_level", 1), examples=data.get("examples"))
+    
+    def __str__(self):
+        return f"{self.text} ({self.translation})"
@@ -0,0 +1,183 @@
+import json
+from typing import Any, Callable, Dict, Optional
+
+from file_utils import FileUtils
+from services.difficulty_estimator import DifficultyEstimator
+from services.exam_sections import ExamSectionIndex
+from services.grammar_patterns import tag_text
+from services.near_duplicates import DuplicateIndex
+from services.sentence_index import SentenceIndex
+from services.vector_index import get_vector_index
+from services.vocabulary_index import VocabularyIndex
+
+# 作业类型与优先级（数值越小越先执行）
+EXTRACT_JOB = "extract"
+INDEX_JOB = "index"
+DIFFICULTY_JOB = "difficulty"
+SUMMARY_JOB = "summary"
+VECTOR_JOB = "vectors"
+DEDUPE_JOB = "dedupe"
+SENTENCE_JOB = "sentences"
+GRAMMAR_JOB = "grammar_tags"
+EXAM_SECTION_JOB = "sections"
+
+# 本地（非 LLM）分析结果在 artifacts 表中使用的模型名
+LOCAL_MODEL = "local"
+
+JOB_LABELS = {
+    DEDUPE_JOB: "查重",
+    EXTRACT_JOB: "文本提取",
+    INDEX_JOB: "词汇索引",
+    DIFFICULTY_JOB: "难度评估",
+    SUMMARY_JOB: "AI 摘要",
+    VECTOR_JOB: "相似检索索引",
+    SENTENCE_JOB: "例句索引",
+    GRAMMAR_JOB: "语法标注",
+    EXAM_SECTION_JOB: "试卷结构",
+}
+
+_estimator = DifficultyEstimator()
+
+
+def extract_text_job(db_manager, file_id: str) -> Optional[str]:
+    """Replace the raw upload content of office/PDF files with properly extracted text."""
+    info = db_manager.get_file_for_query(file_id, with_content=False)
+    if not info:
+        return None
+    if db_manager.list_revisions(file_id):
+        # 用户已经编辑过，保留用户的版本
+        return "skipped: edited"
+
+    content, method = FileUtils.extract_text(info["stored_path"])
+    db_manager.update_file(file_id, content, info["metadata"], record_revision=False)
+    return method
+
+
+def dedupe_job(db_manager, file_id: str) -> Optional[str]:
+    """Sign a file for near-duplicate detection; returns the original it duplicates, if any."""
+    original = DuplicateIndex(db_manager).add_document(file_id)
+    return f"duplicate of {original[0]} ({original[1]:.0%})" if original else None
+
+
+def _original_of(db_manager, file_id: str, content: Optional[str] = None) -> Optional[str]:
+    """The original a file near-duplicates, signing the file first if its dedupe job has not run yet."""
+    # 优先级只决定领取顺序，多个工作线程下查重作业可能还没完成
+    original = DuplicateIndex(db_manager).add_document(file_id, content)
+    return original[0] if original else None
+
+
+def index_job(db_manager, file_id: str) -> str:
+    """Update the vocabulary index for a file."""
+    changed = VocabularyIndex(db_manager).index_document(file_id)
+    return "indexed" if changed else "unchanged"
+
+
+def exam_section_job(db_manager, file_id: str) -> str:
+    """Parse a file into exam sections (listening, reading, cloze, ...) and store their offsets."""
+    changed = ExamSectionIndex(db_manager).index_document(file_id)
+    return "indexed" if changed else "unchanged"
+
+
+def sentence_job(db_manager, file_id: str) -> str:
+    """Update the example-sentence index for a file."""
+    index = SentenceIndex(db_manager)
+    if _original_of(db_manager, file_id):
+        # 副本的句子与原件相同，重复收录只会让检索结果重复
+        index.remove_document(file_id)
+        return "skipped: duplicate"
+    return "indexed" if index.index_document(file_id) else "unchanged"
+
+
+def vector_job(db_manager, file_id: str) -> str:
+    """Update the similarity-search vectors of a file."""
+    index = get_vector_index(db_manager.db_path)
+    content = db_manager.get_file_content(file_id)
+    if content is None:
+        index.remove_document(file_id)
+        return "removed"
+    if _original_of(db_manager, file_id, content):
+        # 副本不进入相似检索，否则结果里全是同一份试卷
+        index.remove_document(file_id)
+        return "skipped: duplicate"
+    return "indexed" if index.index_document(file_id, content) else "unchanged"
+
+
+def difficulty_job(db_manager, file_id: str) -> Optional[Dict[str, Any]]:
+    """Estimate the CEFR difficulty of a file and store it as an artifact."""
+    content = db_manager.get_file_content(file_id)
+    if content is None:
+        return None
+    estimate = _estimator.estimate(content)
+    db_manager.save_artifact(file_id, DIFFICULTY_JOB, LOCAL_MODEL,
+                             json.dumps(estimate, ensure_ascii=False),
+                             content_digest=db_manager.segment_hash(content))
+    return estimate
+
+
+def grammar_job(db_manager, file_id: str) -> Optional[int]:
+    """Tag a file's sentences with grammar points and store the tags as an artifact."""
+    content = db_manager.get_file_content(file_id)
+    if content is None:
+        return None
+    tagged = tag_text(content)
+    db_manager.save_artifact(file_id, GRAMMAR_JOB, LOCAL_MODEL, json.dumps(tagged, ensure_ascii=False),
+                             content_digest=db_manager.segment_hash(content))
+    return len(tagged)
+
+
+def make_summary_job(get_llm_processor: Callable[[], Any]):
+    """Build a job that summarizes a file with the LLM available at run time."""
+    def summary_job(db_manager, file_id: str) -> Optional[str]:
+        llm_processor = get_llm_processor()
+        if not llm_processor:
+            raise RuntimeError("LLM处理器未初始化")
+        info = db_manager.get_file_for_query(file_id)
+        if not info:
+            return None
+        digest = db_manager.segment_hash(info["content"])
+        model = llm_processor.current_model
+        summary = db_manager.get_artifact(file_id, SUMMARY_JOB, model, content_digest=digest)
+        if summary is not None:
+            return summary
+
+        original = _original_of(db_manager, file_id, info["content"])
+        if original:
+            original_content = db_manager.get_file_content(original)
+            if original_content is not None:
+                summary = db_manager.get_artifact(original, SUMMARY_JOB, model,
+                                                  content_digest=db_manager.segment_hash(original_content))
+        if summary is not None:
+            # 近似重复的文件直接沿用原件的摘要
+            db_manager.save_artifact(file_id, SUMMARY_JOB, model, summary, content_digest=digest)
+            return summary
+
+        summary = llm_processor.summarize_document(info["content"], info["metadata"] or "")
+        if summary.startswith("Error:"):
+            # 让队列按退避策略重试
+            raise RuntimeError(summary)
+        db_manager.save_artifact(file_id, SUMMARY_JOB, model, summary, content_digest=digest)
+        return summary
+    return summary_job
+
+
+def register_default_jobs(job_queue, get_llm_processor: Callable[[], Any] = lambda: None,
+                          auto_summary: Callable[[], bool] = lambda: False):
+    """Register the post-upload/post-edit processing pipeline on a queue.
+
+    Extraction is queued explicitly after an upload. Every content change
+    queues near-duplicate detection, vocabulary and sentence indexing, exam
+    section parsing, difficulty scoring, grammar tagging, similarity vectors
+    and (when enabled) LLM summaries. Priorities only order the claims, so
+    the jobs that skip or reuse work for duplicates sign the file themselves
+    when the dedupe job has not finished yet.
+    """
+    job_queue.register(EXTRACT_JOB, extract_text_job, priority=0)
+    job_queue.register(DEDUPE_JOB, dedupe_job, priority=0, on_content_change=True)
+    job_queue.register(INDEX_JOB, index_job, priority=1, on_content_change=True)
+    job_queue.register(SENTENCE_JOB, sentence_job, priority=1, on_content_change=True)
+    job_queue.register(EXAM_SECTION_JOB, exam_section_job, priority=1, on_content_change=True)
+    job_queue.register(DIFFICULTY_JOB, difficulty_job, priority=2, on_content_change=True)
+    job_queue.register(GRAMMAR_JOB, grammar_job, priority=2, on_content_change=True)
+    job_queue.register(VECTOR_JOB, vector_job, priority=3, on_content_change=True)
+    job_queue.register(SUMMARY_JOB, make_summary_job(get_llm_processor), priority=5,
+                       on_content_change=lambda: bool(auto_summary() and get_llm_processor()))
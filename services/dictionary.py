@@ -0,0 +1,275 @@
+import csv
+import glob
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.text_processing import DATA_DIR, lemmatize
+
+DEFAULT_SOURCE_DIR = os.path.join("storage", "dictionary")
+DEFAULT_INDEX_DIR = os.path.join("storage", ".dictionary")
+BUNDLED_SOURCE = os.path.join(DATA_DIR, "dictionary.tsv")
+SOURCE_PATTERNS = ("*.csv", "*.tsv", "*.txt")
+
+_MAGIC = b"LEDICT01"
+_HEADER = struct.Struct("<8sQQ")  # magic, 词条数, 来源签名长度
+MAX_TRANSLATION_CHARS = 400
+
+
+def read_source(path: str) -> Iterable[Tuple[str, str]]:
+    """(word, translation) pairs from a wordlist file.
+
+    CSV files need "word" and "translation" columns (the ECDICT layout,
+    where line breaks inside a translation are written as "\\n"); other
+    files are "word<TAB>translation" per line, with "#" comments.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                word, translation = (row.get("word") or "").strip(), (row.get("translation") or "").strip()
+                if word and translation:
+                    yield word, translation.replace("\\n", "\n")
+            return
+        for line in f:
+            if line.startswith("#") or "\t" not in line:
+                continue
+            word, translation = line.rstrip("\r\n").split("\t", 1)
+            if word.strip() and translation.strip():
+                yield word.strip(), translation.strip().replace("\\n", "\n")
+
+
+class _Keys:
+    """Sequence view of the sorted headwords in the mapping, for bisect."""
+
+    def __init__(self, dictionary: "OfflineDictionary"):
+        self.dictionary = dictionary
+
+    def __len__(self) -> int:
+        return self.dictionary.entry_count
+
+    def __getitem__(self, index: int) -> str:
+        return self.dictionary.entry(index)[0]
+
+
+class OfflineDictionary:
+    """English-Chinese lookups from a compiled, memory-mapped wordlist.
+
+    Wordlists (ECDICT-style CSV or tab-separated files) dropped into
+    `source_dir`, the bundled list if there is one and the translations in
+    the words table are compiled into one file of sorted headwords with an
+    offset table. The file is memory-mapped and searched by bisection, so a
+    lookup or a prefix completion reads a few dozen entries whatever the
+    dictionary size. Nothing is read or compiled until the first lookup; the
+    file is recompiled only when a source changes. The UI calls prepare()
+    to compile and map it on a background thread and checks is_ready()
+    before looking up, so compiling a large wordlist never blocks the
+    event loop; other callers can just call lookup(), which waits.
+    """
+
+    def __init__(self, db_manager=None, source_dir: str = DEFAULT_SOURCE_DIR, index_dir: str = DEFAULT_INDEX_DIR,
+                 extra_sources: Iterable[str] = (BUNDLED_SOURCE,)):
+        """Remember where the sources and the compiled index live; nothing is loaded yet."""
+        self.db_manager = db_manager
+        self.source_dir = source_dir
+        self.index_dir = index_dir
+        self.extra_sources = list(extra_sources)
+        self.index_path = os.path.join(index_dir, "dictionary.idx")
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+        self._prepare_thread = None
+        self.error = None  # 最近一次后台编译失败的原因
+        self._file = None
+        self._map = None
+        self._offsets = None
+        self._data_start = 0
+        self.entry_count = 0
+
+    def source_paths(self) -> List[str]:
+        paths = [path for path in self.extra_sources if os.path.isfile(path)]
+        for pattern in SOURCE_PATTERNS:
+            paths += sorted(glob.glob(os.path.join(self.source_dir, pattern)))
+        return paths
+
+    def _signature(self) -> str:
+        """Identifies the current sources; the index is rebuilt when it changes."""
+        sources = []
+        for path in self.source_paths():
+            stat = os.stat(path)
+            sources.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        words = self._query_words('''
+        SELECT COUNT(*), MAX(id), SUM(LENGTH(translation)) FROM words
+        WHERE translation IS NOT NULL AND translation != ''
+        ''')
+        return json.dumps({"sources": sources, "words": [list(row) for row in words]})
+
+    def _query_words(self, sql: str) -> List[tuple]:
+        """Run a query on the words table with a connection of the calling thread (may be a build thread)."""
+        if self.db_manager is None:
+            return []
+        conn = sqlite3.connect(self.db_manager.db_path)
+        try:
+            return conn.execute(sql).fetchall()
+        except sqlite3.OperationalError:
+            return []  # 还没有单词表
+        finally:
+            conn.close()
+
+    def _collect(self) -> Dict[str, Tuple[str, str]]:
+        # 键为小写词头；同一个词先出现的来源优先，小写形式优先于大写形式
+        entries = {}
+
+        def add(word, translation):
+            key = word.lower()
+            if key not in entries or (word == key and entries[key][0] != key):
+                entries[key] = (word, translation[:MAX_TRANSLATION_CHARS])
+
+        for path in self.source_paths():
+            for word, translation in read_source(path):
+                add(word, translation)
+        for word, translation in self._query_words(
+                "SELECT text, translation FROM words WHERE translation IS NOT NULL AND translation != ''"):
+            if word.lower() not in entries:
+                add(word.strip(), translation.strip())
+        return entries
+
+    def _build(self, signature: str):
+        entries = self._collect()
+        blobs = [f"{key}\x00{word}\x00{translation}".encode("utf-8")
+                 for key, (word, translation) in sorted(entries.items())]
+        offsets = np.zeros(len(blobs) + 1, dtype="<i8")
+        np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+        signature = signature.encode("utf-8")
+        padding = b"\x00" * (-(_HEADER.size + len(signature)) % 8)
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(blobs), len(signature)) + signature + padding)
+            f.write(offsets.tobytes())
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_path, self.index_path)
+
+    def _stored_signature(self) -> Optional[str]:
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, _, length = _HEADER.unpack(f.read(_HEADER.size))
+                return f.read(length).decode("utf-8") if magic == _MAGIC else None
+        except (OSError, struct.error, UnicodeDecodeError):
+            return None
+
+    def _open(self):
+        signature = self._signature()
+        if self._stored_signature() != signature:
+            self._build(signature)
+
+        self._file = open(self.index_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, count, length = _HEADER.unpack_from(self._map)
+        offsets_start = _HEADER.size + length + (-(_HEADER.size + length) % 8)
+        self._offsets = np.frombuffer(self._map, dtype="<i8", count=count + 1, offset=offsets_start)
+        self._data_start = offsets_start + (count + 1) * 8
+        self.entry_count = count
+
+    def _ensure_open(self):
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    self._open()
+
+    def is_ready(self) -> bool:
+        """True once the index is compiled and mapped, so lookups return immediately."""
+        return self._map is not None
+
+    def is_preparing(self) -> bool:
+        return self._prepare_thread is not None and self._prepare_thread.is_alive()
+
+    def prepare(self):
+        """Compile (if the sources changed) and map the index on a background thread; returns at once."""
+        with self._prepare_lock:
+            if self.is_ready() or self.is_preparing():
+                return
+            self.error = None
+            self._prepare_thread = threading.Thread(target=self._prepare, name="dictionary-build", daemon=True)
+            self._prepare_thread.start()
+
+    def _prepare(self):
+        try:
+            self._ensure_open()
+        except Exception as e:
+            self.error = e
+
+    def entry(self, index: int) -> Tuple[str, str, str]:
+        """(key, headword, translation) of the index-th entry in sorted order."""
+        start = self._data_start + int(self._offsets[index])
+        end = self._data_start + int(self._offsets[index + 1])
+        key, word, translation = self._map[start:end].decode("utf-8").split("\x00", 2)
+        return key, word, translation
+
+    def _find(self, key: str) -> Optional[Tuple[str, str]]:
+        index = bisect_left(_Keys(self), key)
+        if index < self.entry_count:
+            found, word, translation = self.entry(index)
+            if found == key:
+                return word, translation
+        return None
+
+    def lookup(self, word: str) -> Optional[Tuple[str, str]]:
+        """(headword, translation) for a word or phrase; inflected forms fall back to their base form."""
+        self._ensure_open()
+        key = " ".join(word.replace("’", "'").split()).lower().strip(".,;:!?\"'()[]")
+        if not key:
+            return None
+        for candidate in dict.fromkeys((key, key[:-2] if key.endswith("'s") else key, lemmatize(key))):
+            result = self._find(candidate)
+            if result is not None:
+                return result
+        return None
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """Up to `limit` (headword, translation) entries starting with `prefix`, in alphabetical order."""
+        self._ensure_open()
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        matches = []
+        index = bisect_left(_Keys(self), prefix)
+        while index < self.entry_count and len(matches) < limit:
+            key, word, translation = self.entry(index)
+            if not key.startswith(prefix):
+                break
+            matches.append((word, translation))
+            index += 1
+        return matches
+
+    def reload(self):
+        """Pick up changed sources: close the mapping and prepare it again in the background."""
+        if self.is_preparing():
+            return
+        self.close()
+        self.prepare()
+
+    def close(self):
+        with self._lock:
+            self._offsets = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.entry_count = 0
+
+
+def get_dictionary(db_manager) -> OfflineDictionary:
+    """Dictionary for an application database, with its sources and index kept next to it."""
+    base_dir = os.path.dirname(os.path.abspath(db_manager.db_path))
+    return OfflineDictionary(db_manager, os.path.join(base_dir, DEFAULT_SOURCE_DIR),
+                             os.path.join(base_dir, DEFAULT_INDEX_DIR))
@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.text_processing import (
+    FUNCTION_WORDS, count_syllables, lemmatize, load_word_ranks, split_sentences, tokenize
+)
+
+
+class DifficultyEstimator:
+    """Offline CEFR difficulty estimator based on vectorized text features.
+
+    Every text is reduced to a fixed feature vector (sentence length, word
+    length, syllables, lexical density, type-token ratio and the share of
+    words in each frequency band).  Scoring is a single matrix product, so
+    estimating a whole library costs little more than tokenizing it.
+    """
+
+    CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+
+    FEATURE_NAMES = [
+        "avg_sentence_length",   # 平均句长（词）
+        "avg_word_length",       # 平均词长（字母）
+        "avg_syllables",         # 平均音节数
+        "polysyllable_ratio",    # 三音节以上单词比例
+        "lexical_density",       # 实词比例
+        "type_token_ratio",      # 词汇丰富度（滑动窗口平均）
+        "band2_ratio",           # 常用词 500-1000 名之间的比例
+        "offlist_ratio",         # 常用词表以外的单词比例
+    ]
+
+    # 线性打分权重：score 从 0 (A1) 到 6 (C2)，每个等级占 1 分
+    # 权重按分级样本文本拟合；次常用词比例与其他特征高度相关，只用于展示
+    WEIGHTS = np.array([0.055, 0.08, 0.5, 1.5, 1.9, 0.3, 0.0, 0.85], dtype=np.float64)
+    BIAS = -1.42
+
+    TTR_WINDOW = 50
+
+    # 频率段分界（词表中的排名）
+    BAND_EDGES = np.array([500, 1000], dtype=np.int64)
+
+    def __init__(self, word_list_path: Optional[str] = None):
+        """Initialize the estimator; the word list is loaded on first use."""
+        self.word_list_path = word_list_path
+        self._ranks = None
+
+    @property
+    def ranks(self) -> Dict[str, int]:
+        if self._ranks is None:
+            self._ranks = load_word_ranks(self.word_list_path)
+        return self._ranks
+
+    def extract_features(self, text: str) -> np.ndarray:
+        """Compute the feature vector of a single text."""
+        tokens = tokenize(text)
+        if not tokens:
+            return np.zeros(len(self.FEATURE_NAMES), dtype=np.float64)
+
+        n_sentences = max(1, len(split_sentences(text)))
+        offlist = len(self.ranks)
+        ranks = self.ranks
+
+        # 每个不同的词只查一次表，再按出现位置展开成数组
+        vocabulary, inverse = np.unique(np.array(tokens, dtype=object), return_inverse=True)
+        word_lengths = np.fromiter((len(w) for w in vocabulary), dtype=np.float64, count=len(vocabulary))[inverse]
+        syllables = np.fromiter((count_syllables(w) for w in vocabulary), dtype=np.float64, count=len(vocabulary))[inverse]
+        is_function = np.fromiter((w in FUNCTION_WORDS for w in vocabulary), dtype=bool, count=len(vocabulary))[inverse]
+        word_ranks = np.fromiter((ranks.get(w, ranks.get(lemmatize(w), offlist)) for w in vocabulary),
+                                 dtype=np.int64, count=len(vocabulary))[inverse]
+
+        bands = np.digitize(word_ranks, self.BAND_EDGES)
+        bands[word_ranks >= offlist] = len(self.BAND_EDGES) + 1
+        n_tokens = len(tokens)
+
+        return np.array([
+            n_tokens / n_sentences,
+            word_lengths.mean(),
+            syllables.mean(),
+            np.count_nonzero(syllables >= 3) / n_tokens,
+            np.count_nonzero(~is_function) / n_tokens,
+            self.moving_average_ttr(inverse),
+            np.count_nonzero(bands == 1) / n_tokens,
+            np.count_nonzero(bands == len(self.BAND_EDGES) + 1) / n_tokens,
+        ], dtype=np.float64)
+
+    @classmethod
+    def moving_average_ttr(cls, token_ids: np.ndarray) -> float:
+        """Moving-average type-token ratio, which does not drift with text length."""
+        n = len(token_ids)
+        window = cls.TTR_WINDOW
+        if n <= window:
+            return len(np.unique(token_ids)) / n
+
+        # prev[j]：同一个词上一次出现的位置（没有则为 -1）
+        order = np.lexsort((np.arange(n), token_ids))
+        prev = np.full(n, -1, dtype=np.int64)
+        same = token_ids[order[1:]] == token_ids[order[:-1]]
+        prev[order[1:][same]] = order[:-1][same]
+
+        # 位置 j 为起点在 [max(prev[j]+1, j-window+1), min(j, n-window)] 的窗口各贡献一个新词；
+        # 用差分数组在 O(n) 内累加
+        n_windows = n - window + 1
+        positions = np.arange(n)
+        lo = np.maximum(prev + 1, positions - window + 1)
+        hi = np.minimum(positions, n_windows - 1)
+        valid = lo <= hi
+        diff = np.bincount(lo[valid], minlength=n_windows + 1) - np.bincount(hi[valid] + 1, minlength=n_windows + 1)
+        types_per_window = np.cumsum(diff[:n_windows])
+        return float(types_per_window.mean()) / window
+
+    def score_features(self, features: np.ndarray) -> np.ndarray:
+        """Score a (n_texts, n_features) matrix in one vectorized step."""
+        features = np.atleast_2d(features)
+        scores = features @ self.WEIGHTS + self.BIAS
+        return np.clip(scores, 0.0, len(self.CEFR_LEVELS) - 0.01)
+
+    def estimate(self, text: str) -> Dict[str, Any]:
+        """Estimate the CEFR level of a single text."""
+        return self.estimate_many([text])[0]
+
+    def estimate_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Estimate CEFR levels for many texts at once."""
+        if not texts:
+            return []
+        features = np.vstack([self.extract_features(text) for text in texts])
+        scores = self.score_features(features)
+        levels = np.floor(scores).astype(np.int64)
+
+        results = []
+        for text_features, score, level in zip(features, scores, levels):
+            results.append({
+                "level": self.CEFR_LEVELS[level],
+                "score": round(float(score), 2),
+                "features": {name: round(float(value), 3)
+                             for name, value in zip(self.FEATURE_NAMES, text_features)},
+            })
+        return results
+
+    @staticmethod
+    def format_estimate(result: Dict[str, Any]) -> str:
+        """Format an estimate for display."""
+        features = result["features"]
+        return (
+            f"难度级别（CEFR）：{result['level']}  （评分 {result['score']:.2f} / 6）\n\n"
+            f"平均句长：{features['avg_sentence_length']:.1f} 词\n"
+            f"平均词长：{features['avg_word_length']:.2f} 字母\n"
+            f"平均音节数：{features['avg_syllables']:.2f}\n"
+            f"多音节词比例：{features['polysyllable_ratio']:.1%}\n"
+            f"实词比例：{features['lexical_density']:.1%}\n"
+            f"词汇丰富度：{features['type_token_ratio']:.2f}\n"
+            f"次常用词比例：{features['band2_ratio']:.1%}\n"
+            f"常用词表外词汇比例：{features['offlist_ratio']:.1%}\n"
+        )
@@ -0,0 +1,94 @@
+import zipfile
+from typing import Iterator, Optional, Tuple
+
+from lxml import etree
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+PARAGRAPH = W_NS + "p"
+TEXT = W_NS + "t"
+TAB = W_NS + "tab"
+BREAKS = (W_NS + "br", W_NS + "cr")
+TABLE = W_NS + "tbl"
+ROW = W_NS + "tr"
+CELL = W_NS + "tc"
+
+
+def _release(element):
+    """Free a fully processed element and the siblings already handled before it."""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[str]:
+    """Yield the text of a .docx body in document order.
+
+    Each paragraph outside a table is one block; each table row is one block
+    with its cells separated by tabs (paragraphs within a cell joined by
+    spaces). `word/document.xml` is parsed incrementally and processed
+    elements are discarded, so memory stays flat for large documents.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as stream:
+            paragraph = []
+            # 每层表格: [当前行的单元格列表, 当前单元格的段落列表]
+            tables = []
+            for event, element in etree.iterparse(stream, events=("start", "end")):
+                tag = element.tag
+                if event == "start":
+                    if tag == TABLE:
+                        tables.append([[], []])
+                    continue
+
+                if tag == TEXT:
+                    paragraph.append(element.text or "")
+                elif tag == TAB:
+                    paragraph.append("\t")
+                elif tag in BREAKS:
+                    paragraph.append("\n")
+                elif tag == PARAGRAPH:
+                    text = "".join(paragraph)
+                    paragraph = []
+                    _release(element)
+                    if tables:
+                        tables[-1][1].append(text)
+                    else:
+                        yield text
+                elif tag == CELL and tables:
+                    cells, cell_paragraphs = tables[-1]
+                    cells.append(" ".join(p.strip() for p in cell_paragraphs if p.strip()))
+                    tables[-1][1] = []
+                elif tag == ROW and tables:
+                    row = "\t".join(tables[-1][0])
+                    tables[-1][0] = []
+                    _release(element)
+                    if len(tables) > 1:
+                        # 嵌套表格的行并入外层单元格
+                        tables[-2][1].append(row)
+                    elif row.strip():
+                        yield row
+                elif tag == TABLE and tables:
+                    tables.pop()
+                    _release(element)
+
+
+def extract_docx_text(file_path: str, max_chars: Optional[int] = None) -> Tuple[str, bool]:
+    """Extract the text of a .docx file, stopping once max_chars is reached.
+
+    Returns (text, truncated).
+    """
+    parts = []
+    length = 0
+    blocks = iter_docx_blocks(file_path)
+    try:
+        for block in blocks:
+            parts.append(block)
+            length += len(block) + 1
+            if max_chars and length >= max_chars:
+                text = "\n".join(parts)
+                return text[:max_chars], True
+    finally:
+        blocks.close()
+    return "\n".join(parts), False
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTION_KINDS = ("listening", "reading", "cloze", "grammar", "writing", "other")
+SECTION_LABELS = {"listening": "听力", "reading": "阅读理解", "cloze": "完形填空", "grammar": "语法填空",
+                  "writing": "写作", "other": "其他"}
+
+_NUMERALS = "一二三四五六七八九十"
+HEADING_RE = re.compile(
+    rf"第[{_NUMERALS}]+部分|第[{_NUMERALS}]+节|^[ \t]*[{_NUMERALS}]+[.、．][ \t]*(?=\S)",
+    re.MULTILINE
+)
+# 紧挨着的标题（如“九. 第二节读后续写”）合为一个
+MERGE_DISTANCE = 20
+TITLE_CHARS = 30
+INSTRUCTION_CHARS = 200  # 标题后用于判断题型的说明文字长度
+
+QUESTION_RE = re.compile(r"_{2,}\s*(\d{1,2})\s*_{2,}|(?:^|(?<=\s))(\d{1,2})\s*[.．](?!\s*\d)", re.MULTILINE)
+MAX_QUESTION_GAP = 5
+
+# (类型, 关键词)，按顺序检查，先标题后说明文字
+_TITLE_KINDS = (
+    ("cloze", ("完形填空",)),
+    ("grammar", ("语法填空",)),
+    ("reading", ("七选五", "阅读")),
+    ("listening", ("听力",)),
+    ("writing", ("写作", "书面表达", "读后续写", "应用文")),
+)
+_INSTRUCTION_KINDS = (
+    ("listening", ("听下面", "听力")),
+    ("reading", ("七个选项", "多余选项", "七选五")),
+    ("grammar", ("语法填空", "在空白处填入", "正确形式", "根据短文内容填空")),
+    ("cloze", ("完形填空", "掌握其大意", "填入空白处")),
+    ("reading", ("阅读理解", "最佳选项", "回答问题")),
+    ("writing", ("假定你是", "假设你是", "写一篇", "词数", "续写")),
+)
+_CONTAINER_TITLES = ("知识运用", "语言运用")
+
+
+def _classify(text: str, rules) -> Optional[str]:
+    for kind, keywords in rules:
+        if any(keyword in text for keyword in keywords):
+            return kind
+    return None
+
+
+def _title(content: str, start: int, end: int) -> str:
+    title = content[start:min(end, start + TITLE_CHARS)].split("\n", 1)[0]
+    return re.split(r"[(（]", title, 1)[0].strip()
+
+
+def _questions(content: str, start: int, end: int, after: int = 0) -> List[Tuple[int, int]]:
+    """Question numbers in a section as (number, offset): the longest increasing run.
+
+    Numbers repeated in answer keys and explanations, scores like "1. 5分"
+    and other stray numbers fall out of the run. Papers number their
+    questions straight through, so runs continuing after the previous
+    section's last question (`after`) are preferred.
+    """
+    runs = []
+    for match in QUESTION_RE.finditer(content, start, end):
+        number = int(match.group(1) or match.group(2))
+        if number == 0:
+            continue
+        extendable = [run for run in runs if run[-1][0] < number <= run[-1][0] + MAX_QUESTION_GAP]
+        if extendable:
+            max(extendable, key=len).append((number, match.start()))
+        else:
+            runs.append([(number, match.start())])
+    continuing = [run for run in runs if run[0][0] > after]
+    return max(continuing or runs, key=len) if runs else []
+
+
+def parse_sections(content: str) -> List[Dict[str, Any]]:
+    """Split an exam paper into sections.
+
+    Headings ("第二部分 阅读", "第一节", "六. 完形填空") are found anywhere in
+    the text, since extracted papers often have no line breaks. Each section
+    runs to the next heading and gets a kind from SECTION_KINDS (from its
+    title, else from the instructions that follow it, else from its part),
+    a title, its offsets and its question numbers. Text before the first
+    heading is an "other" section. Returns [] for text without headings.
+    """
+    headings = []
+    for match in HEADING_RE.finditer(content or ""):
+        is_part = match.group().endswith("部分")
+        if headings and not is_part and match.start() - headings[-1][1] <= MERGE_DISTANCE \
+                and "。" not in content[headings[-1][1]:match.start()]:
+            # 如“第一部分 阅读理解(共两节)第一节”、“九. 第二节读后续写”
+            continue
+        headings.append((match.start(), match.end(), is_part))
+    if not headings:
+        return []
+
+    sections = []
+    if content[:headings[0][0]].strip():
+        sections.append({"kind": "other", "title": "", "start": 0, "end": headings[0][0]})
+
+    part_kind = None
+    for index, (start, heading_end, is_part) in enumerate(headings):
+        end = headings[index + 1][0] if index + 1 < len(headings) else len(content)
+        title = _title(content, start, end)
+        kind = _classify(title, _TITLE_KINDS)
+        if is_part:
+            part_kind = None if any(word in title for word in _CONTAINER_TITLES) else kind
+        if kind is None:
+            kind = _classify(content[heading_end:min(end, heading_end + INSTRUCTION_CHARS)], _INSTRUCTION_KINDS) \
+                if not is_part or part_kind is None else None
+        sections.append({"kind": kind or part_kind or "other", "title": title, "start": start, "end": end})
+
+    last_question = 0
+    for ordinal, section in enumerate(sections):
+        questions = _questions(content, section["start"], section["end"],
+                               last_question if section["kind"] != "other" else 0)
+        if questions and section["kind"] != "other":
+            last_question = questions[-1][0]
+        section.update(ordinal=ordinal, questions=questions,
+                       first_question=questions[0][0] if questions else None,
+                       last_question=questions[-1][0] if questions else None)
+    return sections
+
+
+def section_label(section: Dict[str, Any]) -> str:
+    """Short description of a section for lists, e.g. "阅读理解 第一节 (21-35)"."""
+    label = SECTION_LABELS.get(section["kind"], section["kind"])
+    if section["title"] and section["title"] != label:
+        label += f" {section['title']}"
+    if section["first_question"] is not None:
+        label += f" ({section['first_question']}-{section['last_question']})"
+    return label
+
+
+class ExamSectionIndex:
+    """Section boundaries of the exam papers in the library.
+
+    Sections are stored as offsets into the file content with their kind
+    and question range, so a single section can be loaded, analyzed or
+    sent to the LLM, and sections of one kind (e.g. every cloze) can be
+    listed across the library with one indexed query.
+    """
+
+    def __init__(self, db_manager):
+        """Initialize the index on the application's database."""
+        self.db_manager = db_manager
+        self.conn = db_manager.conn
+        self._init_tables()
+
+    def _init_tables(self):
+        """Create the section tables."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exam_documents (
+            file_id TEXT PRIMARY KEY,
+            content_digest TEXT NOT NULL
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS exam_sections (
+            file_id TEXT NOT NULL,
+            ordinal INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            title TEXT NOT NULL,
+            start INTEGER NOT NULL,
+            end INTEGER NOT NULL,
+            first_question INTEGER,
+            last_question INTEGER,
+            questions TEXT NOT NULL,
+            PRIMARY KEY (file_id, ordinal)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_exam_sections_kind ON exam_sections (kind)')
+        self.conn.commit()
+
+    def index_document(self, file_id: str, content: Optional[str] = None) -> bool:
+        """(Re)parse a document's sections; does nothing if its content is unchanged.
+
+        Returns True if the index was modified.
+        """
+        if content is None:
+            content = self.db_manager.get_file_content(file_id)
+            if content is None:
+                return False
+
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT content_digest FROM exam_documents WHERE file_id = ?', (file_id,))
+        row = cursor.fetchone()
+        if row and row[0] == digest:
+            return False
+
+        sections = parse_sections(content)
+        with self.conn:
+            cursor.execute('DELETE FROM exam_sections WHERE file_id = ?', (file_id,))
+            cursor.executemany('''
+            INSERT INTO exam_sections
+                (file_id, ordinal, kind, title, start, end, first_question, last_question, questions)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', ((file_id, s["ordinal"], s["kind"], s["title"], s["start"], s["end"], s["first_question"],
+                   s["last_question"], json.dumps(s["questions"])) for s in sections))
+            cursor.execute('INSERT OR REPLACE INTO exam_documents (file_id, content_digest) VALUES (?, ?)',
+                           (file_id, digest))
+        return True
+
+    def remove_document(self, file_id: str):
+        """Remove a document's sections."""
+        with self.conn:
+            self.conn.execute('DELETE FROM exam_sections WHERE file_id = ?', (file_id,))
+            self.conn.execute('DELETE FROM exam_documents WHERE file_id = ?', (file_id,))
+
+    @staticmethod
+    def _section(row) -> Dict[str, Any]:
+        file_id, ordinal, kind, title, start, end, first_question, last_question, questions = row
+        return {"file_id": file_id, "ordinal": ordinal, "kind": kind, "title": title, "start": start, "end": end,
+                "first_question": first_question, "last_question": last_question,
+                "questions": [tuple(question) for question in json.loads(questions)]}
+
+    def get_sections(self, file_id: str) -> List[Dict[str, Any]]:
+        """A document's sections in order."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT file_id, ordinal, kind, title, start, end, first_question, last_question, questions
+        FROM exam_sections WHERE file_id = ? ORDER BY ordinal
+        ''', (file_id,))
+        return [self._section(row) for row in cursor]
+
+    def sections_of_kind(self, kind: str) -> List[Dict[str, Any]]:
+        """Sections of one kind across the library."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT file_id, ordinal, kind, title, start, end, first_question, last_question, questions
+        FROM exam_sections WHERE kind = ? ORDER BY file_id, ordinal
+        ''', (kind,))
+        return [self._section(row) for row in cursor]
+
+    def section_text(self, file_id: str, ordinal: int, content: Optional[str] = None) -> Optional[str]:
+        """Text of one section (from `content` if the caller already has it)."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT start, end FROM exam_sections WHERE file_id = ? AND ordinal = ?', (file_id, ordinal))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        if content is None:
+            cursor.execute('SELECT substr(content, ?, ?) FROM files WHERE id = ?',
+                           (row[0] + 1, row[1] - row[0], file_id))
+            found = cursor.fetchone()
+            if found and found[0] is not None and self.db_manager.get_segment_count(file_id) == 0:
+                return found[0]
+            content = self.db_manager.get_file_content(file_id) or ""
+        return content[row[0]:row[1]]
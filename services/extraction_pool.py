@@ -0,0 +1,214 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+from services.doc_extractor import extract_doc_text
+from services.docx_extractor import extract_docx_text
+from services.pdf_extractor import extract_pdf_text
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，无法限制内存
+    resource = None
+
+EXTRACTORS = {
+    ".doc": (extract_doc_text, "Word文档 (doc)"),
+    ".docx": (extract_docx_text, "Word文档 (docx)"),
+    ".pdf": (extract_pdf_text, None),  # 方法名由提取器返回
+}
+
+
+class ExtractionError(Exception):
+    """Text could not be extracted from a file."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """The extractor did not finish within the time limit and was killed."""
+
+
+class ExtractionMemoryExceeded(ExtractionError):
+    """The extractor used more memory than allowed and was killed."""
+
+
+def _rss_bytes(pid: int) -> Optional[int]:
+    """Resident set size of a process, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def run_extractor(file_path: str, max_chars: Optional[int] = None) -> Tuple[str, bool, str]:
+    """Run the extractor for a file's type in the current process; returns (text, truncated, method)."""
+    file_type = os.path.splitext(file_path)[1].lower()
+    if file_type not in EXTRACTORS:
+        raise ExtractionError(f"不支持提取该文件类型的文本: {file_type}")
+    extractor, method = EXTRACTORS[file_type]
+    result = extractor(file_path, max_chars)
+    if method is None:
+        return result
+    text, truncated = result
+    return text, truncated, method
+
+
+def _worker_main(conn, memory_limit: Optional[int]):
+    """Worker process loop: receive (file_path, max_chars), send back the result."""
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        file_path, max_chars = task
+        try:
+            conn.send(("ok", run_extractor(file_path, max_chars)))
+        except MemoryError:
+            conn.send(("error", "解析时内存超出限制"))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit: Optional[int]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class ExtractionPool:
+    """Pool of supervised worker processes that extract document text.
+
+    While a worker runs a job the pool watches its wall-clock time and
+    resident memory; a worker over either limit is killed and replaced and
+    the caller gets an ExtractionError instead of a stalled or crashed
+    application. An address-space rlimit (twice the RSS limit) backs this up
+    inside the worker, and workers are recycled after `max_jobs_per_worker`
+    jobs so leaks in parser libraries cannot accumulate. Safe to call from
+    several threads at once.
+    """
+
+    SUPERVISE_INTERVAL = 0.05  # 检查子进程内存的间隔（秒）
+
+    def __init__(self, workers: Optional[int] = None, timeout: float = 30.0, memory_limit_mb: int = 512,
+                 max_jobs_per_worker: int = 50):
+        """Initialize the pool; worker processes are started on demand."""
+        self.workers = workers or os.cpu_count() or 2
+        self.timeout = timeout
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.max_jobs_per_worker = max_jobs_per_worker
+        # spawn：不继承界面进程的线程和 Tk 状态
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._closed = False
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise ExtractionError("提取进程池已关闭")
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self._context, self.memory_limit * 2 if self.memory_limit else None)
+
+    def _checkin(self, worker: _Worker):
+        worker.jobs += 1
+        with self._lock:
+            if not self._closed and worker.jobs < self.max_jobs_per_worker:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def _wait(self, worker: _Worker):
+        """Wait for the worker's reply while enforcing the time and memory limits."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if worker.conn.poll(max(0.0, min(self.SUPERVISE_INTERVAL, remaining))):
+                return worker.conn.recv()
+            if remaining <= 0:
+                raise ExtractionTimeout(f"解析超时（超过 {self.timeout:g} 秒）")
+            if self.memory_limit:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.memory_limit:
+                    raise ExtractionMemoryExceeded(
+                        f"解析占用内存超过限制（{self.memory_limit // (1024 * 1024)} MB）")
+
+    def extract(self, file_path: str, max_chars: Optional[int] = None) -> Tuple[str, bool, str]:
+        """Extract a file's text in a worker process; returns (text, truncated, method)."""
+        with self._slots:
+            worker = self._checkout()
+            try:
+                worker.conn.send((os.path.abspath(file_path), max_chars))
+                status, payload = self._wait(worker)
+            except ExtractionError:
+                worker.kill()
+                raise
+            except (EOFError, OSError):
+                worker.kill()
+                raise ExtractionError("解析进程异常退出")
+
+            self._checkin(worker)
+            if status != "ok":
+                raise ExtractionError(payload)
+            return payload
+
+    def extract_many(self, file_paths: Iterable[str],
+                     max_chars: Optional[int] = None) -> Iterator[Tuple[str, Optional[str], str]]:
+        """Extract many files in parallel, yielding (file_path, text or None, method or error message)."""
+        def extract_one(file_path):
+            try:
+                text, _, method = self.extract(file_path, max_chars)
+                return file_path, text, method
+            except ExtractionError as e:
+                return file_path, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            yield from executor.map(extract_one, file_paths)
+
+    def close(self):
+        """Stop all idle worker processes; busy ones stop when they finish."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """Shared pool used by FileUtils and background jobs."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ExtractionPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
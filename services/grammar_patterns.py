@@ -0,0 +1,157 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.text_processing import WORD_RE, sentence_spans
+
+_ADVERB = r"(?:(?:not|never|already|just|ever|yet|also|always|recently|finally|\w+ly)\s+)?"
+_PARTICIPLE = (
+    r"(?:\w+ed|been|done|gone|taken|seen|known|given|written|spoken|chosen|broken|eaten|fallen|driven|"
+    r"risen|begun|drawn|grown|worn|made|said|got|gotten|found|told|thought|brought|bought|caught|taught|"
+    r"built|sent|spent|kept|left|lost|held|sold|paid|met|led|heard|felt|understood|won|put|set|read|hit|cut|"
+    r"shut|let|hurt|cost|become|come|run|hidden|forgotten|stolen|shown|thrown|blown|flown|frozen)"
+)
+_ING_ADJECTIVES = (
+    r"(?:interesting|amazing|boring|exciting|surprising|tiring|disappointing|confusing|annoying|"
+    r"embarrassing|frightening|shocking|relaxing|satisfying|charming|missing|something|nothing|anything|"
+    r"everything|morning|evening|during|spring|thing|king|ring|sing|bring|string|building|ceiling)\b"
+)
+_AUXILIARY = r"(?:do|does|did|have|has|had|is|are|am|was|were|can|could|will|would|should|must|shall|may|might)"
+
+# 语法点：(名称, 别名, 正则, 触发词)；句子中没有任何触发词时不运行正则
+# 别名只收只指这一个语法点的说法（如“情态动词”泛指所有情态动词，不能当作情态动词完成式）
+GRAMMAR_POINTS = {
+    "present_perfect": (
+        "现在完成时", ("present perfect", "现在完成"),
+        # 情态动词 + have done 另算
+        rf"(?<!must )(?<!might )(?<!may )(?<!could )(?<!should )(?<!would )"
+        rf"\b(?:have|has|haven't|hasn't)\s+{_ADVERB}{_PARTICIPLE}\b",
+        {"have", "has", "haven't", "hasn't"},
+    ),
+    "past_perfect": (
+        "过去完成时", ("past perfect", "pluperfect", "过去完成"),
+        rf"\b(?:had|hadn't)\s+{_ADVERB}{_PARTICIPLE}\b",
+        {"had", "hadn't"},
+    ),
+    "progressive": (
+        "进行时", ("progressive", "continuous", "进行时", "进行体"),
+        rf"\b(?:am|is|are|was|were|be|been|'m|'re)\s+{_ADVERB}(?!{_ING_ADJECTIVES})\w+ing\b",
+        {"am", "is", "are", "was", "were", "be", "been", "i'm", "you're", "we're", "they're"},
+    ),
+    "future": (
+        "将来时", ("future", "going to", "将来"),
+        r"\b(?:will|shall|won't)\s+(?:not\s+)?\w+|\b(?:am|is|are|was|were)\s+going\s+to\s+\w+|\w'll\s+\w+",
+        {"will", "shall", "won't", "going", "i'll", "you'll", "he'll", "she'll", "it'll", "we'll", "they'll"},
+    ),
+    "passive": (
+        "被动语态", ("passive", "被动"),
+        rf"\b(?:am|is|are|was|were|be|been|being|get|gets|got)\s+{_ADVERB}{_PARTICIPLE}\b",
+        {"am", "is", "are", "was", "were", "be", "been", "being", "get", "gets", "got"},
+    ),
+    "relative_clause": (
+        "定语从句", ("relative clause", "attributive clause", "定语从句", "关系从句"),
+        r"(?<=[a-z])\s*,?\s+(?:who|whom|whose|which)\s+\w+|\b(?:in|on|at|of|for|with|by|from|to)\s+(?:which|whom)\b",
+        {"who", "whom", "whose", "which"},
+    ),
+    "conditional": (
+        "条件句", ("conditional", "if clause", "条件"),
+        r"\b(?:if|unless|provided\s+that|as\s+long\s+as)\b[^.!?]*"
+        r"\b(?:will|would|could|might|can|should|won't|wouldn't)\b",
+        {"if", "unless", "provided", "long"},
+    ),
+    "subjunctive": (
+        "虚拟语气", ("subjunctive", "虚拟"),
+        r"\bif\s+\w+\s+were\b|\bwish(?:es|ed)?\s+(?:that\s+)?\w+\s+(?:were|had|could|would)\b|"
+        r"\b(?:suggest|insist|demand|require|recommend|order|propose)(?:s|ed)?\s+that\s+\w+\s+(?:should\s+)?be\b|"
+        rf"\bif\s+\w+\s+had\s+(?:not\s+)?{_PARTICIPLE}\b|\bas\s+if\s+\w+\s+were\b|"
+        r"\bit\s+is\s+(?:high\s+)?time\s+\w+\s+\w+ed\b",
+        {"if", "wish", "wishes", "wished", "suggest", "suggested", "insist", "insisted", "demand", "demanded",
+         "require", "required", "recommend", "recommended", "order", "ordered", "propose", "proposed", "time"},
+    ),
+    "inversion": (
+        "倒装句", ("inversion", "inverted", "倒装"),
+        r"^(?:never|seldom|rarely|hardly|scarcely|little|nowhere|no\s+sooner|not\s+only|not\s+until\b[^,]*?,?|"
+        r"only\s+(?:then|when|after|by|in|if|once|through|with)\b[^,]*?,?|under\s+no\s+circumstances|"
+        r"at\s+no\s+time|on\s+no\s+account|in\s+no\s+way|so\s+\w+)"
+        rf"\s+{_AUXILIARY}\s+(?:i|you|he|she|it|we|they|the|this|that|there)\b",
+        {"never", "seldom", "rarely", "hardly", "scarcely", "little", "nowhere", "no", "not", "only", "under",
+         "at", "on", "in", "so"},
+    ),
+    "modal_perfect": (
+        "情态动词完成式", ("modal perfect", "must have", "should have", "情态动词完成"),
+        r"\b(?:must|might|may|could|should|would|can't|couldn't|shouldn't|wouldn't|needn't|mightn't)"
+        rf"\s+(?:not\s+)?have\s+{_PARTICIPLE}\b",
+        {"must", "might", "may", "could", "should", "would", "can't", "couldn't", "shouldn't", "wouldn't",
+         "needn't", "mightn't"},
+    ),
+    "cleft": (
+        "强调句", ("cleft", "emphatic", "it is ... that", "强调"),
+        r"^it\s+(?:is|was)\s+"
+        r"(?!(?:\w+\s+)?(?:important|necessary|possible|impossible|clear|likely|true|said|reported|believed)\b)"
+        r"[^,]+?\s+(?:that|who)\s+\w+",
+        {"it"},
+    ),
+    "comparative": (
+        "比较级", ("comparative", "comparison", "比较"),
+        r"\b(?:\w+er|more\s+\w+|less\s+\w+|better|worse)\s+than\b|\bas\s+\w+\s+as\b",
+        {"than", "as"},
+    ),
+}
+
+_COMPILED = {name: re.compile(pattern, re.IGNORECASE) for name, (_, _, pattern, _) in GRAMMAR_POINTS.items()}
+
+# (offset, sentence, [语法点])
+TaggedSentence = Tuple[int, str, List[str]]
+
+
+def grammar_label(point: str) -> str:
+    return GRAMMAR_POINTS[point][0] if point in GRAMMAR_POINTS else point
+
+
+def points_for(specific_point: Optional[str]) -> List[str]:
+    """Grammar points a user's free-text request refers to (English or Chinese names); may be empty."""
+    text = (specific_point or "").strip().lower()
+    if not text:
+        return []
+    return [name for name, (label, aliases, _, _) in GRAMMAR_POINTS.items()
+            if label in text or name.replace("_", " ") in text or any(alias in text for alias in aliases)]
+
+
+def tag_sentence(sentence: str) -> List[str]:
+    """Grammar points found in one sentence."""
+    words = {word.lower().replace("’", "'") for word in WORD_RE.findall(sentence)}
+    sentence = sentence.replace("’", "'")
+    return [name for name, (_, _, _, triggers) in GRAMMAR_POINTS.items()
+            if not words.isdisjoint(triggers) and _COMPILED[name].search(sentence)]
+
+
+def tag_text(text: str) -> List[TaggedSentence]:
+    """Tag every sentence of a text in one pass; only sentences with at least one point are returned."""
+    tagged = []
+    for offset, sentence in sentence_spans(text):
+        points = tag_sentence(sentence)
+        if points:
+            tagged.append((offset, sentence, points))
+    return tagged
+
+
+def select_sentences(tagged: Iterable[TaggedSentence], points: Iterable[str],
+                     limit: Optional[int] = None) -> List[str]:
+    """Sentences tagged with any of `points`, in text order, without repeats."""
+    points = set(points)
+    selected, seen = [], set()
+    for _, sentence, sentence_points in tagged:
+        if sentence not in seen and not points.isdisjoint(sentence_points):
+            seen.add(sentence)
+            selected.append(sentence)
+            if limit is not None and len(selected) == limit:
+                break
+    return selected
+
+
+def count_points(tagged: Iterable[TaggedSentence]) -> Dict[str, int]:
+    """Number of sentences per grammar point."""
+    counts = {}
+    for _, _, points in tagged:
+        for point in points:
+            counts[point] = counts.get(point, 0) + 1
+    return counts
@@ -0,0 +1,121 @@
+import codecs
+import hashlib
+import os
+import shutil
+from typing import Any, Dict
+
+from chardet.universaldetector import UniversalDetector
+
+from file_utils import FileUtils
+from services.extraction_pool import ExtractionError, get_extraction_pool
+
+CHUNK_SIZE = 1024 * 1024
+# 编码检测最多缓冲的原始字节数，之后按当前最佳猜测解码
+MAX_DETECT_BYTES = 4 * 1024 * 1024
+
+
+class _StreamingTextDecoder:
+    """Detects the encoding of a byte stream and decodes it chunk by chunk.
+
+    Raw bytes are only buffered until the detector is confident (or
+    MAX_DETECT_BYTES have been seen); after that each chunk is decoded as
+    it arrives.
+    """
+
+    def __init__(self):
+        self.detector = UniversalDetector()
+        self.pending = []
+        self.pending_size = 0
+        self.decoder = None
+        self.encoding = None
+        self.parts = []
+
+    def _start_decoding(self):
+        self.detector.close()
+        encoding = self.detector.result.get("encoding") or "utf-8"
+        if encoding.lower() == "ascii":
+            # 开头是纯 ASCII 不代表后面也是
+            encoding = "utf-8"
+        self.encoding = encoding
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        for chunk in self.pending:
+            self.parts.append(self.decoder.decode(chunk))
+        self.pending = []
+
+    def feed(self, chunk: bytes):
+        if self.decoder is not None:
+            self.parts.append(self.decoder.decode(chunk))
+            return
+        self.detector.feed(chunk)
+        self.pending.append(chunk)
+        self.pending_size += len(chunk)
+        if self.detector.done or self.pending_size >= MAX_DETECT_BYTES:
+            self._start_decoding()
+
+    def finish(self) -> str:
+        if self.decoder is None:
+            self._start_decoding()
+        self.parts.append(self.decoder.decode(b"", final=True))
+        return "".join(self.parts)
+
+
+def ingest_file(source_path: str, storage_dir: str, file_id: str, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Copy an uploaded file into storage in a single streaming pass.
+
+    While copying, the SHA-256 content hash and size are computed and text
+    files are encoding-detected and decoded incrementally, so the source is
+    read once and raw bytes in memory are bounded by the chunk size (plus
+    the detection window). Office/PDF text is then extracted from the fresh
+    copy in the supervised extraction pool.
+
+    Returns a dict with stored_path, file_type, file_size, content_hash,
+    content, encoding (the encoding or extraction method) and extracted
+    (False if the text still needs to be extracted later).
+    """
+    file_type = os.path.splitext(source_path)[1]
+    stored_path = os.path.join(storage_dir, file_id + file_type)
+    partial_path = stored_path + ".part"
+
+    is_text = file_type.lower() in FileUtils.TEXT_EXTENSIONS
+    text_decoder = _StreamingTextDecoder() if is_text else None
+    digest = hashlib.sha256()
+    file_size = 0
+
+    try:
+        with open(source_path, "rb") as source, open(partial_path, "wb") as target:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                target.write(chunk)
+                digest.update(chunk)
+                file_size += len(chunk)
+                if text_decoder:
+                    text_decoder.feed(chunk)
+        shutil.copystat(source_path, partial_path)
+        os.replace(partial_path, stored_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    result = {
+        "stored_path": stored_path,
+        "file_type": file_type,
+        "file_size": file_size,
+        "content_hash": digest.hexdigest(),
+        "content": "",
+        "encoding": None,
+        "extracted": True,
+    }
+
+    if text_decoder:
+        result["content"] = text_decoder.finish()
+        result["encoding"] = text_decoder.encoding
+    elif file_type.lower() in FileUtils.SUPERVISED_EXTENSIONS:
+        try:
+            result["content"], _, result["encoding"] = get_extraction_pool().extract(stored_path)
+        except ExtractionError:
+            # 交给后台任务按重试策略再提取
+            result["extracted"] = False
+    return result
@@ -0,0 +1,249 @@
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database.db_manager import DBManager
+
+
+class JobQueue:
+    """Persistent, prioritized background job queue backed by SQLite.
+
+    Jobs live in a `jobs` table of the application database, so pending work
+    survives restarts. A job is identified by (kind, file_id, job_key); the
+    key is normally the digest of the content the job was computed for, which
+    makes enqueueing idempotent and lets a newer version of a document
+    supersede queued work for an older one. Workers claim jobs in priority
+    order, retry failures with exponential backoff and record results.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, db_path: str, workers: int = 2, max_attempts: int = 3,
+                 retry_delay: float = 2.0, poll_interval: float = 1.0):
+        """Initialize the queue; call start() to launch the worker threads."""
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+
+        self._handlers = {}  # kind -> (handler, priority, on_content_change)
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            file_id TEXT NOT NULL,
+            job_key TEXT NOT NULL DEFAULT '',
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_after REAL NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            UNIQUE (kind, file_id, job_key)
+        )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, id)')
+
+    def _connection(self) -> sqlite3.Connection:
+        # 每个线程使用自己的连接；事务由代码显式控制
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _db_manager(self) -> DBManager:
+        """DBManager for the calling thread (SQLite connections are per thread)."""
+        db_manager = getattr(self._local, "db_manager", None)
+        if db_manager is None:
+            db_manager = DBManager(self.db_path)
+            db_manager.add_content_listener(self.content_changed)
+            self._local.db_manager = db_manager
+        return db_manager
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def register(self, kind: str, handler: Callable[[DBManager, str], Any], priority: int = 5,
+                 on_content_change=False):
+        """Register a handler(db_manager, file_id) for a job kind.
+
+        Lower priority values run first. With on_content_change (a bool or a
+        callable returning one) the job is enqueued automatically whenever a
+        file's content is inserted or changed.
+        """
+        self._handlers[kind] = (handler, priority, on_content_change)
+
+    def enqueue(self, kind: str, file_id: str, job_key: str = "", priority: Optional[int] = None) -> bool:
+        """Queue a job; returns False if the same job is already queued or done."""
+        if priority is None:
+            priority = self._handlers[kind][1]
+        now = self._now()
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 同一文件旧版本内容的任务已经没有意义
+            conn.execute('''
+            DELETE FROM jobs
+            WHERE kind = ? AND file_id = ? AND job_key != ? AND status != ?
+            ''', (kind, file_id, job_key, self.RUNNING))
+            cursor = conn.execute('''
+            INSERT OR IGNORE INTO jobs (kind, file_id, job_key, priority, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (kind, file_id, job_key, priority, self.PENDING, now, now))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        added = cursor.rowcount == 1
+        if added:
+            self._wake.set()
+        return added
+
+    def content_changed(self, file_id: str):
+        """Content listener: queue the content-dependent jobs for the new content."""
+        content = self._db_manager().get_file_content(file_id)
+        if content is None:
+            return
+        job_key = DBManager.segment_hash(content)
+        for kind, (_, priority, on_content_change) in self._handlers.items():
+            enabled = on_content_change() if callable(on_content_change) else on_content_change
+            if enabled:
+                self.enqueue(kind, file_id, job_key, priority)
+
+    def _claim(self) -> Optional[Tuple[int, str, str, int]]:
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('''
+            SELECT id, kind, file_id, attempts FROM jobs
+            WHERE status = ? AND run_after <= ?
+            ORDER BY priority, id
+            LIMIT 1
+            ''', (self.PENDING, time.time())).fetchone()
+            if row:
+                conn.execute('''
+                UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ?
+                WHERE id = ?
+                ''', (self.RUNNING, self._now(), row[0]))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return row
+
+    def _finish(self, job_id: int, status: str, result: Optional[str] = None,
+                error: Optional[str] = None, run_after: float = 0):
+        self._connection().execute('''
+        UPDATE jobs SET status = ?, result = ?, error = ?, run_after = ?, updated_at = ?
+        WHERE id = ?
+        ''', (status, result, error, run_after, self._now(), job_id))
+
+    def run_next(self) -> bool:
+        """Claim and run one due job in the calling thread; returns False if none was due."""
+        job = self._claim()
+        if not job:
+            return False
+
+        job_id, kind, file_id, attempts = job
+        attempts += 1
+        try:
+            handler = self._handlers[kind][0]
+            result = handler(self._db_manager(), file_id)
+            if result is not None and not isinstance(result, str):
+                result = json.dumps(result, ensure_ascii=False)
+            self._finish(job_id, self.DONE, result)
+        except Exception as e:
+            if attempts < self.max_attempts:
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                self._finish(job_id, self.PENDING, error=str(e), run_after=time.time() + delay)
+            else:
+                self._finish(job_id, self.FAILED, error=str(e))
+        return True
+
+    def run_pending(self) -> int:
+        """Run every due job in the calling thread; returns the number run."""
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception as e:
+                print(f"Job queue worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Requeue jobs interrupted by a previous shutdown and start the workers."""
+        self._connection().execute('UPDATE jobs SET status = ? WHERE status = ?',
+                                   (self.PENDING, self.RUNNING))
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the workers; a job still running is resumed on the next start."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def retry_failed(self) -> int:
+        """Put failed jobs back in the queue; returns the number requeued."""
+        cursor = self._connection().execute('''
+        UPDATE jobs SET status = ?, attempts = 0, run_after = 0, updated_at = ?
+        WHERE status = ?
+        ''', (self.PENDING, self._now(), self.FAILED))
+        self._wake.set()
+        return cursor.rowcount
+
+    def get_result(self, kind: str, file_id: str, job_key: Optional[str] = None) -> Optional[str]:
+        """Result of the latest finished job of a kind for a file (optionally for a given key)."""
+        query = 'SELECT result FROM jobs WHERE kind = ? AND file_id = ? AND status = ?'
+        params = [kind, file_id, self.DONE]
+        if job_key is not None:
+            query += ' AND job_key = ?'
+            params.append(job_key)
+        row = self._connection().execute(query + ' ORDER BY id DESC LIMIT 1', params).fetchone()
+        return row[0] if row else None
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        rows = self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def list_jobs(self, limit: int = 200) -> List[Tuple]:
+        """Jobs as (id, kind, file_name, status, attempts, updated_at, error), active ones first."""
+        return self._connection().execute('''
+        SELECT j.id, j.kind, COALESCE(f.original_name, j.file_id), j.status, j.attempts, j.updated_at, j.error
+        FROM jobs j
+        LEFT JOIN files f ON f.id = j.file_id
+        ORDER BY CASE j.status WHEN ? THEN 0 WHEN ? THEN 1 WHEN ? THEN 2 ELSE 3 END, j.priority, j.id DESC
+        LIMIT ?
+        ''', (self.RUNNING, self.PENDING, self.FAILED, limit)).fetchall()
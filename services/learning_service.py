@@ -0,0 +1,100 @@
+from datetime import datetime
+
+from database import db_manager as db_module
+from models.progress import UserProgress
+from models.user import User
+from services.review_scheduler import ReviewScheduler
+
+
+class LearningService:
+    """Vocabulary learning logic: recommendations, answers and level progression.
+
+    All data access goes through DBManager, so recommending unseen words is a
+    single indexed query instead of filtering word lists in Python.
+    """
+
+    RECOMMEND_LIMIT = 20
+    # 答对多少次进入复习阶段 / 视为掌握（同时要求正确率）
+    REVIEWING_AFTER = 3
+    MASTERED_AFTER = 5
+    MASTERED_RATIO = 0.8
+    WORDS_PER_LEVEL = 50  # 每掌握多少个单词升一级
+
+    def __init__(self, db_manager=None):
+        self._db_manager = db_manager
+        self._schedulers = {}
+
+    @property
+    def db(self):
+        """The database manager, opened on first use if none was given."""
+        if self._db_manager is None:
+            self._db_manager = db_module.DatabaseManager()
+        return self._db_manager
+
+    def recommend_words_for_user(self, user, limit=RECOMMEND_LIMIT):
+        """Words at the user's level that the user has not studied yet."""
+        return self.db.get_words_by_difficulty(user.level, exclude_user_id=user.id, limit=limit)
+
+    def next_status(self, progress):
+        """Learning status after an answer, from the updated attempt counts."""
+        if progress.correct_attempts >= self.MASTERED_AFTER and progress.correct_ratio() >= self.MASTERED_RATIO:
+            return "mastered"
+        if progress.correct_attempts >= self.REVIEWING_AFTER:
+            return "reviewing"
+        return "learning"
+
+    def process_word_answer(self, user_id, word_id, is_correct):
+        """Record an answer to a word and update its status; returns True if saved."""
+        row = self.db.get_user_progress(user_id, word_id)
+        progress = UserProgress.from_dict(row) if row else UserProgress(user_id=user_id, word_id=word_id)
+
+        progress.attempts += 1
+        if is_correct:
+            progress.correct_attempts += 1
+        progress.status = self.next_status(progress)
+        progress.last_reviewed = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        saved = bool(self.db.update_user_progress(user_id, word_id, progress.status, progress.attempts,
+                                                  progress.correct_attempts, progress.last_reviewed))
+        # 复习队列是分页载入的，不会看到这里写入的行
+        scheduler = self._schedulers.get(user_id)
+        if scheduler is not None:
+            scheduler.invalidate()
+        return saved
+
+    def check_and_update_user_level(self, user_id):
+        """Raise the user's level according to the number of mastered words; returns True if it changed."""
+        user = self.db.get_user(user_id)
+        if not user:
+            return False
+
+        mastered = self.db.count_user_words_by_status(user_id, "mastered")
+        level = min(User.MAX_LEVEL, 1 + mastered // self.WORDS_PER_LEVEL)
+        if level <= user["level"]:
+            return False
+        return bool(self.db.update_user_level(user_id, level))
+
+    def get_review_scheduler(self, user_id):
+        """The user's review queue, kept across calls so later reviews reuse the loaded cards."""
+        scheduler = self._schedulers.get(user_id)
+        if scheduler is None:
+            scheduler = self._schedulers[user_id] = ReviewScheduler(self.db, user_id, status_for=self.next_status)
+        return scheduler
+
+    def get_due_words(self, user_id, count=10):
+        """Words due for review now, earliest first."""
+        return self.get_review_scheduler(user_id).due_cards(count)
+
+    def review_word(self, user_id, word_id, quality):
+        """Record a review answer (SM-2 quality 0-5) and schedule the next review; returns the card."""
+        return self.get_review_scheduler(user_id).answer(word_id, quality)
+
+    def generate_learning_session(self, user_id, review_count=10, new_count=10):
+        """Words for one session: words still being learned first, then new words at the user's level."""
+        review_words = self.db.get_user_words(user_id, "learning")[:review_count]
+
+        user = self.db.get_user(user_id)
+        level = user["level"] if user else User.MIN_LEVEL
+        new_words = self.db.get_words_by_difficulty(level, exclude_user_id=user_id, limit=new_count)
+
+        return review_words + new_words
@@ -5,10 +5,21 @@ from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 import hashlib
 import sqlite3
+import time
+
+from services.passage_retriever import PassageRetriever, estimate_tokens
+from services.quiz_bank import QuizFormatError, parse_quiz_response
 
 class LLMProcessor:
     """Service for processing files using DeepSeek LLM API."""
     
+    # 固定不变的系统提示词：所有请求共享同一前缀，便于服务端前缀缓存命中
+    SYSTEM_PROMPT = (
+        "You are an AI assistant specialized in analyzing English learning materials. "
+        "You'll be provided with document content and metadata, and a query about the document. "
+        "Provide clear, accurate responses focused on helping users understand and learn English effectively."
+    )
+    
     def __init__(self, api_key: Optional[str] = None, cache_db: str = "llm_cache.db"):
         """Initialize the LLM processor with API credentials."""
         self.api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
@@ -26,6 +37,11 @@ class LLMProcessor:
         
         self.current_model = self.models["chat"]  # Default model
         
+        # Retrieval settings for answer_query: only relevant passages are sent
+        self.retriever = PassageRetriever()
+        self.context_token_budget = 2000
+        self.retrieval_top_k = 6
+        
         # Initialize cache
         self.cache_db = cache_db
         self._init_cache()
@@ -38,6 +54,17 @@ class LLMProcessor:
                     (query_hash TEXT PRIMARY KEY,
                      response TEXT,
                      timestamp DATETIME)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS usage_log
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     timestamp DATETIME,
+                     model TEXT,
+                     purpose TEXT,
+                     local_cache_hit INTEGER,
+                     prompt_tokens INTEGER,
+                     completion_tokens INTEGER,
+                     prompt_cache_hit_tokens INTEGER,
+                     prompt_cache_miss_tokens INTEGER,
+                     latency_ms INTEGER)''')
         conn.commit()
         conn.close()
     
@@ -63,6 +90,14 @@ class LLMProcessor:
                 return response
         return None
     
+    def _evict_cached_response(self, cache_key: str):
+        """Drop a cached response (e.g. one that failed validation)."""
+        conn = sqlite3.connect(self.cache_db)
+        c = conn.cursor()
+        c.execute('DELETE FROM response_cache WHERE query_hash = ?', (cache_key,))
+        conn.commit()
+        conn.close()
+    
     def _cache_response(self, cache_key: str, response: str):
         """Cache a response."""
         conn = sqlite3.connect(self.cache_db)
@@ -74,6 +109,66 @@ class LLMProcessor:
         conn.commit()
         conn.close()
 
+    def _record_usage(self, purpose: str, usage: Optional[Dict[str, Any]], latency_ms: int,
+                      local_cache_hit: bool = False):
+        """Record token usage (including provider prefix-cache hits) for one call."""
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        hit_tokens = usage.get("prompt_cache_hit_tokens")
+        if hit_tokens is None:
+            # OpenAI 兼容格式
+            hit_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        miss_tokens = usage.get("prompt_cache_miss_tokens", prompt_tokens - hit_tokens)
+        
+        conn = sqlite3.connect(self.cache_db)
+        c = conn.cursor()
+        c.execute('''INSERT INTO usage_log
+                    (timestamp, model, purpose, local_cache_hit, prompt_tokens, completion_tokens,
+                     prompt_cache_hit_tokens, prompt_cache_miss_tokens, latency_ms)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                 (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), self.current_model, purpose,
+                  int(local_cache_hit), prompt_tokens, usage.get("completion_tokens", 0),
+                  hit_tokens, miss_tokens, latency_ms))
+        conn.commit()
+        conn.close()
+    
+    def get_usage_summary(self) -> Dict[str, Any]:
+        """Summarize recorded usage: calls, tokens and prefix-cache hit rate."""
+        conn = sqlite3.connect(self.cache_db)
+        c = conn.cursor()
+        c.execute('''SELECT COUNT(*), COALESCE(SUM(local_cache_hit), 0),
+                           COALESCE(SUM(prompt_tokens), 0), COALESCE(SUM(completion_tokens), 0),
+                           COALESCE(SUM(prompt_cache_hit_tokens), 0), COALESCE(SUM(prompt_cache_miss_tokens), 0),
+                           COALESCE(AVG(CASE WHEN local_cache_hit = 0 THEN latency_ms END), 0)
+                    FROM usage_log''')
+        calls, local_hits, prompt, completion, hit, miss, latency = c.fetchone()
+        conn.close()
+        
+        return {
+            "calls": calls,
+            "local_cache_hits": local_hits,
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "prompt_cache_hit_tokens": hit,
+            "prompt_cache_miss_tokens": miss,
+            "prompt_cache_hit_rate": hit / (hit + miss) if hit + miss else 0.0,
+            "avg_latency_ms": int(latency),
+        }
+    
+    def build_messages(self, content: str, metadata: str, query: str) -> List[Dict[str, str]]:
+        """Build chat messages with a stable prefix.
+        
+        The system prompt and the document (content, then metadata) come
+        first and are byte-identical for every query about the same document;
+        the variable query is sent last in its own message.
+        """
+        document_message = f"Document content:\n{content}\n\nDocument metadata:\n{metadata}"
+        return [
+            {"role": "system", "content": self.SYSTEM_PROMPT},
+            {"role": "user", "content": document_message},
+            {"role": "user", "content": f"Query: {query}"}
+        ]
+
     def set_model(self, model_type: str) -> bool:
         """Set the model type to use (chat or reasoner)."""
         if model_type in self.models:
@@ -81,12 +176,18 @@ class LLMProcessor:
             return True
         return False
     
-    def process_file_content(self, content: str, metadata: str, query: str) -> Dict[str, Any]:
-        """Process file content with the DeepSeek API."""
+    def process_file_content(self, content: str, metadata: str, query: str,
+                             purpose: str = "query",
+                             response_format: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Process file content with the DeepSeek API.
+        
+        `response_format={"type": "json_object"}` requests JSON output.
+        """
         # Check cache first
         cache_key = self._get_cache_key(content, metadata, query)
         cached_response = self._get_cached_response(cache_key)
         if cached_response:
+            self._record_usage(purpose, None, 0, local_cache_hit=True)
             return {"choices": [{"message": {"content": cached_response}}]}
 
         headers = {
@@ -94,25 +195,17 @@ class LLMProcessor:
             "Authorization": f"Bearer {self.api_key}"
         }
         
-        system_prompt = (
-            "You are an AI assistant specialized in analyzing English learning materials. "
-            "You'll be provided with document content and metadata, and a query about the document. "
-            "Provide clear, accurate responses focused on helping users understand and learn English effectively."
-        )
-        
-        user_message = f"Document content:\n{content}\n\nDocument metadata:\n{metadata}\n\nQuery: {query}"
-        
         payload = {
             "model": self.current_model,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
+            "messages": self.build_messages(content, metadata, query),
             "temperature": 0.7,
             "max_tokens": 1000
         }
+        if response_format:
+            payload["response_format"] = response_format
         
         try:
+            started = time.monotonic()
             response = requests.post(
                 f"{self.base_url}{self.chat_endpoint}", 
                 headers=headers, 
@@ -121,6 +214,8 @@ class LLMProcessor:
             )
             response.raise_for_status()
             api_response = response.json()
+            self._record_usage(purpose, api_response.get("usage"),
+                               int((time.monotonic() - started) * 1000))
             
             # Cache successful response
             if "choices" in api_response and len(api_response["choices"]) > 0:
@@ -156,14 +251,29 @@ class LLMProcessor:
             "Please provide a comprehensive summary of this English learning material. "
             "Focus on key vocabulary, grammar points, and main learning objectives."
         )
-        api_response = self.process_file_content(content, metadata, query)
+        api_response = self.process_file_content(content, metadata, query, purpose="summary")
         return self.extract_response(api_response)
     
-    def answer_query(self, content: str, metadata: str, query: str) -> str:
-        """Answer a specific query about a document using the LLM."""
-        api_response = self.process_file_content(content, metadata, query)
+    def answer_query(self, content: str, metadata: str, query: str, file_id: Optional[str] = None) -> str:
+        """Answer a specific query about a document using the LLM.
+        
+        Documents larger than the context token budget are reduced to the
+        passages most relevant to the query before being sent.
+        """
+        api_response = self.process_file_content(self.build_query_context(content, query, file_id), metadata, query)
         return self.extract_response(api_response)
     
+    def build_query_context(self, content: str, query: str, file_id: Optional[str] = None) -> str:
+        """Select the part of a document to send with a query."""
+        if estimate_tokens(content) <= self.context_token_budget:
+            return content
+        
+        passages = self.retriever.retrieve(
+            content, query, file_id=file_id,
+            top_k=self.retrieval_top_k, token_budget=self.context_token_budget
+        )
+        return "\n\n[...]\n\n".join(text for _, text in passages)
+    
     def analyze_difficulty(self, content: str) -> str:
         """Analyze the difficulty level of the English content."""
         query = (
@@ -171,25 +281,79 @@ class LLMProcessor:
             "Consider vocabulary, grammar complexity, and overall comprehension level. "
             "Provide a CEFR level estimation and explanation."
         )
-        api_response = self.process_file_content(content, "", query)
+        api_response = self.process_file_content(content, "", query, purpose="difficulty")
+        return self.extract_response(api_response)
+    
+    def explain_difficulty(self, content: str, estimate: str) -> str:
+        """Explain a locally computed difficulty estimate in plain language."""
+        query = (
+            "A local analyzer produced the following difficulty estimate for this English content:\n"
+            f"{estimate}\n"
+            "Without re-estimating the level, explain to a learner what makes this text easier or harder "
+            "(vocabulary, sentence structure, grammar) and suggest how to study it."
+        )
+        api_response = self.process_file_content(content, "", query, purpose="difficulty_explanation")
         return self.extract_response(api_response)
     
-    def generate_quiz(self, content: str) -> str:
-        """Generate quiz questions based on the content."""
+    def explain_quiz(self, content: str, quiz: str) -> str:
+        """Explain the answers of locally generated exercises."""
         query = (
-            "Please create 5 quiz questions based on this content. "
-            "Include a mix of multiple choice and open-ended questions. "
-            "Provide answers separately."
+            "A local generator produced the following exercises (with answers) from this English content:\n"
+            f"{quiz}\n"
+            "Without changing the questions or answers, briefly explain for each one why the answer is correct, "
+            "the meaning of the word in context, and any grammar involved."
         )
-        api_response = self.process_file_content(content, "", query)
+        api_response = self.process_file_content(content, "", query, purpose="quiz_explanation")
         return self.extract_response(api_response)
     
-    def explain_grammar(self, content: str, specific_point: Optional[str] = None) -> str:
-        """Explain grammar points in the content."""
+    def generate_quiz(self, content: str, count: int = 5) -> List[Dict[str, Any]]:
+        """Generate quiz questions as validated items (see services.quiz_bank for the schema).
+        
+        Uses JSON mode; raises QuizFormatError if no valid question comes
+        back (the response is then not kept in the cache) and RuntimeError
+        if the request fails.
+        """
         query = (
-            f"Please explain the grammar points in this content"
-            f"{' focusing on ' + specific_point if specific_point else ''}. "
-            "Provide clear explanations and examples."
+            f"Please create {count} quiz questions based on this content, mixing multiple choice and "
+            "open-ended questions on vocabulary, grammar and reading comprehension. "
+            'Reply with a JSON object of the form {"questions": [{"type": "choice" or "open", '
+            '"skill": "vocabulary", "grammar" or "reading", "difficulty": integer 1-5, '
+            '"question": string, "options": list of strings (choice only; must contain the answer), '
+            '"answer": string, "explanation": string}]}.'
         )
-        api_response = self.process_file_content(content, "", query)
+        api_response = self.process_file_content(content, "", query, purpose="quiz",
+                                                  response_format={"type": "json_object"})
+        text = self.extract_response(api_response)
+        if "error" in api_response:
+            raise RuntimeError(text)
+        
+        try:
+            items, _ = parse_quiz_response(text)
+        except QuizFormatError:
+            self._evict_cached_response(self._get_cache_key(content, "", query))
+            raise
+        return items
+    
+    def explain_grammar(self, content: str, specific_point: Optional[str] = None,
+                        sentences: Optional[List[str]] = None) -> str:
+        """Explain grammar points in the content.
+        
+        With `sentences` (e.g. those a local detector flagged for
+        `specific_point`), only those sentences are sent instead of the
+        whole content.
+        """
+        if sentences:
+            content = "\n".join(f"{number}. {sentence}" for number, sentence in enumerate(sentences, 1))
+            query = (
+                "These numbered sentences were selected from a longer text because they appear to use "
+                f"{specific_point or 'notable grammar'}. For each sentence, point out where and how it is used "
+                "(say so if a sentence does not actually use it), then summarize the rule with clear examples."
+            )
+        else:
+            query = (
+                f"Please explain the grammar points in this content"
+                f"{' focusing on ' + specific_point if specific_point else ''}. "
+                "Provide clear explanations and examples."
+            )
+        api_response = self.process_file_content(content, "", query, purpose="grammar")
         return self.extract_response(api_response)
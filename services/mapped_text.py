@@ -0,0 +1,96 @@
+import codecs
+import mmap
+import os
+from typing import List, Optional
+
+import numpy as np
+from chardet.universaldetector import UniversalDetector
+
+INDEX_CHUNK_SIZE = 8 * 1024 * 1024
+DETECT_BYTES = 64 * 1024
+
+
+def detect_file_encoding(file_path: str, max_bytes: int = DETECT_BYTES) -> str:
+    """Guess a file's encoding from its first bytes."""
+    detector = UniversalDetector()
+    with open(file_path, 'rb') as f:
+        detector.feed(f.read(max_bytes))
+    detector.close()
+    encoding = detector.result.get('encoding') or 'utf-8'
+    return 'utf-8' if encoding.lower() == 'ascii' else encoding
+
+
+class TextLines:
+    """Line access over an in-memory string, with the same interface as MappedTextFile."""
+
+    def __init__(self, text: str):
+        self.lines = text.split('\n')
+
+    @property
+    def line_count(self) -> int:
+        return len(self.lines)
+
+    def get_lines(self, start: int, count: int) -> List[str]:
+        return self.lines[start:start + count]
+
+    def close(self):
+        pass
+
+
+class MappedTextFile:
+    """Random access to the lines of a large text file through mmap.
+
+    The file is scanned once, in chunks, to build an index of line start
+    offsets; after that any window of lines is decoded straight from the
+    mapping, so memory use does not depend on the file size. Works for
+    ASCII-compatible encodings (UTF-8, GBK/GB18030, Latin-1...), where a
+    newline byte always means a newline.
+    """
+
+    def __init__(self, file_path: str, encoding: Optional[str] = None):
+        """Map the file and build its line index."""
+        self.file_path = file_path
+        self.encoding = encoding or detect_file_encoding(file_path)
+        if codecs.lookup(self.encoding).name.startswith(('utf-16', 'utf-32')):
+            raise ValueError(f"不支持按行映射的编码: {self.encoding}")
+
+        self._file = open(file_path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        self.offsets = self._build_index()
+
+    def _build_index(self) -> np.ndarray:
+        # offsets[i] 是第 i 行的起始字节；最后一项是文件末尾
+        starts = [np.zeros(1, dtype=np.int64)]
+        for chunk_start in range(0, self.size, INDEX_CHUNK_SIZE):
+            chunk = np.frombuffer(self._map, dtype=np.uint8,
+                                  count=min(INDEX_CHUNK_SIZE, self.size - chunk_start), offset=chunk_start)
+            starts.append(np.flatnonzero(chunk == 0x0A).astype(np.int64) + chunk_start + 1)
+            del chunk
+        offsets = np.concatenate(starts)
+        if offsets[-1] != self.size:
+            offsets = np.append(offsets, self.size)
+        return offsets
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def get_lines(self, start: int, count: int) -> List[str]:
+        """Decode `count` lines starting at line `start` (0-based)."""
+        start = max(0, min(start, self.line_count))
+        end = max(start, min(start + count, self.line_count))
+        if start == end:
+            return []
+        data = self._map[self.offsets[start]:self.offsets[end]]
+        text = data.decode(self.encoding, errors='replace')
+        if text.endswith('\n'):
+            text = text[:-1]
+        return [line.rstrip('\r') for line in text.split('\n')]
+
+    def close(self):
+        """Release the mapping and the file handle."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
@@ -0,0 +1,285 @@
+import hashlib
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.exam_sections import ExamSectionIndex
+from services.passage_retriever import CJK_RE
+from services.quiz_bank import QuizBank
+from services.sentence_index import SentenceIndex
+from services.text_processing import WORD_RE
+from services.vector_index import get_vector_index
+from services.vocabulary_index import VocabularyIndex
+
+NUM_PERMUTATIONS = 128
+BANDS = 32  # 32 段 × 4 行：相似度 0.7 的文件几乎必然落入同一个桶
+SHINGLE_SIZE = 3
+MIN_SHINGLES = 10  # 太短的文本（如未识别出文字的图片）不参与查重
+DEFAULT_THRESHOLD = 0.7
+
+_PRIME = 4294967291  # 小于 2**32 的最大素数
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERMUTATIONS, dtype=np.uint64)
+_CHUNK = 8192
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Distinct 32-bit hashes of the word `size`-grams of a text.
+
+    Words are lowercased and CJK characters count as words, so the same
+    paper extracted from .doc, .docx or OCR yields largely the same set
+    regardless of layout, punctuation and line breaks.
+    """
+    tokens = [match.group().lower() for match in WORD_RE.finditer(text)]
+    tokens += [char for run in CJK_RE.findall(text) for char in run]
+    if len(tokens) < size:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = {zlib.crc32(" ".join(tokens[i:i + size]).encode("utf-8")) for i in range(len(tokens) - size + 1)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """MinHash signature (NUM_PERMUTATIONS uint32 values) of a set of shingle hashes."""
+    signature = np.full(NUM_PERMUTATIONS, _PRIME, dtype=np.uint64)
+    hashes = hashes % _PRIME
+    for start in range(0, len(hashes), _CHUNK):
+        chunk = hashes[start:start + _CHUNK]
+        permuted = (_A[:, None] * chunk[None, :] + _B[:, None]) % _PRIME
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(first == second)) / len(first)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """LSH bucket keys of a signature, one per band (the band number is part of the key)."""
+    rows = len(signature) // BANDS
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(bytes([band]) + signature[band * rows:(band + 1) * rows].tobytes(),
+                                 digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+class DuplicateIndex:
+    """Near-duplicate detection over the library with MinHash and LSH.
+
+    Each document's word 3-gram set is summarized by a 128-value MinHash
+    signature; the signature is cut into 32 bands whose hashes are stored
+    as bucket keys, so candidates for a new document are found with one
+    indexed lookup instead of comparing against every file. Candidates are
+    confirmed with the estimated Jaccard similarity. A document that
+    duplicates an earlier one records it as its original, which the
+    background jobs use to reuse results instead of repeating work.
+    """
+
+    def __init__(self, db_manager):
+        """Initialize the index on the application's database."""
+        self.db_manager = db_manager
+        self.conn = db_manager.conn
+        self._init_tables()
+
+    def _init_tables(self):
+        """Create the signature and bucket tables."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS minhash_signatures (
+            file_id TEXT PRIMARY KEY,
+            content_digest TEXT NOT NULL,
+            signature BLOB,
+            duplicate_of TEXT,
+            similarity REAL
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS minhash_buckets (
+            bucket INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            PRIMARY KEY (bucket, file_id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_minhash_buckets_file ON minhash_buckets (file_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_minhash_duplicate_of ON minhash_signatures (duplicate_of)')
+        self.conn.commit()
+
+    def _signature(self, file_id: str) -> Optional[np.ndarray]:
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT signature FROM minhash_signatures WHERE file_id = ?', (file_id,))
+        row = cursor.fetchone()
+        return np.frombuffer(row[0], dtype=np.uint32) if row and row[0] else None
+
+    def _candidates(self, keys: List[int], exclude_file_id: str) -> Dict[str, np.ndarray]:
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT s.file_id, s.signature FROM minhash_signatures s
+        WHERE s.file_id IN (
+            SELECT file_id FROM minhash_buckets WHERE bucket IN ({",".join("?" * len(keys))})
+        ) AND s.file_id != ?
+        ''', keys + [exclude_file_id])
+        return {file_id: np.frombuffer(signature, dtype=np.uint32) for file_id, signature in cursor}
+
+    def _matches(self, signature: np.ndarray, file_id: str, threshold: float) -> List[Tuple[str, float]]:
+        matches = []
+        for other_id, other in self._candidates(band_keys(signature), file_id).items():
+            score = similarity(signature, other)
+            if score >= threshold:
+                matches.append((other_id, score))
+        matches.sort(key=lambda match: (-match[1], match[0]))
+        return matches
+
+    def _remove(self, cursor, file_id: str):
+        cursor.execute('DELETE FROM minhash_buckets WHERE file_id = ?', (file_id,))
+        cursor.execute('DELETE FROM minhash_signatures WHERE file_id = ?', (file_id,))
+
+    def add_document(self, file_id: str, content: Optional[str] = None,
+                     threshold: float = DEFAULT_THRESHOLD) -> Optional[Tuple[str, float]]:
+        """Sign a document and return (original_id, similarity) if it near-duplicates an earlier file.
+
+        Unchanged content is not signed again; the stored result is returned.
+        """
+        if content is None:
+            content = self.db_manager.get_file_content(file_id)
+            if content is None:
+                return None
+
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT content_digest, duplicate_of, similarity FROM minhash_signatures WHERE file_id = ?',
+                       (file_id,))
+        row = cursor.fetchone()
+        if row and row[0] == digest:
+            return (row[1], row[2]) if row[1] else None
+
+        hashes = shingles(content)
+        signature = minhash(hashes) if len(hashes) >= MIN_SHINGLES else None
+        original = None
+        if signature is not None:
+            for other_id, score in self._matches(signature, file_id, threshold):
+                # 指向最早的那份，而不是另一份副本
+                cursor.execute('SELECT duplicate_of FROM minhash_signatures WHERE file_id = ?', (other_id,))
+                other_original = cursor.fetchone()[0]
+                if other_original != file_id:
+                    original = (other_original or other_id, score)
+                    break
+
+        with self.conn:
+            self._remove(cursor, file_id)
+            cursor.execute('''
+            INSERT INTO minhash_signatures (file_id, content_digest, signature, duplicate_of, similarity)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (file_id, digest, signature.tobytes() if signature is not None else None,
+                  original[0] if original else None, original[1] if original else None))
+            if signature is not None:
+                cursor.executemany('INSERT OR IGNORE INTO minhash_buckets (bucket, file_id) VALUES (?, ?)',
+                                   ((key, file_id) for key in band_keys(signature)))
+        return original
+
+    def original_of(self, file_id: str) -> Optional[str]:
+        """The earlier file this one near-duplicates, if any."""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT duplicate_of FROM minhash_signatures WHERE file_id = ?', (file_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def find_duplicates(self, file_id: str, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+        """Indexed files near-duplicating `file_id`, as (file_id, similarity), most similar first."""
+        signature = self._signature(file_id)
+        return [] if signature is None else self._matches(signature, file_id, threshold)
+
+    def report(self, threshold: float = DEFAULT_THRESHOLD) -> List[List[Tuple[str, float]]]:
+        """Groups of near-duplicate files.
+
+        Each group lists the file to keep first (the earliest upload) with
+        similarity 1.0, followed by its duplicates and their similarity to it.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT GROUP_CONCAT(file_id, char(31)) FROM minhash_buckets
+        GROUP BY bucket HAVING COUNT(*) > 1
+        ''')
+        pairs = set()
+        for (files,) in cursor.fetchall():
+            files = sorted(files.split("\x1f"))
+            pairs.update((a, b) for i, a in enumerate(files) for b in files[i + 1:])
+        if not pairs:
+            return []
+
+        signatures = {}
+        parent = {}
+
+        def find(file_id):
+            while parent.setdefault(file_id, file_id) != file_id:
+                parent[file_id] = parent[parent[file_id]]
+                file_id = parent[file_id]
+            return file_id
+
+        for a, b in pairs:
+            for file_id in (a, b):
+                if file_id not in signatures:
+                    signatures[file_id] = self._signature(file_id)
+            if similarity(signatures[a], signatures[b]) >= threshold:
+                parent[find(a)] = find(b)
+
+        groups = {}
+        for file_id in parent:
+            groups.setdefault(find(file_id), []).append(file_id)
+
+        cursor.execute('SELECT id, upload_date FROM files')
+        uploaded = dict(cursor.fetchall())
+        report = []
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            members.sort(key=lambda file_id: (uploaded.get(file_id) or "", file_id))
+            keep = members[0]
+            report.append([(keep, 1.0)] + [(file_id, similarity(signatures[keep], signatures[file_id]))
+                                           for file_id in members[1:]])
+        report.sort(key=lambda group: (uploaded.get(group[0][0]) or "", group[0][0]))
+        return report
+
+    def remove_document(self, file_id: str):
+        """Remove a document's signature; files that pointed to it as their original are released."""
+        with self.conn:
+            cursor = self.conn.cursor()
+            self._remove(cursor, file_id)
+            cursor.execute('''
+            UPDATE minhash_signatures SET duplicate_of = NULL, similarity = NULL, content_digest = ''
+            WHERE duplicate_of = ?
+            ''', (file_id,))
+
+    def merge(self, keep_id: str, duplicate_ids: List[str], remove_stored: bool = True) -> int:
+        """Keep one file of a duplicate group and delete the others.
+
+        The duplicates' records, indexes, quiz items and (with remove_stored)
+        stored files are removed. Returns the number of files deleted.
+        """
+        merged = 0
+        vocabulary = VocabularyIndex(self.db_manager)
+        sentences = SentenceIndex(self.db_manager)
+        exam_sections = ExamSectionIndex(self.db_manager)
+        quiz_bank = QuizBank(self.db_manager)
+        for file_id in duplicate_ids:
+            if file_id == keep_id:
+                continue
+            vocabulary.remove_document(file_id)
+            sentences.remove_document(file_id)
+            exam_sections.remove_document(file_id)
+            get_vector_index(self.db_manager.db_path).remove_document(file_id)
+            quiz_bank.remove_file(file_id)
+            self.remove_document(file_id)
+            stored_path = self.db_manager.delete_file(file_id)
+            if stored_path is None:
+                continue
+            merged += 1
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT 1 FROM files WHERE stored_path = ? LIMIT 1', (stored_path,))
+            if remove_stored and cursor.fetchone() is None and os.path.isfile(stored_path):
+                os.remove(stored_path)
+        return merged
@@ -0,0 +1,167 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional, Tuple
+
+from services.text_processing import FUNCTION_WORDS, WORD_RE, lemmatize
+
+CJK_RE = re.compile(r'[一-鿿]+')
+NUMBER_RE = re.compile(r'\d+')
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 characters per token for Latin text, 1 per CJK character."""
+    cjk = sum(len(run) for run in CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def search_terms(text: str) -> List[str]:
+    """Terms used for ranking: English lemmas, CJK bigrams and numbers (question numbers)."""
+    terms = []
+    for match in WORD_RE.finditer(text):
+        word = match.group().lower().replace("’", "'")
+        if word not in FUNCTION_WORDS:
+            terms.append(lemmatize(word))
+    for run in CJK_RE.findall(text):
+        if len(run) == 1:
+            terms.append(run)
+        terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+    terms.extend(NUMBER_RE.findall(text))
+    return terms
+
+
+def split_passages(content: str, max_chars: int = 800) -> List[Tuple[int, str]]:
+    """Split content into (start_offset, passage) pairs of at most about max_chars.
+
+    Consecutive lines are merged until the limit; a blank line always starts
+    a new passage if the current one is already reasonably long.
+    """
+    passages = []
+    current_start, current_lines, current_len = None, [], 0
+
+    def flush():
+        nonlocal current_start, current_lines, current_len
+        if current_lines:
+            passages.append((current_start, "\n".join(current_lines)))
+        current_start, current_lines, current_len = None, [], 0
+
+    for match in re.finditer(r'[^\n]*\n?', content or ""):
+        line = match.group().rstrip("\n")
+        stripped = line.strip()
+        if not stripped:
+            if current_len >= max_chars // 2:
+                flush()
+            continue
+        if current_len + len(stripped) > max_chars:
+            flush()
+        if current_start is None:
+            current_start = match.start()
+        # 超长的单行按长度切开
+        while len(stripped) > max_chars:
+            current_lines.append(stripped[:max_chars])
+            current_len += max_chars
+            flush()
+            current_start = match.start()
+            stripped = stripped[max_chars:]
+        current_lines.append(stripped)
+        current_len += len(stripped) + 1  # 包括合并时的换行符
+    flush()
+    return passages
+
+
+class BM25Index:
+    """Okapi BM25 ranking over the passages of one document."""
+
+    def __init__(self, passages: List[Tuple[int, str]], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(search_terms(text)) for _, text in passages]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def rank(self, query: str) -> List[Tuple[float, int]]:
+        """Return (score, passage_index) pairs for passages matching the query, best first."""
+        query_terms = set(search_terms(query))
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+            score = 0.0
+            for term in query_terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((score, i))
+        scores.sort(key=lambda item: (-item[0], item[1]))
+        return scores
+
+
+class PassageRetriever:
+    """Selects the passages of a document most relevant to a question.
+
+    Passage indexes are cached per file (or per content digest when no file
+    id is given) and rebuilt only when the content changes.
+    """
+
+    def __init__(self, passage_chars: int = 800, cache_size: int = 32):
+        """Initialize the retriever."""
+        self.passage_chars = passage_chars
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # key -> (digest, BM25Index)
+        self._lock = threading.Lock()
+
+    def get_index(self, content: str, file_id: Optional[str] = None) -> BM25Index:
+        """Get the cached passage index for content, building it if needed."""
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        key = file_id or digest
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == digest:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        index = BM25Index(split_passages(content, self.passage_chars))
+        with self._lock:
+            self._cache[key] = (digest, index)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return index
+
+    def invalidate(self, file_id: str):
+        """Drop the cached index of a file (its content changed)."""
+        with self._lock:
+            self._cache.pop(file_id, None)
+
+    def retrieve(self, content: str, query: str, file_id: Optional[str] = None,
+                 top_k: int = 6, token_budget: int = 2000) -> List[Tuple[int, str]]:
+        """Pick up to top_k relevant passages that fit the token budget, in document order."""
+        index = self.get_index(content, file_id)
+        selected, used = [], 0
+        for _, i in index.rank(query):
+            if len(selected) >= top_k:
+                break
+            tokens = estimate_tokens(index.passages[i][1])
+            if used + tokens > token_budget:
+                continue
+            selected.append(i)
+            used += tokens
+
+        if not selected and index.passages:
+            # 没有命中任何词时，退回到文档开头
+            for i, (_, text) in enumerate(index.passages):
+                tokens = estimate_tokens(text)
+                if selected and used + tokens > token_budget:
+                    break
+                selected.append(i)
+                used += tokens
+
+        return [index.passages[i] for i in sorted(selected)]
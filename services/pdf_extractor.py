@@ -0,0 +1,28 @@
+from typing import Optional, Tuple
+
+
+def extract_pdf_text(file_path: str, max_chars: Optional[int] = None) -> Tuple[str, bool, str]:
+    """Extract PDF text page by page, stopping once max_chars is reached.
+
+    Uses PyPDF2 and falls back to pdfminer when PyPDF2 cannot read the file.
+    Returns (text, truncated, method).
+    """
+    try:
+        import PyPDF2
+        with open(file_path, 'rb') as file:
+            reader = PyPDF2.PdfReader(file)
+            pages = []
+            length = 0
+            for page in reader.pages:
+                text = page.extract_text() or ''
+                pages.append(text)
+                length += len(text) + 1
+                if max_chars and length >= max_chars:
+                    return '\n'.join(pages)[:max_chars], True, "PDF文档 (PyPDF2)"
+            return '\n'.join(pages), False, "PDF文档 (PyPDF2)"
+    except Exception:
+        from pdfminer.high_level import extract_text
+        content = extract_text(file_path)
+        if max_chars and len(content) > max_chars:
+            return content[:max_chars], True, "PDF文档 (pdfminer)"
+        return content, False, "PDF文档 (pdfminer)"
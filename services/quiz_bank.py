@@ -0,0 +1,227 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+QUESTION_TYPES = ("cloze", "choice", "word_form", "open")
+SKILLS = ("vocabulary", "grammar", "reading")
+SKILL_LABELS = {"vocabulary": "词汇", "grammar": "语法", "reading": "阅读理解"}
+# 本地生成的题目没有 skill 字段时按题型归类
+SKILL_BY_TYPE = {"cloze": "vocabulary", "choice": "vocabulary", "word_form": "grammar", "open": "reading"}
+MIN_DIFFICULTY, MAX_DIFFICULTY = 1, 5
+
+
+class QuizFormatError(ValueError):
+    """Quiz data does not match the expected schema."""
+
+
+def validate_quiz_item(item: Any) -> Dict[str, Any]:
+    """Check one quiz item against the schema and return it normalized.
+
+    Required: type, question and answer (non-empty strings); choice items
+    need 2-6 distinct options that include the answer. skill defaults from
+    the type, difficulty (1-5) defaults to 3, explanation to "".
+    """
+    if not isinstance(item, dict):
+        raise QuizFormatError("题目必须是 JSON 对象")
+
+    item_type = item.get("type")
+    if item_type not in QUESTION_TYPES:
+        raise QuizFormatError(f"未知题型: {item_type!r}")
+    question, answer = item.get("question"), item.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        raise QuizFormatError("缺少题干 question")
+    if not isinstance(answer, str) or not answer.strip():
+        raise QuizFormatError("缺少答案 answer")
+
+    options = item.get("options") or []
+    if item_type == "choice":
+        if (not isinstance(options, list) or not 2 <= len(options) <= 6
+                or not all(isinstance(option, str) and option.strip() for option in options)):
+            raise QuizFormatError("选择题需要 2 到 6 个选项")
+        options = [option.strip() for option in options]
+        if len(set(options)) != len(options):
+            raise QuizFormatError("选项重复")
+        if answer.strip() not in options:
+            raise QuizFormatError("答案不在选项中")
+    else:
+        options = []
+
+    skill = item.get("skill") or SKILL_BY_TYPE[item_type]
+    if skill not in SKILLS:
+        raise QuizFormatError(f"未知技能: {skill!r}")
+    difficulty = item.get("difficulty", 3)
+    if isinstance(difficulty, bool) or not isinstance(difficulty, int) \
+            or not MIN_DIFFICULTY <= difficulty <= MAX_DIFFICULTY:
+        raise QuizFormatError(f"难度必须是 {MIN_DIFFICULTY} 到 {MAX_DIFFICULTY} 的整数")
+    explanation = item.get("explanation") or ""
+    if not isinstance(explanation, str):
+        raise QuizFormatError("explanation 必须是字符串")
+
+    normalized = dict(item)
+    normalized.update(type=item_type, question=question.strip(), answer=answer.strip(), options=options,
+                      skill=skill, difficulty=difficulty, explanation=explanation.strip())
+    return normalized
+
+
+def parse_quiz_response(text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Parse a JSON quiz response ({"questions": [...]}) into valid items.
+
+    Invalid items are skipped and their errors returned alongside; raises
+    QuizFormatError if the response is not JSON or contains no valid item.
+    """
+    try:
+        data = json.loads(text)
+    except (TypeError, ValueError) as e:
+        raise QuizFormatError(f"返回内容不是有效的 JSON: {e}")
+    questions = data.get("questions") if isinstance(data, dict) else data
+    if not isinstance(questions, list):
+        raise QuizFormatError("JSON 中缺少 questions 列表")
+
+    items, errors = [], []
+    for number, question in enumerate(questions, 1):
+        try:
+            items.append(validate_quiz_item(question))
+        except QuizFormatError as e:
+            errors.append(f"第 {number} 题: {e}")
+    if not items:
+        raise QuizFormatError("没有符合格式的题目" + (f"（{'；'.join(errors)}）" if errors else ""))
+    return items, errors
+
+
+class QuizBank:
+    """Stored quiz items, indexed by file, skill and difficulty.
+
+    Items generated locally or by the LLM are validated and kept per file
+    together with the digest of the content they came from, so practice
+    sets can be assembled from the bank with a single indexed query instead
+    of generating questions again.
+    """
+
+    def __init__(self, db_manager):
+        """Initialize the bank on the application's database."""
+        self.db_manager = db_manager
+        self.conn = db_manager.conn
+        self._init_tables()
+
+    def _init_tables(self):
+        """Create the quiz tables."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS quiz_items (
+            id INTEGER PRIMARY KEY,
+            file_id TEXT,
+            skill TEXT NOT NULL,
+            difficulty INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            explanation TEXT NOT NULL DEFAULT '',
+            source TEXT NOT NULL,
+            content_digest TEXT,
+            item_hash TEXT NOT NULL,
+            created_at TEXT,
+            UNIQUE (file_id, item_hash)
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quiz_items_file ON quiz_items (file_id, skill, difficulty)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_quiz_items_skill ON quiz_items (skill, difficulty)')
+        self.conn.commit()
+
+    @staticmethod
+    def item_hash(item: Dict[str, Any]) -> str:
+        key = "\x1f".join([item["type"], item["question"], item["answer"]] + item["options"])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def add_items(self, file_id: Optional[str], items: Iterable[Dict[str, Any]], source: str,
+                  content_digest: Optional[str] = None) -> int:
+        """Validate and store items; duplicates are ignored. Returns the number of new items.
+
+        Items a file had for different content are removed first, so the bank
+        never mixes questions from old and new versions of a document.
+        """
+        items = [validate_quiz_item(item) for item in items]
+        created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            cursor = self.conn.cursor()
+            if file_id is not None and content_digest is not None:
+                cursor.execute('DELETE FROM quiz_items WHERE file_id = ? AND content_digest != ?',
+                               (file_id, content_digest))
+            before = self.conn.total_changes
+            cursor.executemany('''
+            INSERT OR IGNORE INTO quiz_items
+                (file_id, skill, difficulty, type, question, options, answer, explanation, source,
+                 content_digest, item_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', ((file_id, item["skill"], item["difficulty"], item["type"], item["question"],
+                   json.dumps(item["options"], ensure_ascii=False), item["answer"], item["explanation"],
+                   source, content_digest, self.item_hash(item), created_at) for item in items))
+            return self.conn.total_changes - before
+
+    def has_items(self, file_id: str, source: str, content_digest: str) -> bool:
+        """Whether the bank already holds items from `source` for this version of the file."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT 1 FROM quiz_items WHERE file_id = ? AND source = ? AND content_digest = ? LIMIT 1
+        ''', (file_id, source, content_digest))
+        return cursor.fetchone() is not None
+
+    def practice_set(self, file_id: Optional[str] = None, skill: Optional[str] = None,
+                     difficulty: Union[int, Tuple[int, int], None] = None, limit: int = 10,
+                     types: Optional[Iterable[str]] = None, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Pick up to `limit` stored items at random, filtered by file, skill, difficulty (or range), type and source."""
+        conditions, params = [], []
+        if file_id is not None:
+            conditions.append('file_id = ?')
+            params.append(file_id)
+        if source is not None:
+            conditions.append('source = ?')
+            params.append(source)
+        if skill is not None:
+            conditions.append('skill = ?')
+            params.append(skill)
+        if isinstance(difficulty, tuple):
+            conditions.append('difficulty BETWEEN ? AND ?')
+            params.extend(difficulty)
+        elif difficulty is not None:
+            conditions.append('difficulty = ?')
+            params.append(difficulty)
+        if types:
+            types = list(types)
+            conditions.append(f'type IN ({",".join("?" * len(types))})')
+            params.extend(types)
+
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT id, file_id, skill, difficulty, type, question, options, answer, explanation, source
+        FROM quiz_items
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY RANDOM()
+        LIMIT ?
+        ''', params + [limit])
+
+        columns = ('id', 'file_id', 'skill', 'difficulty', 'type', 'question', 'options', 'answer',
+                   'explanation', 'source')
+        items = []
+        for row in cursor:
+            item = dict(zip(columns, row))
+            item['options'] = json.loads(item['options'])
+            items.append(item)
+        return items
+
+    def remove_file(self, file_id: str):
+        """Delete all items generated from a file."""
+        with self.conn:
+            self.conn.execute('DELETE FROM quiz_items WHERE file_id = ?', (file_id,))
+
+    def counts(self, file_id: Optional[str] = None) -> Dict[Tuple[str, int], int]:
+        """Number of stored items per (skill, difficulty), for one file or the whole bank."""
+        cursor = self.conn.cursor()
+        if file_id is None:
+            cursor.execute('SELECT skill, difficulty, COUNT(*) FROM quiz_items GROUP BY skill, difficulty')
+        else:
+            cursor.execute('''
+            SELECT skill, difficulty, COUNT(*) FROM quiz_items WHERE file_id = ? GROUP BY skill, difficulty
+            ''', (file_id,))
+        return {(skill, difficulty): count for skill, difficulty, count in cursor}
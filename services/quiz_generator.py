@@ -0,0 +1,170 @@
+import random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.text_processing import FUNCTION_WORDS, WORD_RE, iter_segments, lemmatize, load_word_ranks, split_sentences
+
+BLANK = "_____"
+QUIZ_TYPES = ("cloze", "choice", "word_form")
+QUIZ_TYPE_LABELS = {"cloze": "完形填空", "choice": "选择题", "word_form": "词形变换", "open": "简答题"}
+OPTION_LETTERS = "ABCD"
+
+
+def word_form(word: str, lemma: str) -> str:
+    """Coarse inflection class of a word relative to its lemma (base, ing, ed, s, ly, er, irregular)."""
+    if word == lemma:
+        return "base"
+    for suffix in ("ing", "ed", "ly", "est", "er", "s"):
+        if word.endswith(suffix):
+            return suffix
+    return "irregular"
+
+
+class QuizGenerator:
+    """Builds vocabulary exercises from a document's text without calling the LLM.
+
+    Each sentence contributes at most one target word: the least common
+    content word it contains, according to the frequency-ranked word list
+    (very common words and capitalized names are skipped). Targets become
+    cloze items, multiple-choice items whose distractors are other document
+    words of the same inflection and similar frequency, or word-form items
+    that give the base form and ask for the inflected one.
+    """
+
+    MIN_WORD_LENGTH = 4
+    COMMON_RANK = 300  # 比这更常见的词不出题
+    MIN_SENTENCE_WORDS = 6
+    MAX_SENTENCE_WORDS = 40
+    DISTRACTORS = 3
+
+    def __init__(self, word_list_path: Optional[str] = None):
+        """Initialize the generator; the word list is loaded on first use."""
+        self.word_list_path = word_list_path
+
+    @property
+    def ranks(self) -> Dict[str, int]:
+        return load_word_ranks(self.word_list_path)
+
+    def _candidates(self, sentence: str) -> List[Dict[str, Any]]:
+        ranks = self.ranks
+        candidates = []
+        for match in WORD_RE.finditer(sentence):
+            word = match.group()
+            if word[0].isupper() or len(word) < self.MIN_WORD_LENGTH or "'" in word or "’" in word:
+                continue
+            if word in FUNCTION_WORDS:
+                continue
+            lemma = lemmatize(word)
+            rank = ranks.get(lemma)
+            if rank is not None and rank < self.COMMON_RANK:
+                continue
+            candidates.append({
+                "word": word, "lemma": lemma, "form": word_form(word, lemma),
+                # 词表外的词视为最生僻
+                "rank": len(ranks) if rank is None else rank,
+                "start": match.start(), "end": match.end(),
+            })
+        return candidates
+
+    def iter_targets(self, text: str) -> Iterator[Tuple[str, Dict[str, Any], List[Dict[str, Any]]]]:
+        """Yield (sentence, target, candidates) for sentences suitable for an exercise."""
+        for segment in iter_segments(text):
+            for sentence in split_sentences(segment):
+                words = len(WORD_RE.findall(sentence))
+                if not self.MIN_SENTENCE_WORDS <= words <= self.MAX_SENTENCE_WORDS:
+                    continue
+                candidates = self._candidates(sentence)
+                if candidates:
+                    yield sentence, max(candidates, key=lambda c: c["rank"]), candidates
+
+    def item_difficulty(self, rank: int) -> int:
+        """Difficulty 1-5 of an item from its target word's frequency rank."""
+        return 1 + min(4, rank * 5 // (len(self.ranks) + 1))
+
+    def _distractors(self, target: Dict[str, Any], pool: Dict[str, Dict[str, Any]]) -> List[str]:
+        same_form = [c for c in pool.values() if c["form"] == target["form"] and c["lemma"] != target["lemma"]]
+        same_form.sort(key=lambda c: (abs(c["rank"] - target["rank"]), c["word"]))
+        distractors = [c["word"] for c in same_form[:self.DISTRACTORS]]
+
+        if len(distractors) < self.DISTRACTORS and target["form"] == "base":
+            # 文中同形的词不够时，用词表中频率相近的基本形式补足
+            ranked = sorted(self.ranks.items(), key=lambda item: abs(item[1] - target["rank"]))
+            for word, rank in ranked:
+                if len(distractors) == self.DISTRACTORS:
+                    break
+                if rank >= self.COMMON_RANK and word != target["lemma"] and word not in distractors:
+                    distractors.append(word)
+        return distractors
+
+    def generate(self, text: str, max_items: int = 20, kinds: Iterable[str] = QUIZ_TYPES,
+                 seed: int = 0) -> List[Dict[str, Any]]:
+        """Generate up to `max_items` exercises spread evenly over the text.
+
+        Each item is a dict with type, question, options (empty except for
+        multiple choice), answer, word (the lemma), sentence and difficulty
+        (1-5, from the word's frequency). The same
+        text and seed always give the same items.
+        """
+        kinds = [kind for kind in QUIZ_TYPES if kind in set(kinds)]
+        if not kinds:
+            return []
+
+        targets, pool, used = [], {}, set()
+        for sentence, target, candidates in self.iter_targets(text):
+            for candidate in candidates:
+                pool.setdefault(candidate["word"].lower(), candidate)
+            if target["lemma"] not in used:
+                used.add(target["lemma"])
+                targets.append((sentence, target))
+
+        if len(targets) > max_items:
+            # 均匀覆盖全文，而不是只取开头
+            step = len(targets) / max_items
+            targets = [targets[int(i * step)] for i in range(max_items)]
+
+        rng = random.Random(seed)
+        items = []
+        for index, (sentence, target) in enumerate(targets):
+            blanked = sentence[:target["start"]] + BLANK + sentence[target["end"]:]
+            item = {"type": "cloze", "question": blanked, "options": [], "answer": target["word"],
+                    "word": target["lemma"], "sentence": sentence,
+                    "difficulty": self.item_difficulty(target["rank"])}
+
+            # 轮流出各类题，无法出该类题时退回下一类
+            for offset in range(len(kinds)):
+                kind = kinds[(index + offset) % len(kinds)]
+                if kind == "word_form" and target["form"] != "base":
+                    item.update(type=kind, question=f"{blanked} ({target['lemma']})")
+                    break
+                if kind == "choice":
+                    distractors = self._distractors(target, pool)
+                    if len(distractors) == self.DISTRACTORS:
+                        options = distractors + [target["word"]]
+                        rng.shuffle(options)
+                        item.update(type=kind, options=options)
+                        break
+                if kind == "cloze":
+                    item.update(question=f"{blanked}（首字母：{target['word'][0]}）")
+                    break
+            else:
+                item.update(question=f"{blanked}（首字母：{target['word'][0]}）")
+            items.append(item)
+        return items
+
+
+def format_quiz(items: List[Dict[str, Any]]) -> str:
+    """Render quiz items as text, with the answers listed after the questions."""
+    if not items:
+        return "未能从文本中生成练习题（需要包含完整英文句子的文本）。"
+
+    lines, answers = [], []
+    for number, item in enumerate(items, 1):
+        lines.append(f"{number}. [{QUIZ_TYPE_LABELS.get(item['type'], item['type'])}] {item['question']}")
+        answer = item["answer"]
+        if item["options"]:
+            lines.append("    " + "    ".join(f"{letter}. {option}"
+                                            for letter, option in zip(OPTION_LETTERS, item["options"])))
+            answer = f"{OPTION_LETTERS[item['options'].index(answer)]}. {answer}"
+        if item.get("explanation"):
+            answer += f"  —— {item['explanation']}"
+        answers.append(f"{number}. {answer}")
+    return "\n".join(lines) + "\n\n答案：\n" + "\n".join(answers)
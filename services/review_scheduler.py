@@ -0,0 +1,142 @@
+import heapq
+from datetime import datetime, timedelta
+
+from models.progress import UserProgress
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# 答错的单词在同一次复习中稍后再出现，而不是等到第二天
+RELEARN_DELAY = timedelta(minutes=10)
+
+
+def sm2(quality, repetitions, interval_days, ease_factor):
+    """One SM-2 step: returns (repetitions, interval_days, ease_factor) after an answer of quality 0-5.
+
+    Answers below 3 restart the repetition count; the ease factor moves by
+    the standard SM-2 formula and never drops below 1.3.
+    """
+    ease_factor = max(MIN_EASE, ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return 0, 0, ease_factor
+    if repetitions == 0:
+        interval_days = 1
+    elif repetitions == 1:
+        interval_days = 6
+    else:
+        interval_days = round(interval_days * ease_factor, 2)
+    return repetitions + 1, interval_days, ease_factor
+
+
+def default_status(progress):
+    """Status used when no rule is supplied: learning until three correct answers, then reviewing."""
+    return "learning" if progress.correct_attempts < 3 else "reviewing"
+
+
+class ReviewScheduler:
+    """Queue of a user's vocabulary reviews, ordered by due time.
+
+    Cards are paged from the database in (due_at, word_id) order into a heap
+    of `batch_size` entries, and the next page is fetched only when the heap
+    runs low, so a session over a large deck starts after one indexed query.
+    Answering a card is one SM-2 step, one row update and, if the card comes
+    back before the end of the loaded page, one heap push; entries made stale
+    by an answer are discarded lazily when they reach the top.
+    """
+
+    def __init__(self, db_manager, user_id, batch_size=200, status_for=None):
+        self.db = db_manager
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.status_for = status_for or default_status
+        self._heap = []  # (due_at, word_id)
+        self._cards = {}  # word_id -> 当前有效的卡片
+        self._last_loaded = None  # 已载入的最后一张卡片的 (due_at, word_id)
+        self._exhausted = False
+
+    def invalidate(self):
+        """Forget the loaded cards; the next call reloads from the database.
+
+        Needed after progress rows are written by anything other than answer().
+        """
+        self._heap = []
+        self._cards = {}
+        self._last_loaded = None
+        self._exhausted = False
+
+    def _refill(self, force=False):
+        if self._exhausted or (not force and len(self._cards) >= self.batch_size // 2):
+            return
+        cards = self.db.get_review_queue(self.user_id, self.batch_size, after=self._last_loaded)
+        for card in cards:
+            self._cards[card["id"]] = card
+            heapq.heappush(self._heap, (card["due_at"], card["id"]))
+        if cards:
+            self._last_loaded = (cards[-1]["due_at"], cards[-1]["id"])
+        self._exhausted = len(cards) < self.batch_size
+
+    def _pop_valid(self):
+        """Pop the earliest card whose heap entry is still current, or None."""
+        self._refill()
+        while True:
+            if not self._heap:
+                if self._exhausted:
+                    return None
+                self._refill(force=True)
+                continue
+            due_at, word_id = heapq.heappop(self._heap)
+            card = self._cards.get(word_id)
+            if card is not None and card["due_at"] == due_at:
+                return card
+
+    def due_cards(self, count=1, now=None):
+        """Up to `count` cards due at `now`, earliest first (the queue is not consumed)."""
+        now = (now or datetime.now()).strftime(TIME_FORMAT)
+        cards = []
+        while len(cards) < count:
+            card = self._pop_valid()
+            if card is None:
+                break
+            cards.append(card)
+            if card["due_at"] > now:
+                break
+        for card in cards:
+            heapq.heappush(self._heap, (card["due_at"], card["id"]))
+        return [card for card in cards if card["due_at"] <= now]
+
+    def next_card(self, now=None):
+        """The earliest due card, or None if nothing is due."""
+        cards = self.due_cards(1, now)
+        return cards[0] if cards else None
+
+    def answer(self, word_id, quality, now=None):
+        """Record an answer of quality 0-5 (below 3 counts as wrong) and reschedule the card."""
+        now = now or datetime.now()
+        card = self._cards.pop(word_id, None) or self.db.get_review_card(self.user_id, word_id)
+        if card is None:
+            word = self.db.get_word(word_id)
+            card = dict(word, status="new", attempts=0, correct_attempts=0, last_reviewed=None,
+                        ease_factor=DEFAULT_EASE, interval_days=0, repetitions=0, due_at="")
+
+        progress = UserProgress.from_dict(dict(card, id=None, user_id=self.user_id, word_id=word_id))
+        progress.attempts += 1
+        if quality >= 3:
+            progress.correct_attempts += 1
+        repetitions, interval_days, ease_factor = sm2(quality, card["repetitions"], card["interval_days"],
+                                                      card["ease_factor"])
+        due = now + (timedelta(days=interval_days) if interval_days else RELEARN_DELAY)
+
+        card.update(status=self.status_for(progress), attempts=progress.attempts,
+                    correct_attempts=progress.correct_attempts, last_reviewed=now.strftime(TIME_FORMAT),
+                    ease_factor=ease_factor, interval_days=interval_days, repetitions=repetitions,
+                    due_at=due.strftime(TIME_FORMAT))
+        self.db.save_review(self.user_id, word_id, card["status"], card["attempts"], card["correct_attempts"],
+                            card["last_reviewed"], ease_factor, interval_days, repetitions, card["due_at"])
+
+        if self._last_loaded is not None and (card["due_at"], word_id) <= self._last_loaded:
+            self._cards[word_id] = card
+            heapq.heappush(self._heap, (card["due_at"], word_id))
+        else:
+            # 排在已载入范围之后，等翻到下一页时再从数据库读取
+            self._exhausted = False
+        return card
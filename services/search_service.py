@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from database.db_manager import DBManager
+
+
+class SearchService:
+    """Incremental file search with result caching, run off the UI thread.
+
+    Queries are executed on a single background worker that owns its own
+    SQLite connection.  Every submission bumps a generation counter; work
+    belonging to an older generation is skipped (or its result discarded by
+    the caller), so only the latest keystroke ever reaches the UI.
+
+    Results of recent queries are kept in an LRU.  When a new query extends a
+    cached one (the old name/type filters are substrings of the new ones) the
+    cached rows are narrowed in memory instead of hitting the database.
+    """
+
+    def __init__(self, db_path: str, cache_size: int = 64):
+        """Initialize the search service for the given database file."""
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._epoch = 0  # invalidate() 后递增，防止旧结果写回缓存
+        self._pending = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        self._worker_db = None  # 仅在工作线程中创建和使用
+
+    @staticmethod
+    def _normalize(name_search: str, type_search: str) -> Tuple[str, str]:
+        """Normalize a query into its cache key."""
+        return (name_search or "").strip().lower(), (type_search or "").strip().lower()
+
+    @staticmethod
+    def _matches(row, key: Tuple[str, str]) -> bool:
+        """Check whether a result row matches a normalized query."""
+        name_search, type_search = key
+        return name_search in (row[1] or "").lower() and type_search in (row[2] or "").lower()
+
+    def _cache_get(self, key):
+        with self._lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+            return rows
+
+    def _cache_put(self, key, rows):
+        with self._lock:
+            self._cache[key] = rows
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _find_refinable(self, key) -> Optional[List[tuple]]:
+        """Find the narrowest cached result set that the query refines."""
+        name_search, type_search = key
+        best = None
+        with self._lock:
+            for (cached_name, cached_type), rows in self._cache.items():
+                if cached_name in name_search and cached_type in type_search:
+                    if best is None or len(rows) < len(best):
+                        best = rows
+        return best
+
+    def lookup(self, name_search: str, type_search: str) -> Optional[List[tuple]]:
+        """Answer a query from memory if possible, without touching the database.
+
+        Returns the matching rows, or None if the database must be queried.
+        """
+        key = self._normalize(name_search, type_search)
+        rows = self._cache_get(key)
+        if rows is not None:
+            return rows
+
+        base = self._find_refinable(key)
+        if base is None:
+            return None
+        rows = [row for row in base if self._matches(row, key)]
+        self._cache_put(key, rows)
+        return rows
+
+    def submit(self, name_search: str, type_search: str):
+        """Run a query in the background.
+
+        Returns a (generation, future) pair; the caller should ignore the
+        result if `is_current(generation)` is no longer true when it arrives.
+        """
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            if self._pending is not None:
+                self._pending.cancel()  # 尚未开始执行的旧查询直接取消
+
+        future = self._executor.submit(self._run_query, generation, name_search, type_search)
+        self._pending = future
+        return generation, future
+
+    def cancel_pending(self):
+        """Make any query still running stale, e.g. before showing a result answered from the cache."""
+        with self._lock:
+            self._generation += 1
+            if self._pending is not None:
+                self._pending.cancel()
+
+    def is_current(self, generation: int) -> bool:
+        """Return True if no newer query has been submitted since `generation`."""
+        return generation == self._generation
+
+    def _run_query(self, generation, name_search, type_search):
+        if not self.is_current(generation):
+            return None
+
+        rows = self.lookup(name_search, type_search)
+        if rows is not None:
+            return rows
+
+        epoch = self._epoch
+        if self._worker_db is None:
+            self._worker_db = DBManager(self.db_path)
+        rows = self._worker_db.search_files(name_search.strip(), type_search.strip())
+        if epoch == self._epoch:
+            self._cache_put(self._normalize(name_search, type_search), rows)
+        return rows
+
+    def invalidate(self):
+        """Drop all cached results and discard running queries (call after files are added or modified)."""
+        with self._lock:
+            self._epoch += 1
+            self._cache.clear()
+        self.cancel_pending()
+
+    def close(self):
+        """Stop the worker and close its connection."""
+        self._executor.submit(self._close_worker_db)
+        self._executor.shutdown(wait=True)
+
+    def _close_worker_db(self):
+        if self._worker_db is not None:
+            self._worker_db.close()
+            self._worker_db = None
@@ -0,0 +1,218 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from services.text_processing import WORD_RE, sentence_spans
+
+SHARDS = 4
+MIN_SENTENCE_WORDS = 3  # 选项、题号之类的碎片不收录（单字母不算词）
+
+# (id, file_id, offset, sentence)；id 同时用作翻页位置
+SentenceHit = Tuple[int, str, int, str]
+
+
+@lru_cache(maxsize=64)
+def _compile(pattern: str):
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, text: str) -> bool:
+    """SQLite REGEXP function: `text REGEXP pattern`."""
+    return text is not None and _compile(pattern).search(text) is not None
+
+
+def phrase_query(text: str) -> str:
+    """FTS5 query matching `text` as a phrase (case-insensitive, word endings ignored)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def shard_of(file_id: str) -> int:
+    return zlib.crc32(file_id.encode("utf-8")) % SHARDS
+
+
+class SentenceIndex:
+    """Every sentence of the library with its file and offset, for finding real examples.
+
+    Sentences are spread over SHARDS tables by file. A contentless FTS5
+    table over all of them answers word and phrase searches; regular
+    expression searches (e.g. a grammar pattern) scan the shards in
+    parallel, each on its own connection, and stop as soon as a page of
+    hits is found. Hits come back in index order and are paged by id, so
+    the first page costs the same however many sentences match.
+    """
+
+    def __init__(self, db_manager):
+        """Initialize the index on the application's database."""
+        self.db_manager = db_manager
+        self.conn = db_manager.conn
+        self._init_tables()
+        self._executor = None
+        self._local = threading.local()
+        self._scan_connections = []
+
+    def _init_tables(self):
+        """Create the shard tables and the full-text index."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sentence_documents (
+            file_id TEXT PRIMARY KEY,
+            content_digest TEXT NOT NULL
+        )
+        ''')
+        for shard in range(SHARDS):
+            cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS sentences_{shard} (
+                id INTEGER PRIMARY KEY,
+                file_id TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                text TEXT NOT NULL
+            )
+            ''')
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_sentences_{shard}_file ON sentences_{shard} (file_id)')
+        # 全局 id = 分片内 id * SHARDS + 分片号
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS sentence_fts
+        USING fts5(text, content='', tokenize='porter unicode61')
+        ''')
+        self.conn.commit()
+
+    def _remove(self, cursor, file_id: str):
+        shard = shard_of(file_id)
+        cursor.execute(f'SELECT id, text FROM sentences_{shard} WHERE file_id = ?', (file_id,))
+        cursor.executemany("INSERT INTO sentence_fts (sentence_fts, rowid, text) VALUES ('delete', ?, ?)",
+                           [(local_id * SHARDS + shard, text) for local_id, text in cursor.fetchall()])
+        cursor.execute(f'DELETE FROM sentences_{shard} WHERE file_id = ?', (file_id,))
+        cursor.execute('DELETE FROM sentence_documents WHERE file_id = ?', (file_id,))
+
+    def index_document(self, file_id: str, content: Optional[str] = None) -> bool:
+        """(Re)index a document's sentences; does nothing if its content is unchanged.
+
+        Returns True if the index was modified.
+        """
+        if content is None:
+            content = self.db_manager.get_file_content(file_id)
+            if content is None:
+                return False
+
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT content_digest FROM sentence_documents WHERE file_id = ?', (file_id,))
+        row = cursor.fetchone()
+        if row and row[0] == digest:
+            return False
+
+        shard = shard_of(file_id)
+        sentences = [(offset, text) for offset, text in sentence_spans(content)
+                     if sum(len(word) > 1 for word in WORD_RE.findall(text)) >= MIN_SENTENCE_WORDS]
+        with self.conn:
+            self._remove(cursor, file_id)
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM sentences_{shard}')
+            first_id = cursor.fetchone()[0] + 1
+            rows = [(first_id + i, file_id, offset, text) for i, (offset, text) in enumerate(sentences)]
+            cursor.executemany(f'INSERT INTO sentences_{shard} (id, file_id, offset, text) VALUES (?, ?, ?, ?)',
+                               rows)
+            cursor.executemany('INSERT INTO sentence_fts (rowid, text) VALUES (?, ?)',
+                               [(local_id * SHARDS + shard, text) for local_id, _, _, text in rows])
+            cursor.execute('INSERT INTO sentence_documents (file_id, content_digest) VALUES (?, ?)',
+                           (file_id, digest))
+        return True
+
+    def remove_document(self, file_id: str):
+        """Remove a document's sentences from the index."""
+        with self.conn:
+            self._remove(self.conn.cursor(), file_id)
+
+    def _fetch(self, global_ids: List[int]) -> List[SentenceHit]:
+        by_shard = {}
+        for global_id in global_ids:
+            by_shard.setdefault(global_id % SHARDS, []).append(global_id // SHARDS)
+        rows = {}
+        cursor = self.conn.cursor()
+        for shard, local_ids in by_shard.items():
+            cursor.execute(f'''
+            SELECT id, file_id, offset, text FROM sentences_{shard}
+            WHERE id IN ({",".join("?" * len(local_ids))})
+            ''', local_ids)
+            for local_id, file_id, offset, text in cursor:
+                rows[local_id * SHARDS + shard] = (local_id * SHARDS + shard, file_id, offset, text)
+        return [rows[global_id] for global_id in global_ids if global_id in rows]
+
+    def search(self, phrase: str, limit: int = 50, after: int = 0,
+               file_id: Optional[str] = None) -> List[SentenceHit]:
+        """Sentences containing a word or phrase, in index order.
+
+        Pass the id of the last hit as `after` to get the next page.
+        """
+        if not WORD_RE.search(phrase or ""):
+            return []
+        params = [phrase_query(phrase.strip()), after]
+        file_filter = ""
+        if file_id is not None:
+            shard = shard_of(file_id)
+            file_filter = f'AND rowid IN (SELECT id * {SHARDS} + {shard} FROM sentences_{shard} WHERE file_id = ?)'
+            params.append(file_id)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT rowid FROM sentence_fts
+        WHERE sentence_fts MATCH ? AND rowid > ? {file_filter}
+        ORDER BY rowid
+        LIMIT ?
+        ''', params + [limit])
+        return self._fetch([row[0] for row in cursor])
+
+    def _shard_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_manager.db_path, check_same_thread=False)
+            conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+            self._scan_connections.append(conn)
+        return conn
+
+    def _scan_shard(self, shard: int, pattern: str, limit: int, after: int,
+                    file_id: Optional[str]) -> List[SentenceHit]:
+        # 全局 id 大于 after 的行在本分片内的最小 id
+        start = after // SHARDS + (1 if after % SHARDS >= shard else 0)
+        conditions, params = ['id >= ?', 'text REGEXP ?'], [start, pattern]
+        if file_id is not None:
+            conditions.insert(1, 'file_id = ?')
+            params.insert(1, file_id)
+        rows = self._shard_connection().execute(f'''
+        SELECT id, file_id, offset, text FROM sentences_{shard}
+        WHERE {" AND ".join(conditions)}
+        ORDER BY id
+        LIMIT ?
+        ''', params + [limit]).fetchall()
+        return [(local_id * SHARDS + shard, row_file, offset, text) for local_id, row_file, offset, text in rows]
+
+    def regex_search(self, pattern: str, limit: int = 50, after: int = 0, file_id: Optional[str] = None,
+                     ignore_case: bool = True) -> List[SentenceHit]:
+        """Sentences matching a regular expression, scanning the shards in parallel.
+
+        Raises re.error for an invalid pattern. Paged like search().
+        """
+        if ignore_case:
+            pattern = "(?i)" + pattern
+        _compile(pattern)
+        shards = [shard_of(file_id)] if file_id is not None else range(SHARDS)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=SHARDS, thread_name_prefix="sentence-scan")
+        futures = [self._executor.submit(self._scan_shard, shard, pattern, limit, after, file_id)
+                   for shard in shards]
+        hits = [hit for future in futures for hit in future.result()]
+        hits.sort()
+        return hits[:limit]
+
+    def close(self):
+        """Stop the scan threads and close their connections."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for conn in self._scan_connections:
+            conn.close()
+        self._scan_connections = []
+        self._local = threading.local()
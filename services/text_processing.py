@@ -0,0 +1,178 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+WORD_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+SENTENCE_RE = re.compile(r'[^.!?。！？\n]*[A-Za-z][^.!?。！？\n]*(?:[.!?。！？]+["”’)]?|$)', re.MULTILINE)
+
+# 功能词（用于计算词汇密度）
+FUNCTION_WORDS = frozenset("""
+a an the and or but nor so yet for of in on at to from by with without about above below
+over under into onto upon out up down off through during before after between among against
+since until while as than though although because if unless whether that which who whom whose
+what when where why how this these those there here it its he him his she her hers they them
+their theirs we us our ours you your yours i me my mine myself yourself himself herself itself
+ourselves themselves be am is are was were been being have has had having do does did doing
+will would shall should can could may might must not no yes all any some each every both either
+neither such very too also just only then now more most much many few less least other another
+""".split())
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+COMMON_WORDS_PATH = os.path.join(DATA_DIR, "common_words.txt")
+
+_VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+
+IRREGULAR_FORMS = {
+    "am": "be", "is": "be", "are": "be", "was": "be", "were": "be", "been": "be", "being": "be",
+    "has": "have", "had": "have", "does": "do", "did": "do", "done": "do",
+    "went": "go", "gone": "go", "goes": "go", "made": "make", "said": "say", "got": "get",
+    "came": "come", "took": "take", "taken": "take", "saw": "see", "seen": "see",
+    "knew": "know", "known": "know", "thought": "think", "told": "tell", "found": "find",
+    "gave": "give", "given": "give", "felt": "feel", "left": "leave", "kept": "keep",
+    "brought": "bring", "began": "begin", "begun": "begin", "wrote": "write", "written": "write",
+    "stood": "stand", "heard": "hear", "meant": "mean", "met": "meet", "ran": "run",
+    "paid": "pay", "sat": "sit", "spoke": "speak", "spoken": "speak", "led": "lead",
+    "grew": "grow", "grown": "grow", "lost": "lose", "fell": "fall", "fallen": "fall",
+    "sent": "send", "built": "build", "understood": "understand", "drew": "draw", "drawn": "draw",
+    "broke": "break", "broken": "break", "spent": "spend", "rose": "rise", "risen": "rise",
+    "drove": "drive", "driven": "drive", "bought": "buy", "wore": "wear", "worn": "wear",
+    "chose": "choose", "chosen": "choose", "caught": "catch", "taught": "teach", "fought": "fight",
+    "ate": "eat", "eaten": "eat", "held": "hold", "sold": "sell", "won": "win", "slept": "sleep",
+    "children": "child", "men": "man", "women": "woman", "people": "person", "feet": "foot",
+    "teeth": "tooth", "mice": "mouse", "better": "good", "best": "good", "worse": "bad", "worst": "bad",
+}
+
+# (后缀, 替换) 规则，按顺序尝试
+_SUFFIX_RULES = (
+    ("ies", "y"), ("ied", "y"), ("ves", "f"), ("sses", "ss"), ("ches", "ch"), ("shes", "sh"),
+    ("xes", "x"), ("zes", "z"), ("ing", ""), ("ing", "e"), ("ed", ""), ("ed", "e"),
+    ("es", ""), ("es", "e"), ("s", ""), ("ly", ""), ("er", ""), ("est", ""),
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase English word tokens."""
+    return [match.group().lower().replace("’", "'") for match in WORD_RE.finditer(text or "")]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences that contain at least one English letter."""
+    return [match.group().strip() for match in SENTENCE_RE.finditer(text or "") if match.group().strip()]
+
+
+def sentence_spans(text: str) -> List[Tuple[int, str]]:
+    """Sentences with their offsets in text, as (offset, sentence) pairs."""
+    spans = []
+    for match in SENTENCE_RE.finditer(text or ""):
+        sentence = match.group()
+        stripped = sentence.lstrip()
+        if stripped.strip():
+            spans.append((match.start() + len(sentence) - len(stripped), stripped.rstrip()))
+    return spans
+
+
+@lru_cache(maxsize=65536)
+def count_syllables(word: str) -> int:
+    """Estimate the number of syllables in an English word."""
+    word = word.lower().strip("'")
+    if len(word) <= 3:
+        return 1
+    if word.endswith("e") and not word.endswith(("le", "ee", "ye")):
+        word = word[:-1]
+    if word.endswith(("ed", "es")) and not word.endswith(("ted", "ded", "ses", "zes", "ches", "shes")):
+        word = word[:-2]
+    return max(1, len(_VOWEL_GROUPS.findall(word)))
+
+
+@lru_cache(maxsize=4)
+def load_word_ranks(path: Optional[str] = None) -> Dict[str, int]:
+    """Load a frequency-ranked word list (one word per line, most frequent first).
+
+    Lines may also be "word count"; only the first column is used.  The list is
+    parsed once per path and cached.
+    """
+    ranks = {}
+    with open(path or COMMON_WORDS_PATH, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            word = line.split()[0].lower()
+            if word not in ranks:
+                ranks[word] = len(ranks)
+    return ranks
+
+
+def _lemma_candidates(word: str):
+    for suffix, replacement in _SUFFIX_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+            stem = word[:-len(suffix)] + replacement
+            yield stem
+            # running -> run, stopped -> stop
+            if replacement == "" and suffix in ("ing", "ed", "er", "est") and len(stem) > 2 and stem[-1] == stem[-2]:
+                yield stem[:-1]
+
+
+@lru_cache(maxsize=65536)
+def lemmatize(word: str) -> str:
+    """Reduce an inflected word to its base form.
+
+    Irregular forms are looked up directly; regular inflections are resolved
+    against the common word list when possible, and otherwise by conservative
+    suffix stripping.
+    """
+    word = word.lower()
+    if word in IRREGULAR_FORMS:
+        return IRREGULAR_FORMS[word]
+
+    known = load_word_ranks()
+    if word in known or len(word) <= 3:
+        return word
+
+    for candidate in _lemma_candidates(word):
+        if candidate in known:
+            return candidate
+
+    # 不在词表中的词：只去掉可靠的复数/时态后缀
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith(("ss", "us", "is", "ous")):
+        return word[:-1]
+    return word
+
+
+def iter_segments(content: str, max_length: int = 2000):
+    """Yield paragraphs (split on blank lines), splitting paragraphs longer than max_length by sentence."""
+    if not content:
+        return
+    start = 0
+    for match in re.finditer(r'\n\s*\n', content):
+        yield from split_long_segment(content[start:match.start()], max_length)
+        start = match.end()
+    yield from split_long_segment(content[start:], max_length)
+
+
+def split_long_segment(segment: str, max_length: int):
+    """Yield a segment unchanged, or in sentence-aligned pieces of at most about max_length."""
+    if len(segment) <= max_length:
+        yield segment
+        return
+
+    sentences = re.split(r'([.!?。！？]\s*)', segment)
+    current_segment = ""
+    for i in range(0, len(sentences), 2):
+        sentence = sentences[i]
+        # 添加标点符号（如果有）
+        if i + 1 < len(sentences):
+            sentence += sentences[i + 1]
+
+        if len(current_segment) + len(sentence) > max_length:
+            if current_segment:
+                yield current_segment
+            current_segment = sentence
+        else:
+            current_segment += sentence
+
+    if current_segment:
+        yield current_segment
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import threading
+from typing import Optional, Tuple
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff']
+DEFAULT_CACHE_DIR = os.path.join("storage", ".thumbnails")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_thumbnail(file_path: str, size: Tuple[int, int]) -> Image.Image:
+    """Decode an image at reduced resolution and downscale it to fit `size`.
+
+    JPEGs are decoded directly at a smaller scale with draft mode; other
+    formats are first shrunk by an integer factor with `reduce`, so the
+    expensive resampling only runs on a small image.
+    """
+    with Image.open(file_path) as source:
+        image = source
+        # JPEG 在解码时按 1/2、1/4、1/8 缩小；其他格式上是空操作
+        image.draft("RGB", size)
+        factor = min(image.width // size[0], image.height // size[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+        image.thumbnail(size, Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        if image is source:
+            # 关闭文件后仍要使用缩略图
+            image = image.copy()
+    return image
+
+
+class ThumbnailCache:
+    """On-disk cache of image thumbnails keyed by the source's content hash.
+
+    A thumbnail is generated once per distinct image and size; later
+    previews (and identical copies of the same scan) only load the small
+    cached file. Content hashes are remembered per (path, size, mtime) so
+    unchanged files are not rehashed.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, size: Tuple[int, int] = (480, 480)):
+        """Initialize the cache; the directory is created on first use."""
+        self.cache_dir = cache_dir
+        self.size = size
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def content_hash(self, file_path: str) -> str:
+        """Content hash of a file, cached while the file is unchanged."""
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(key)
+        if cached is None:
+            cached = file_sha256(file_path)
+            with self._lock:
+                self._hashes[key] = cached
+        return cached
+
+    def thumbnail_path(self, content_hash: str, has_alpha: bool = False) -> str:
+        extension = ".png" if has_alpha else ".jpg"
+        return os.path.join(self.cache_dir, f"{content_hash}_{self.size[0]}x{self.size[1]}{extension}")
+
+    def get_thumbnail(self, file_path: str, content_hash: Optional[str] = None) -> str:
+        """Path of the cached thumbnail for an image, generating it if needed."""
+        content_hash = content_hash or self.content_hash(file_path)
+        for has_alpha in (False, True):
+            path = self.thumbnail_path(content_hash, has_alpha)
+            if os.path.exists(path):
+                return path
+
+        image = make_thumbnail(file_path, self.size)
+        has_alpha = image.mode == "RGBA"
+        path = self.thumbnail_path(content_hash, has_alpha)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(temp_path, format="PNG" if has_alpha else "JPEG", quality=85)
+        os.replace(temp_path, path)
+        return path
+
+
+_default_cache = None
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    """Shared thumbnail cache used by the preview panes."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ThumbnailCache()
+    return _default_cache
@@ -0,0 +1,293 @@
+import atexit
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.passage_retriever import search_terms, split_passages
+
+DEFAULT_DIM = 512
+DEFAULT_INDEX_DIR = os.path.join("storage", ".vectors")
+
+
+def semantic_terms(text: str) -> List[str]:
+    """Terms that carry meaning for similarity: lemmas and CJK bigrams, without bare numbers."""
+    return [term for term in search_terms(text) if not term.isdigit()]
+
+
+class HashingVectorizer:
+    """Maps text to a fixed-width vector with the hashing trick.
+
+    Each term is hashed to a bucket and a sign (so collisions cancel out on
+    average instead of piling up); the bucket receives the sublinear term
+    frequency 1 + log(tf). Vectors are L2-normalized float32. No vocabulary
+    is stored, so any document can be vectorized independently.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self._buckets = {}
+
+    def _bucket(self, term: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(term)
+        if bucket is None:
+            h = zlib.crc32(term.encode("utf-8"))
+            bucket = self._buckets[term] = (h % self.dim, -1.0 if h & 0x80000000 else 1.0)
+        return bucket
+
+    def transform(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for term, count in Counter(semantic_terms(text)).items():
+            index, sign = self._bucket(term)
+            vector[index] += sign * (1.0 + math.log(count))
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+
+class VectorStore:
+    """float32 rows of a fixed width in a memory-mapped file.
+
+    The file grows by doubling; removed rows are zeroed, masked out of
+    scoring and reused. Per-bucket document frequencies are kept in memory
+    for IDF weighting.
+    """
+
+    def __init__(self, path: str, dim: int, initial_capacity: int = 1024):
+        self.path = path
+        self.dim = dim
+        row_bytes = dim * 4
+        if os.path.exists(path) and os.path.getsize(path) >= row_bytes:
+            capacity = os.path.getsize(path) // row_bytes
+            self.vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        else:
+            self.vectors = np.memmap(path, dtype=np.float32, mode="w+", shape=(initial_capacity, dim))
+        self.valid = np.zeros(len(self.vectors), dtype=bool)
+        self.row_count = 0  # 已使用过的最大行号 + 1
+        self.free = []
+        self.df = np.zeros(dim, dtype=np.int64)
+
+    def load(self, rows: List[int]):
+        """Mark the rows still referenced by the metadata as live and rebuild frequencies."""
+        rows = [row for row in rows if row < len(self.vectors)]
+        self.valid[:] = False
+        self.valid[rows] = True
+        self.row_count = max(rows) + 1 if rows else 0
+        self.free = [row for row in range(self.row_count) if not self.valid[row]]
+        live = self.vectors[:self.row_count][self.valid[:self.row_count]]
+        self.df = np.count_nonzero(live, axis=0).astype(np.int64)
+
+    @property
+    def live_count(self) -> int:
+        return self.row_count - len(self.free)
+
+    def _grow(self):
+        capacity = len(self.vectors) * 2
+        self.vectors.flush()
+        del self.vectors
+        with open(self.path, "r+b") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.vectors = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.valid = np.concatenate([self.valid, np.zeros(capacity - len(self.valid), dtype=bool)])
+
+    def add(self, vector: np.ndarray) -> int:
+        if self.free:
+            row = self.free.pop()
+        else:
+            if self.row_count == len(self.vectors):
+                self._grow()
+            row = self.row_count
+            self.row_count += 1
+        self.vectors[row] = vector
+        self.valid[row] = True
+        self.df += vector != 0
+        return row
+
+    def remove(self, row: int):
+        if row < self.row_count and self.valid[row]:
+            self.df -= self.vectors[row] != 0
+            self.vectors[row] = 0
+            self.valid[row] = False
+            self.free.append(row)
+
+    def idf_weights(self) -> np.ndarray:
+        return (np.log((self.live_count + 1) / (self.df + 1)) + 1).astype(np.float32)
+
+    def search(self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """Top-k (row, score) by IDF-weighted cosine similarity, best first."""
+        if not self.row_count or not query.any():
+            return []
+        weights = self.idf_weights()
+        # 查询按 idf² 加权：两边各乘一次 idf，文档一侧已归一化
+        weighted = query * weights * weights
+        weighted /= np.linalg.norm(query * weights)
+        scores = np.asarray(self.vectors[:self.row_count] @ weighted)
+        scores[~self.valid[:self.row_count]] = -np.inf
+        if mask is not None:
+            scores[mask[:self.row_count]] = -np.inf
+
+        k = min(k, self.row_count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if np.isfinite(scores[row]) and scores[row] > 0]
+
+    def flush(self):
+        self.vectors.flush()
+
+
+class VectorIndex:
+    """Local similarity search over library documents and their passages.
+
+    Every document is vectorized as a whole and passage by passage (the
+    same passages the question answering retrieves). Vectors live in two
+    memory-mapped float32 stores under `index_dir`; which row belongs to
+    which file and passage is recorded in the application database. A query
+    is one vectorized matrix product over the live rows plus an
+    argpartition top-k. Documents are re-indexed only when their content
+    changes. Safe to use from several threads.
+    """
+
+    def __init__(self, db_path: str, index_dir: str = DEFAULT_INDEX_DIR, dim: int = DEFAULT_DIM):
+        """Open (or create) the index; vectors are memory-mapped, not loaded."""
+        os.makedirs(index_dir, exist_ok=True)
+        self.vectorizer = HashingVectorizer(dim)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_tables()
+
+        self.passages = VectorStore(os.path.join(index_dir, f"passages_{dim}.f32"), dim)
+        self.documents = VectorStore(os.path.join(index_dir, f"documents_{dim}.f32"), dim)
+        self._load()
+
+    def _init_tables(self):
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vector_documents (
+            file_id TEXT PRIMARY KEY,
+            content_digest TEXT NOT NULL,
+            row INTEGER
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vector_passages (
+            row INTEGER PRIMARY KEY,
+            file_id TEXT NOT NULL,
+            start INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_vector_passages_file ON vector_passages (file_id)')
+        self.conn.commit()
+
+    def _load(self):
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT row, file_id, start, length FROM vector_passages')
+        self._passage_info = {row: (file_id, start, length) for row, file_id, start, length in cursor}
+        cursor.execute('SELECT row, file_id FROM vector_documents WHERE row IS NOT NULL')
+        self._document_files = dict(cursor.fetchall())
+        self.passages.load(list(self._passage_info))
+        self.documents.load(list(self._document_files))
+
+    def _remove(self, cursor, file_id: str):
+        cursor.execute('SELECT row FROM vector_passages WHERE file_id = ?', (file_id,))
+        for (row,) in cursor.fetchall():
+            self.passages.remove(row)
+            self._passage_info.pop(row, None)
+        cursor.execute('SELECT row FROM vector_documents WHERE file_id = ?', (file_id,))
+        for (row,) in cursor.fetchall():
+            if row is not None:
+                self.documents.remove(row)
+                self._document_files.pop(row, None)
+        cursor.execute('DELETE FROM vector_passages WHERE file_id = ?', (file_id,))
+        cursor.execute('DELETE FROM vector_documents WHERE file_id = ?', (file_id,))
+
+    def index_document(self, file_id: str, content: str) -> bool:
+        """(Re)index a document; does nothing if its content is unchanged. Returns True if modified."""
+        content = content or ""
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        passages = [(start, passage, self.vectorizer.transform(passage))
+                    for start, passage in split_passages(content)]
+        document_vector = self.vectorizer.transform(content)
+
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT content_digest FROM vector_documents WHERE file_id = ?', (file_id,))
+            row = cursor.fetchone()
+            if row and row[0] == digest:
+                return False
+
+            with self.conn:
+                self._remove(cursor, file_id)
+                for start, passage, vector in passages:
+                    if not vector.any():
+                        continue
+                    passage_row = self.passages.add(vector)
+                    self._passage_info[passage_row] = (file_id, start, len(passage))
+                    cursor.execute('INSERT INTO vector_passages (row, file_id, start, length) VALUES (?, ?, ?, ?)',
+                                   (passage_row, file_id, start, len(passage)))
+                document_row = None
+                if document_vector.any():
+                    document_row = self.documents.add(document_vector)
+                    self._document_files[document_row] = file_id
+                cursor.execute('INSERT INTO vector_documents (file_id, content_digest, row) VALUES (?, ?, ?)',
+                               (file_id, digest, document_row))
+        return True
+
+    def remove_document(self, file_id: str):
+        """Remove a document and its passages from the index."""
+        with self._lock, self.conn:
+            self._remove(self.conn.cursor(), file_id)
+
+    def _exclude_mask(self, store: VectorStore, files: Dict[int, str], exclude_file_id: Optional[str]):
+        if exclude_file_id is None:
+            return None
+        mask = np.zeros(store.row_count, dtype=bool)
+        rows = [row for row, file_id in files.items() if file_id == exclude_file_id]
+        mask[rows] = True
+        return mask
+
+    def similar_passages(self, text: str, k: int = 10,
+                         exclude_file_id: Optional[str] = None) -> List[Tuple[str, int, int, float]]:
+        """Passages most similar to `text`, as (file_id, start, length, score)."""
+        query = self.vectorizer.transform(text)
+        with self._lock:
+            files = {row: info[0] for row, info in self._passage_info.items()} if exclude_file_id else {}
+            hits = self.passages.search(query, k, self._exclude_mask(self.passages, files, exclude_file_id))
+            return [self._passage_info[row] + (score,) for row, score in hits]
+
+    def similar_documents(self, text: str, k: int = 10,
+                          exclude_file_id: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Documents most similar to `text`, as (file_id, score)."""
+        query = self.vectorizer.transform(text)
+        with self._lock:
+            mask = self._exclude_mask(self.documents, self._document_files, exclude_file_id)
+            return [(self._document_files[row], score) for row, score in self.documents.search(query, k, mask)]
+
+    def close(self):
+        """Flush the vector files and close the metadata connection."""
+        with self._lock:
+            self.passages.flush()
+            self.documents.flush()
+            self.conn.close()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vector_index(db_path: str) -> VectorIndex:
+    """Shared index for a database, kept next to it; used by the background jobs and the query tab."""
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index_dir = os.path.join(os.path.dirname(os.path.abspath(db_path)), DEFAULT_INDEX_DIR)
+            index = _indexes[db_path] = VectorIndex(db_path, index_dir)
+            atexit.register(index.close)
+        return index
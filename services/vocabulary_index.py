@@ -0,0 +1,234 @@
+import hashlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.text_processing import WORD_RE, lemmatize, load_word_ranks
+
+
+def encode_positions(positions: List[int]) -> bytes:
+    """Delta + varint encode an ascending list of token positions."""
+    out = bytearray()
+    previous = 0
+    for position in positions:
+        delta = position - previous
+        previous = position
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def decode_positions(data: bytes) -> List[int]:
+    """Decode positions produced by encode_positions."""
+    positions = []
+    value = shift = previous = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        positions.append(previous)
+        value = shift = 0
+    return positions
+
+
+class VocabularyIndex:
+    """Inverted index from lemma to the documents (and token positions) containing it.
+
+    Postings are stored per (lemma, file) with a count and delta-encoded
+    positions; per-lemma document and token totals are maintained
+    incrementally so library-wide frequency questions are single lookups.
+    """
+
+    SQL_BATCH = 500  # 每条 IN (...) 查询的最大参数个数
+
+    def __init__(self, db_manager):
+        """Initialize the index on the application's database."""
+        self.db_manager = db_manager
+        self.conn = db_manager.conn
+        self._init_tables()
+
+    def _init_tables(self):
+        """Create the index tables."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocab_lemmas (
+            id INTEGER PRIMARY KEY,
+            lemma TEXT NOT NULL UNIQUE,
+            doc_count INTEGER NOT NULL DEFAULT 0,
+            total_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocab_postings (
+            lemma_id INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            positions BLOB NOT NULL,
+            PRIMARY KEY (lemma_id, file_id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_vocab_postings_file ON vocab_postings (file_id)')
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vocab_documents (
+            file_id TEXT PRIMARY KEY,
+            content_digest TEXT NOT NULL,
+            token_count INTEGER NOT NULL
+        )
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def build_postings(content: str) -> Dict[str, List[int]]:
+        """Map each lemma in the content to its token positions."""
+        postings = defaultdict(list)
+        for position, match in enumerate(WORD_RE.finditer(content or "")):
+            postings[lemmatize(match.group().lower().replace("’", "'"))].append(position)
+        return postings
+
+    def _lemma_ids(self, cursor, lemmas: Iterable[str], create: bool = False) -> Dict[str, int]:
+        lemmas = list(lemmas)
+        if create:
+            cursor.executemany('INSERT OR IGNORE INTO vocab_lemmas (lemma) VALUES (?)', ((l,) for l in lemmas))
+        ids = {}
+        for start in range(0, len(lemmas), self.SQL_BATCH):
+            batch = lemmas[start:start + self.SQL_BATCH]
+            cursor.execute(f'''
+            SELECT lemma, id FROM vocab_lemmas
+            WHERE lemma IN ({",".join("?" * len(batch))})
+            ''', batch)
+            ids.update(cursor.fetchall())
+        return ids
+
+    def index_document(self, file_id: str, content: Optional[str] = None) -> bool:
+        """(Re)index a document; does nothing if its content is unchanged.
+
+        Returns True if the index was modified.
+        """
+        if content is None:
+            content = self.db_manager.get_file_content(file_id)
+            if content is None:
+                return False
+
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT content_digest FROM vocab_documents WHERE file_id = ?', (file_id,))
+        row = cursor.fetchone()
+        if row and row[0] == digest:
+            return False
+
+        postings = self.build_postings(content)
+        with self.conn:
+            self._remove_postings(cursor, file_id)
+            ids = self._lemma_ids(cursor, postings.keys(), create=True)
+            cursor.executemany('''
+            INSERT INTO vocab_postings (lemma_id, file_id, count, positions)
+            VALUES (?, ?, ?, ?)
+            ''', ((ids[lemma], file_id, len(positions), encode_positions(positions))
+                  for lemma, positions in postings.items()))
+            cursor.executemany('''
+            UPDATE vocab_lemmas
+            SET doc_count = doc_count + 1, total_count = total_count + ?
+            WHERE id = ?
+            ''', ((len(positions), ids[lemma]) for lemma, positions in postings.items()))
+            cursor.execute('''
+            INSERT OR REPLACE INTO vocab_documents (file_id, content_digest, token_count)
+            VALUES (?, ?, ?)
+            ''', (file_id, digest, sum(len(p) for p in postings.values())))
+        return True
+
+    def _remove_postings(self, cursor, file_id: str):
+        cursor.execute('SELECT lemma_id, count FROM vocab_postings WHERE file_id = ?', (file_id,))
+        old = cursor.fetchall()
+        cursor.executemany('''
+        UPDATE vocab_lemmas
+        SET doc_count = doc_count - 1, total_count = total_count - ?
+        WHERE id = ?
+        ''', ((count, lemma_id) for lemma_id, count in old))
+        cursor.execute('DELETE FROM vocab_postings WHERE file_id = ?', (file_id,))
+        cursor.execute('DELETE FROM vocab_documents WHERE file_id = ?', (file_id,))
+
+    def remove_document(self, file_id: str):
+        """Remove a document from the index."""
+        with self.conn:
+            self._remove_postings(self.conn.cursor(), file_id)
+
+    def index_missing(self) -> int:
+        """Index every stored file that is not in the index yet; returns the number indexed."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT f.id FROM files f
+        LEFT JOIN vocab_documents d ON d.file_id = f.id
+        WHERE d.file_id IS NULL
+        ''')
+        return sum(1 for (file_id,) in cursor.fetchall() if self.index_document(file_id))
+
+    def rare_words(self, file_id: str, n: int = 20, min_length: int = 3) -> List[Tuple[str, int, int]]:
+        """Top N rare words in a document as (lemma, count_in_doc, library_count).
+
+        Words outside the common word list come first, ordered by how seldom
+        they occur across the library and then by how often the document uses them.
+        """
+        ranks = load_word_ranks()
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT l.lemma, p.count, l.total_count
+        FROM vocab_postings p
+        JOIN vocab_lemmas l ON l.id = p.lemma_id
+        WHERE p.file_id = ?
+        ''', (file_id,))
+
+        candidates = [row for row in cursor.fetchall()
+                      if len(row[0]) >= min_length and "'" not in row[0]]
+        candidates.sort(key=lambda row: (-ranks.get(row[0], len(ranks)), row[2], -row[1], row[0]))
+        return candidates[:n]
+
+    def files_containing(self, words: Iterable[str], match_all: bool = True) -> List[Tuple[str, int]]:
+        """Documents containing the given words as (file_id, total_occurrences), most first."""
+        lemmas = {lemmatize(word.lower()) for word in words if word.strip()}
+        if not lemmas:
+            return []
+        cursor = self.conn.cursor()
+        ids = list(self._lemma_ids(cursor, lemmas).values())
+        if not ids or (match_all and len(ids) < len(lemmas)):
+            return []
+
+        cursor.execute(f'''
+        SELECT file_id, SUM(count) AS occurrences
+        FROM vocab_postings
+        WHERE lemma_id IN ({",".join("?" * len(ids))})
+        GROUP BY file_id
+        {"HAVING COUNT(*) = ?" if match_all else ""}
+        ORDER BY occurrences DESC
+        ''', ids + ([len(ids)] if match_all else []))
+        return cursor.fetchall()
+
+    def library_frequency(self, words: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        """Cross-library frequency as {word: (document_count, total_count)}."""
+        words = [word for word in words if word.strip()]
+        lemma_of = {word: lemmatize(word.lower()) for word in words}
+        cursor = self.conn.cursor()
+        stats = {}
+        lemmas = list(set(lemma_of.values()))
+        for start in range(0, len(lemmas), self.SQL_BATCH):
+            batch = lemmas[start:start + self.SQL_BATCH]
+            cursor.execute(f'''
+            SELECT lemma, doc_count, total_count FROM vocab_lemmas
+            WHERE lemma IN ({",".join("?" * len(batch))})
+            ''', batch)
+            stats.update((lemma, (doc_count, total)) for lemma, doc_count, total in cursor.fetchall())
+        return {word: stats.get(lemma, (0, 0)) for word, lemma in lemma_of.items()}
+
+    def word_positions(self, file_id: str, word: str) -> List[int]:
+        """Token positions of a word (any inflection) within a document."""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+        SELECT p.positions
+        FROM vocab_postings p
+        JOIN vocab_lemmas l ON l.id = p.lemma_id
+        WHERE l.lemma = ? AND p.file_id = ?
+        ''', (lemmatize(word.lower()), file_id))
+        row = cursor.fetchone()
+        return decode_positions(row[0]) if row else []
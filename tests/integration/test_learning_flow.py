@@ -28,8 +28,6 @@ class TestLearningFlow(unittest.TestCase):
             {"id": 1, "text": "apple", "translation": "苹果", "difficulty_level": 2, "examples": "I ate an apple."},
             {"id": 2, "text": "banana", "translation": "香蕉", "difficulty_level": 2, "examples": "I like bananas."}
         ]
-        mock_db_instance.get_user_words.return_value = []  # 用户还没学过任何单词
-        
         # 获取推荐单词
         recommended_words = self.learning_service.recommend_words_for_user(self.user)
         
@@ -37,9 +35,9 @@ class TestLearningFlow(unittest.TestCase):
         self.assertEqual(len(recommended_words), 2)
         self.assertEqual(recommended_words[0]["text"], "apple")
         
-        # 验证数据库查询参数
-        mock_db_instance.get_words_by_difficulty.assert_called_with(2)
-        mock_db_instance.get_user_words.assert_called_with(1)
+        # 验证数据库查询参数：已学过的单词在数据库中排除，不再读取用户的全部单词
+        mock_db_instance.get_words_by_difficulty.assert_called_with(2, exclude_user_id=1, limit=20)
+        mock_db_instance.get_user_words.assert_not_called()
     
     @patch('database.db_manager.DatabaseManager')
     def test_learning_progress_tracking(self, mock_db_manager):
@@ -0,0 +1,156 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+
+
+class TestSegments(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.db.insert_file("f1", "paper.txt", "storage/f1.txt", ".txt", 100, "original", "meta")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_content_without_segments(self):
+        """测试没有分段时读取 content 列"""
+        self.assertEqual(self.db.get_segment_count("f1"), 0)
+        self.assertEqual(self.db.get_file_content("f1"), "original")
+
+    def test_store_and_resolve_segments(self):
+        """测试分段存储后内容由分段拼接而成"""
+        self.db.store_segments("f1", iter(["first", "second", "third"]), "new meta")
+        self.assertEqual(self.db.get_segment_count("f1"), 3)
+        self.assertEqual(self.db.get_file_content("f1"), "first\n\nsecond\n\nthird")
+        self.assertEqual(self.db.get_file_for_edit("f1")[2], "new meta")
+        self.assertIsNone(self.db.get_file_for_query("f1", with_content=False)["content"])
+
+    def test_save_only_dirty_segments(self):
+        """测试只更新修改过的段落"""
+        self.db.store_segments("f1", ["first", "second", "third"])
+        self.db.save_segments("f1", {1: "SECOND"})
+
+        text, segment_hash = self.db.get_segment("f1", 1)
+        self.assertEqual(text, "SECOND")
+        self.assertEqual(segment_hash, DBManager.segment_hash("SECOND"))
+        self.assertEqual(self.db.get_segment("f1", 0)[0], "first")
+        self.assertEqual(self.db.get_file_content("f1"), "first\n\nSECOND\n\nthird")
+
+    def test_update_file_discards_segments(self):
+        """测试整体更新内容后分段失效"""
+        self.db.store_segments("f1", ["first", "second"])
+        self.db.update_file("f1", "rewritten", "meta")
+        self.assertEqual(self.db.get_segment_count("f1"), 0)
+        self.assertEqual(self.db.get_file_content("f1"), "rewritten")
+
+
+class TestRevisions(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.original = "\n".join(f"line {i}" for i in range(2000))
+        self.db.insert_file("f1", "paper.txt", "storage/f1.txt", ".txt", 100, self.original, "meta")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_first_update_keeps_original(self):
+        """测试第一次修改时保存原始内容"""
+        self.db.update_file("f1", self.original + "\nappended", "meta")
+        revisions = self.db.list_revisions("f1")
+        self.assertEqual([row[0] for row in revisions], [1, 0])
+        self.assertEqual(self.db.get_revision("f1", 0), (self.original, "meta"))
+
+    def test_delta_is_small_and_reconstructs(self):
+        """测试差异版本体积与修改量相关且可以还原"""
+        versions = [self.original]
+        for i in range(1, 30):
+            content = versions[-1].replace(f"line {i * 10}\n", f"edited {i}\n")
+            self.db.update_file("f1", content, f"meta {i}")
+            versions.append(content)
+
+        revisions = {row[0]: row for row in self.db.list_revisions("f1")}
+        self.assertEqual(revisions[5][1], "delta")
+        self.assertEqual(revisions[DBManager.FULL_SNAPSHOT_INTERVAL][1], "full")
+        self.assertLess(revisions[5][3], 200)
+
+        for revision in (0, 7, 20, 29):
+            content, metadata = self.db.get_revision("f1", revision)
+            self.assertEqual(content, versions[revision])
+
+    def test_segment_saves_are_versioned(self):
+        """测试分段保存也会产生历史版本"""
+        self.db.store_segments("f1", ["first", "second"])
+        self.db.save_segments("f1", {1: "SECOND"})
+        self.assertEqual(self.db.get_revision("f1", 2)[0], "first\n\nSECOND")
+
+    def test_segment_deltas_cover_changed_segments_only(self):
+        """测试分段保存的差异只包含修改的段落，跨完整快照仍能还原各个版本"""
+        segments = [f"paragraph {i}\n" + "x" * 200 for i in range(200)]
+        self.db.store_segments("f1", segments)
+        versions = {1: "\n\n".join(segments)}
+        for revision in range(2, 25):
+            ordinal = revision * 7 % len(segments)
+            segments[ordinal] = f"edited {revision}\n" + segments[ordinal]
+            self.db.save_segments("f1", {ordinal: segments[ordinal]}, f"meta {revision}")
+            versions[revision] = "\n\n".join(segments)
+
+        revisions = {row[0]: row for row in self.db.list_revisions("f1")}
+        self.assertEqual(revisions[5][1], "delta")
+        self.assertLess(revisions[5][3], 200)
+        self.assertEqual(revisions[DBManager.FULL_SNAPSHOT_INTERVAL][1], "full")
+        self.assertEqual(revisions[24][2], len(versions[24]))
+        for revision, content in versions.items():
+            self.assertEqual(self.db.get_revision("f1", revision)[0], content)
+        self.assertEqual(self.db.get_revision("f1", 24)[1], "meta 24")
+        self.assertEqual(self.db.get_file_content("f1"), versions[24])
+
+    def test_revert(self):
+        """测试恢复历史版本并保留当前内容"""
+        self.db.update_file("f1", "bad save", "")
+        self.assertTrue(self.db.revert_to_revision("f1", 0))
+        self.assertEqual(self.db.get_file_content("f1"), self.original)
+        self.assertEqual(self.db.get_revision("f1", 1)[0], "bad save")
+        self.assertEqual(len(self.db.list_revisions("f1")), 3)
+
+
+class TestArtifacts(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.db.insert_file("f1", "paper.txt", "storage/f1.txt", ".txt", 100, "original", "meta")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_artifact_survives_metadata_change(self):
+        """测试只修改元数据时保存的结果仍然有效"""
+        self.db.save_artifact("f1", "quiz", "deepseek-chat", "Q1")
+        self.db.update_file("f1", "original", "new meta")
+        self.assertEqual(self.db.get_artifact("f1", "quiz", "deepseek-chat"), "Q1")
+        self.assertIsNone(self.db.get_artifact("f1", "quiz", "deepseek-reasoner"))
+
+    def test_artifact_invalidated_by_content_change(self):
+        """测试内容变化后结果作废"""
+        self.db.save_artifact("f1", "grammar", "deepseek-chat", "G1", params="tenses")
+        self.db.store_segments("f1", ["changed"])
+        self.assertIsNone(self.db.get_artifact("f1", "grammar", "deepseek-chat", "tenses"))
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0], 0)
+
+    def test_stale_digest_keeps_current_artifacts(self):
+        """测试调用方持有过时的摘要时，只清除旧内容的结果，当前内容的结果保留"""
+        stale_digest = self.db.content_digest("f1")
+        self.db.save_artifact("f1", "summary", "deepseek-chat", "old summary")
+        self.db.update_file("f1", "rewritten by a job", "meta")
+        self.db.save_artifact("f1", "summary", "deepseek-chat", "new summary")
+        self.db.save_artifact("f1", "quiz", "deepseek-chat", "Q1")
+
+        self.assertIsNone(self.db.get_artifact("f1", "summary", "deepseek-chat", content_digest=stale_digest))
+        self.assertEqual(self.db.get_artifact("f1", "summary", "deepseek-chat"), "new summary")
+        self.assertEqual(self.db.get_artifact("f1", "quiz", "deepseek-chat"), "Q1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.dictionary import OfflineDictionary, get_dictionary
+
+WORDLIST_TSV = (
+    "# 测试词表\n"
+    "apple\tn. 苹果\n"
+    "Apple\tn. 苹果公司\n"
+    "application\tn. 申请；应用\n"
+    "apply\tv. 申请；应用\n"
+    "study\tv. 学习\\nn. 研究\n"
+    "look forward to\t期待\n"
+    "broken line without tab\n"
+)
+WORDLIST_CSV = (
+    "word,phonetic,definition,translation\n"
+    "banana,bə'nɑ:nə,a fruit,n. 香蕉\n"
+    "apple,,,n. 另一个释义\n"
+)
+
+
+class TestOfflineDictionary(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.temp_dir.name, "dictionary")
+        os.makedirs(self.source_dir)
+        with open(os.path.join(self.source_dir, "words.csv"), "w", encoding="utf-8") as f:
+            f.write(WORDLIST_CSV)
+        with open(os.path.join(self.source_dir, "words.tsv"), "w", encoding="utf-8") as f:
+            f.write(WORDLIST_TSV)
+        self.db = DBManager(os.path.join(self.temp_dir.name, "files.db"))
+        self.db.add_word("library", "n. 图书馆", 1)
+        self.db.add_word("banana", "香蕉（单词表）", 1)
+        self.index_dir = os.path.join(self.temp_dir.name, "index")
+        self.dictionary = OfflineDictionary(self.db, self.source_dir, self.index_dir, extra_sources=())
+
+    def tearDown(self):
+        self.dictionary.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_nothing_loaded_before_first_lookup(self):
+        """测试创建词典时不读取也不编译词表"""
+        self.assertFalse(os.path.exists(self.index_dir))
+        self.assertEqual(self.dictionary.entry_count, 0)
+        self.dictionary.lookup("apple")
+        self.assertTrue(os.path.exists(self.dictionary.index_path))
+
+    def test_lookup(self):
+        """测试查词：大小写、词形变化、词组、多行释义与单词表中的翻译"""
+        self.assertEqual(self.dictionary.lookup("Apple"), ("apple", "n. 另一个释义"))
+        self.assertEqual(self.dictionary.lookup("studies"), ("study", "v. 学习\nn. 研究"))
+        self.assertEqual(self.dictionary.lookup("look  forward to"), ("look forward to", "期待"))
+        self.assertEqual(self.dictionary.lookup("library,"), ("library", "n. 图书馆"))
+        # 词表优先于单词表
+        self.assertEqual(self.dictionary.lookup("banana"), ("banana", "n. 香蕉"))
+        self.assertIsNone(self.dictionary.lookup("zebra"))
+        self.assertIsNone(self.dictionary.lookup("  "))
+
+    def test_prefix_completion(self):
+        """测试前缀补全按字母顺序返回，且受数量限制"""
+        self.assertEqual([word for word, _ in self.dictionary.complete("app")],
+                         ["apple", "application", "apply"])
+        self.assertEqual(len(self.dictionary.complete("app", limit=2)), 2)
+        self.assertEqual(self.dictionary.complete("zz"), [])
+        self.assertEqual(self.dictionary.complete(""), [])
+
+    def test_rebuilt_only_when_sources_change(self):
+        """测试词表未变化时复用已编译的索引，变化后重新编译"""
+        self.dictionary.lookup("apple")
+        modified = os.path.getmtime(self.dictionary.index_path)
+        reopened = OfflineDictionary(self.db, self.source_dir, self.index_dir, extra_sources=())
+        self.assertEqual(reopened.lookup("apple")[0], "apple")
+        self.assertEqual(os.path.getmtime(self.dictionary.index_path), modified)
+        reopened.close()
+
+        with open(os.path.join(self.source_dir, "more.txt"), "w", encoding="utf-8") as f:
+            f.write("zebra\tn. 斑马\n")
+        self.dictionary.reload()
+        self.assertEqual(self.dictionary.lookup("zebra"), ("zebra", "n. 斑马"))
+
+    def test_prepare_in_background(self):
+        """测试后台编译：prepare 立即返回，编译完成后可以直接查词"""
+        self.assertFalse(self.dictionary.is_ready())
+        self.dictionary.prepare()
+        self.dictionary._prepare_thread.join(5)
+        self.assertTrue(self.dictionary.is_ready())
+        self.assertIsNone(self.dictionary.error)
+        self.assertEqual(self.dictionary.lookup("banana"), ("banana", "n. 香蕉"))
+
+    def test_without_sources(self):
+        """测试没有词表时只使用单词表中的翻译"""
+        dictionary = get_dictionary(self.db)
+        try:
+            self.assertEqual(dictionary.lookup("library"), ("library", "n. 图书馆"))
+            self.assertEqual(dictionary.entry_count, 2)
+        finally:
+            dictionary.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
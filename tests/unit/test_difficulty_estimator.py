@@ -0,0 +1,67 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.difficulty_estimator import DifficultyEstimator
+from services.text_processing import lemmatize, split_sentences, tokenize
+
+EASY_TEXT = "I have a cat. My cat is black. I like my cat. We play in the park every day."
+HARD_TEXT = (
+    "Notwithstanding the ostensibly egalitarian rhetoric permeating contemporary institutional "
+    "discourse, entrenched epistemological hierarchies perpetuate insidious asymmetries in the "
+    "dissemination and legitimation of knowledge."
+)
+
+
+class TestTextProcessing(unittest.TestCase):
+    def test_tokenize_and_sentences(self):
+        """测试分词和分句"""
+        self.assertEqual(tokenize("Don’t stop, it's 2024."), ["don't", "stop", "it's"])
+        self.assertEqual(split_sentences("Hello world. 第一部分\nHow are you?"), ["Hello world.", "How are you?"])
+
+    def test_lemmatize(self):
+        """测试词形还原"""
+        self.assertEqual(lemmatize("walked"), "walk")
+        self.assertEqual(lemmatize("studies"), "study")
+        self.assertEqual(lemmatize("went"), "go")
+        self.assertEqual(lemmatize("this"), "this")
+
+
+class TestDifficultyEstimator(unittest.TestCase):
+    def setUp(self):
+        self.estimator = DifficultyEstimator()
+
+    def test_levels_are_ordered(self):
+        """测试简单文本的级别低于复杂文本"""
+        easy, hard = self.estimator.estimate_many([EASY_TEXT, HARD_TEXT])
+        self.assertIn(easy["level"], ("A1", "A2"))
+        self.assertIn(hard["level"], ("C1", "C2"))
+        self.assertLess(easy["score"], hard["score"])
+
+    def test_batch_matches_single(self):
+        """测试批量估计与逐个估计结果一致"""
+        batch = self.estimator.estimate_many([EASY_TEXT, HARD_TEXT])
+        self.assertEqual(batch[1], self.estimator.estimate(HARD_TEXT))
+
+    def test_moving_average_ttr(self):
+        """测试滑动窗口词型比与逐窗口直接计数一致"""
+        window = DifficultyEstimator.TTR_WINDOW
+        token_ids = np.random.default_rng(0).integers(0, 30, window * 3 + 7)
+        expected = np.mean([len(set(token_ids[i:i + window])) for i in range(len(token_ids) - window + 1)]) / window
+        self.assertAlmostEqual(DifficultyEstimator.moving_average_ttr(token_ids), expected)
+        self.assertAlmostEqual(DifficultyEstimator.moving_average_ttr(np.array([1, 2, 2])), 2 / 3)
+
+    def test_empty_text(self):
+        """测试空文本"""
+        result = self.estimator.estimate("")
+        self.assertEqual(result["level"], "A1")
+        self.assertIn("A1", DifficultyEstimator.format_estimate(result))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.doc_extractor import clean_doc_text, extract_doc_text
+
+SAMPLE_DOC = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '../../storage/f2a0e8c2-b854-466a-bfe1-952ef3fe669c.doc'))
+
+
+class TestDocExtractor(unittest.TestCase):
+    def test_clean_doc_text(self):
+        """测试字段代码、表格和控制字符的处理"""
+        raw = 'See \x13 HYPERLINK "http://x" \x14this link\x15.\rA.\x07B.\x07\x07C.\x07D.\x07\x07End\x0bline'
+        self.assertEqual(clean_doc_text(raw), "See this link.\nA.\tB.\nC.\tD.\nEnd\nline")
+
+    @unittest.skipUnless(os.path.exists(SAMPLE_DOC), "sample .doc not available")
+    def test_extract_sample_doc(self):
+        """测试提取旧版 .doc 试卷正文"""
+        text, truncated = extract_doc_text(SAMPLE_DOC)
+        self.assertFalse(truncated)
+        self.assertTrue(text.startswith("1990年全国普通高等学校招生统一考试"))
+        self.assertIn("A.gave\tB.save\tC.hat\tD.made", text)
+
+        head, truncated = extract_doc_text(SAMPLE_DOC, max_chars=100)
+        self.assertTrue(truncated)
+        self.assertEqual(head, text[:100])
+
+    def test_not_a_doc(self):
+        """测试非 OLE 文件报错"""
+        with tempfile.NamedTemporaryFile(suffix=".doc", delete=False) as f:
+            f.write(b"plain text, not a Word document")
+        try:
+            with self.assertRaises(Exception):
+                extract_doc_text(f.name)
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import tempfile
+
+import docx
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.docx_extractor import extract_docx_text
+
+
+class TestDocxExtractor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "paper.docx")
+        document = docx.Document()
+        document.add_paragraph("21. Choose the best answer.")
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "A. apple"
+        table.cell(0, 1).text = "B. banana"
+        table.cell(1, 0).text = "C. cherry"
+        table.cell(1, 1).text = "D. date"
+        document.add_paragraph("22. Read the passage.")
+        for i in range(200):
+            document.add_paragraph(f"Sentence number {i}.")
+        document.save(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_tables_in_document_order(self):
+        """测试表格内容按文档顺序输出"""
+        text, truncated = extract_docx_text(self.path)
+        self.assertFalse(truncated)
+        lines = text.split("\n")
+        self.assertEqual(lines[:4], ["21. Choose the best answer.", "A. apple\tB. banana",
+                                     "C. cherry\tD. date", "22. Read the passage."])
+        self.assertEqual(lines[-1], "Sentence number 199.")
+
+    def test_stops_at_max_chars(self):
+        """测试达到 max_chars 时提前停止"""
+        text, truncated = extract_docx_text(self.path, max_chars=60)
+        self.assertTrue(truncated)
+        self.assertEqual(len(text), 60)
+        self.assertTrue(text.startswith("21. Choose"))
+
+
+if __name__ == "__main__":
+    unittest.main()
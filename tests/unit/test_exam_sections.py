@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.exam_sections import ExamSectionIndex, parse_sections, section_label
+
+# 提取后没有换行的试卷
+INLINE_PAPER = (
+    "2024年普通高等学校招生全国统一考试 英语 "
+    "第一部分 听力(共两节，满分30分)该部分在笔试结束后进行。"
+    "第二部分 阅读(共两节，满分50分)第一节(共15小题)阅读下列短文，从每题所给的A、B、C、D四个选项中选出最佳选项。"
+    "A Tom loves the library. 21. Why does Tom go there? A. To read. B. To sleep. "
+    "22. What does he borrow? A. Books. B. Films. "
+    "第二节(共5小题)阅读下面短文，从短文后的选项中选出可以填入空白处的最佳选项。选项中有两项为多余选项。"
+    "Plants need light. 36 Water matters too. 37 "
+    "第三部分 语言运用(共两节)第一节(共15小题)阅读下面短文，掌握其大意，从每题所给的四个选项中选出最佳选项。"
+    "The boy ___41___ home and ___42___ his dog. 41. A. ran B. sat 42. A. fed B. lost "
+    "第二节(共10小题)阅读下面短文，在空白处填入1个适当的单词或括号内单词的正确形式。"
+    "The city ___56___ (build) long ago. "
+    "第四部分 写作(共两节)第一节(满分15分)假定你是李华，写一封信。"
+    "答案 21. A 22. A 41. A 42. A"
+)
+
+# 按行编号的试卷
+NUMBERED_PAPER = (
+    "一. 阅读理解A篇 原题\n"
+    "Some text.\n"
+    "21. First question?\n"
+    "22. Second question?\n"
+    "答案解析 21. B 22. C\n"
+    "二. 完形填空 原题\n"
+    "I ___41___ to school and ___42___ my friend.\n"
+    "八. 写作第一节 原题\n"
+    "假定你是李华，写一封邮件。\n"
+)
+
+
+class TestParseSections(unittest.TestCase):
+    def test_inline_headings(self):
+        """测试没有换行的试卷按“部分/节”标题切分并识别题型"""
+        sections = parse_sections(INLINE_PAPER)
+        self.assertEqual([section["kind"] for section in sections],
+                         ["other", "listening", "reading", "reading", "cloze", "grammar", "writing"])
+        reading = sections[2]
+        # “第二部分 阅读……第一节”合为一个标题
+        self.assertTrue(reading["title"].startswith("第二部分"))
+        self.assertEqual((reading["first_question"], reading["last_question"]), (21, 22))
+        self.assertEqual(sections[4]["first_question"], 41)
+        self.assertEqual(sections[5]["first_question"], 56)
+
+    def test_offsets_cover_paper(self):
+        """测试各部分首尾相接，覆盖整份试卷"""
+        sections = parse_sections(INLINE_PAPER)
+        self.assertEqual(sections[0]["start"], 0)
+        self.assertEqual(sections[-1]["end"], len(INLINE_PAPER))
+        for previous, section in zip(sections, sections[1:]):
+            self.assertEqual(previous["end"], section["start"])
+        cloze = sections[4]
+        self.assertIn("___41___", INLINE_PAPER[cloze["start"]:cloze["end"]])
+
+    def test_numbered_headings_and_answer_keys(self):
+        """测试编号标题的试卷，答案中重复出现的题号不计入"""
+        sections = parse_sections(NUMBERED_PAPER)
+        self.assertEqual([section["kind"] for section in sections], ["reading", "cloze", "writing"])
+        self.assertEqual([number for number, _ in sections[0]["questions"]], [21, 22])
+        self.assertEqual(section_label(sections[1]), "完形填空 二. 完形填空 原题 (41-42)")
+        self.assertEqual(sections[2]["title"], "八. 写作第一节 原题")
+
+    def test_plain_text(self):
+        """测试没有试卷标题的普通文本不切分"""
+        self.assertEqual(parse_sections("Plants need light and water.\n1. They grow."), [])
+
+
+class TestExamSectionIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.temp_dir.name, "files.db"))
+        self.index = ExamSectionIndex(self.db)
+        self.db.insert_file("a", "a.docx", "a.docx", ".docx", 1, INLINE_PAPER, "")
+        self.db.insert_file("b", "b.docx", "b.docx", ".docx", 1, NUMBERED_PAPER, "")
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_index_and_section_text(self):
+        """测试按偏移量读取单个部分的文本，内容未变时不重新解析"""
+        self.assertTrue(self.index.index_document("a"))
+        self.assertFalse(self.index.index_document("a"))
+        sections = self.index.get_sections("a")
+        self.assertEqual(len(sections), 7)
+        grammar = sections[5]
+        text = self.index.section_text("a", grammar["ordinal"])
+        self.assertTrue(text.startswith("第二节"))
+        self.assertIn("___56___", text)
+        self.assertEqual(text, self.index.section_text("a", grammar["ordinal"], INLINE_PAPER))
+        self.assertIsNone(self.index.section_text("a", 99))
+
+    def test_sections_of_kind(self):
+        """测试跨文件按题型列出各部分"""
+        self.index.index_document("a")
+        self.index.index_document("b")
+        self.assertEqual([(section["file_id"], section["first_question"])
+                          for section in self.index.sections_of_kind("cloze")], [("a", 41), ("b", 41)])
+
+    def test_reindex_and_remove(self):
+        """测试内容修改后重新解析，删除文件后清除其部分"""
+        self.index.index_document("b")
+        self.db.update_file("b", "一. 完形填空\nI ___1___ home.", "")
+        self.assertTrue(self.index.index_document("b"))
+        self.assertEqual([section["kind"] for section in self.index.get_sections("b")], ["cloze"])
+        self.index.remove_document("b")
+        self.assertEqual(self.index.get_sections("b"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
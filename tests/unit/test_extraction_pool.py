@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch, MagicMock
+
+import docx
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from file_utils import FileUtils
+from services.extraction_pool import ExtractionError, ExtractionMemoryExceeded, ExtractionPool, ExtractionTimeout
+
+
+class TestExtractionPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.docx_path = os.path.join(self.temp_dir.name, "a.docx")
+        document = docx.Document()
+        document.add_paragraph("Hello from a worker process.")
+        document.save(self.docx_path)
+        self.pool = ExtractionPool(workers=2, timeout=60)
+
+    def tearDown(self):
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    def test_extract_in_worker(self):
+        """测试在子进程中提取并复用进程"""
+        text, truncated, method = self.pool.extract(self.docx_path)
+        self.assertEqual(text, "Hello from a worker process.")
+        self.assertEqual(method, "Word文档 (docx)")
+        worker = self.pool._idle[0]
+        self.pool.extract(self.docx_path)
+        self.assertIs(self.pool._idle[0], worker)
+
+    def test_errors_do_not_raise_in_bulk(self):
+        """测试批量提取时单个文件失败不影响其他文件"""
+        bad_path = os.path.join(self.temp_dir.name, "bad.doc")
+        with open(bad_path, "wb") as f:
+            f.write(b"garbage")
+        results = {path: text for path, text, _ in self.pool.extract_many([self.docx_path, bad_path])}
+        self.assertEqual(results[self.docx_path], "Hello from a worker process.")
+        self.assertIsNone(results[bad_path])
+
+    def test_timeout_kills_worker(self):
+        """测试超时后终止子进程并报错"""
+        self.pool.timeout = 0
+        with self.assertRaises(ExtractionTimeout):
+            self.pool.extract(self.docx_path)
+        self.assertEqual(self.pool._idle, [])
+        self.assertTrue(issubclass(ExtractionTimeout, ExtractionError))
+
+    def test_memory_limit_kills_worker(self):
+        """测试子进程内存超过限制时被终止"""
+        self.pool.memory_limit = 1024 * 1024
+        self.pool.SUPERVISE_INTERVAL = 0
+        with self.assertRaises(ExtractionMemoryExceeded):
+            self.pool.extract(self.docx_path)
+        self.assertEqual(self.pool._idle, [])
+
+    def test_worker_recycled_after_max_jobs(self):
+        """测试子进程处理若干文件后被回收"""
+        self.pool.max_jobs_per_worker = 2
+        self.pool.extract(self.docx_path)
+        worker = self.pool._idle[0]
+        self.pool.extract(self.docx_path)
+        self.assertEqual(self.pool._idle, [])
+        self.assertFalse(worker.process.is_alive())
+
+
+class TestWordFallback(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.doc_path = os.path.join(self.temp_dir.name, "broken.doc")
+        with open(self.doc_path, "wb") as f:
+            f.write(b"not an OLE file")
+        pool = MagicMock()
+        pool.extract.side_effect = ExtractionError("无法解析")
+        self.pool_patch = patch("file_utils.get_extraction_pool", return_value=pool)
+        self.pool_patch.start()
+
+    def tearDown(self):
+        self.pool_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_word_is_last_resort(self):
+        """测试本地解析失败时交给 Word（win32com）读取"""
+        word = MagicMock()
+        word.Documents.Open.return_value.Content.Text = "Read by Word.\r\rSecond line."
+        win32com = MagicMock()
+        win32com.client.Dispatch.return_value = word
+        with patch.dict(sys.modules, {"win32com": win32com, "win32com.client": win32com.client}):
+            content, method = FileUtils.extract_text(self.doc_path)
+        self.assertEqual(content, "Read by Word.\nSecond line.")
+        self.assertEqual(method, "Word文档 (win32com)")
+        word.Quit.assert_called_once()
+
+    def test_error_kept_without_word(self):
+        """测试没有 pywin32 时仍然抛出原来的解析错误"""
+        with patch.dict(sys.modules, {"win32com": None, "win32com.client": None}):
+            with self.assertRaises(ExtractionError):
+                FileUtils.extract_text(self.doc_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import time
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.grammar_patterns import count_points, points_for, select_sentences, tag_sentence, tag_text
+
+EXAMPLES = {
+    "By the time we arrived, the film had already started.": "past_perfect",
+    "She has lived here for ten years.": "present_perfect",
+    "They were watching TV when I called.": "progressive",
+    "The book was written by a famous author.": "passive",
+    "The man who lives next door is a doctor.": "relative_clause",
+    "If it rains tomorrow, we will stay at home.": "conditional",
+    "If I were you, I would accept the offer.": "subjunctive",
+    "Never have I seen such a beautiful sunset.": "inversion",
+    "Only when he came back did she realize the truth.": "inversion",
+    "You must have left your keys in the car.": "modal_perfect",
+    "It was Tom who broke the window.": "cleft",
+    "This problem is more difficult than that one.": "comparative",
+    "I will call you later.": "future",
+}
+
+
+class TestGrammarPatterns(unittest.TestCase):
+    def test_examples_tagged(self):
+        """测试典型例句被标注为对应的语法点"""
+        for sentence, point in EXAMPLES.items():
+            self.assertIn(point, tag_sentence(sentence), sentence)
+
+    def test_no_false_tags(self):
+        """测试形容词性 -ing、情态动词完成式等不会误标"""
+        self.assertEqual(tag_sentence("The story is very interesting."), [])
+        self.assertEqual(tag_sentence("It is important that we finish on time."), [])
+        self.assertNotIn("present_perfect", tag_sentence("You must have left your keys in the car."))
+        self.assertNotIn("inversion", tag_sentence("I have never seen it."))
+
+    def test_points_for(self):
+        """测试按中英文名称识别用户指定的语法点"""
+        self.assertEqual(points_for("过去完成时"), ["past_perfect"])
+        self.assertEqual(points_for("the Passive voice"), ["passive"])
+        self.assertEqual(set(points_for("虚拟语气和倒装")), {"subjunctive", "inversion"})
+        self.assertEqual(points_for("word order"), [])
+        # 泛指的说法不会被收窄为某一个语法点
+        self.assertEqual(points_for("情态动词"), [])
+        self.assertEqual(points_for("will 和 would 的区别"), [])
+        self.assertEqual(points_for("情态动词完成式"), ["modal_perfect"])
+        self.assertEqual(points_for(None), [])
+
+    def test_tag_text_and_select(self):
+        """测试全文标注带偏移量，只选出指定语法点的句子"""
+        text = "\n".join(EXAMPLES) + "\nHello there."
+        tagged = tag_text(text)
+        self.assertEqual(len(tagged), len(EXAMPLES))
+        for offset, sentence, _ in tagged:
+            self.assertEqual(text[offset:offset + len(sentence)], sentence)
+        self.assertEqual(select_sentences(tagged, ["inversion"]),
+                         ["Never have I seen such a beautiful sunset.",
+                          "Only when he came back did she realize the truth."])
+        self.assertEqual(len(select_sentences(tagged, ["inversion"], limit=1)), 1)
+        self.assertEqual(count_points(tagged)["inversion"], 2)
+
+    def test_speed(self):
+        """测试长文档单遍标注足够快"""
+        text = " ".join(EXAMPLES) * 200
+        start = time.perf_counter()
+        tag_text(text)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import hashlib
+import sqlite3
+import tempfile
+
+import docx
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.ingest import ingest_file
+
+TEXT = "Reading comprehension 阅读理解\nThe quick brown fox jumps over the lazy dog. 狐狸跳过了懒狗。\n" * 50
+
+
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage = os.path.join(self.temp_dir.name, "storage")
+        os.makedirs(self.storage)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_text_decoded_across_chunks(self):
+        """测试分块复制时多字节字符跨块也能正确解码"""
+        for encoding in ("utf-8", "gb18030"):
+            data = TEXT.encode(encoding)
+            source = self.write(f"paper-{encoding}.txt", data)
+            result = ingest_file(source, self.storage, encoding, chunk_size=7)
+            self.assertEqual(result["content"], TEXT)
+            self.assertEqual(result["file_size"], len(data))
+            self.assertEqual(result["content_hash"], hashlib.sha256(data).hexdigest())
+            with open(result["stored_path"], "rb") as f:
+                self.assertEqual(f.read(), data)
+        self.assertFalse([name for name in os.listdir(self.storage) if name.endswith(".part")])
+
+    def test_docx_extracted(self):
+        """测试 Word 文档上传时提取正文"""
+        source = os.path.join(self.temp_dir.name, "paper.docx")
+        document = docx.Document()
+        document.add_paragraph("Choose the best answer.")
+        document.save(source)
+        result = ingest_file(source, self.storage, "f1")
+        self.assertTrue(result["extracted"])
+        self.assertEqual(result["content"], "Choose the best answer.")
+
+    def test_hash_column_and_lookup(self):
+        """测试旧数据库增加 content_hash 列并可按哈希查找"""
+        db_path = os.path.join(self.temp_dir.name, "old.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE files (id TEXT PRIMARY KEY, original_name TEXT NOT NULL, stored_path TEXT NOT NULL, "
+                     "file_type TEXT, file_size INTEGER, upload_date TEXT, last_modified TEXT, content TEXT, metadata TEXT)")
+        conn.close()
+
+        db = DBManager(db_path)
+        try:
+            db.insert_file("f1", "a.txt", "a.txt", ".txt", 1, "a", "", content_hash="abc")
+            self.assertEqual([row[0] for row in db.find_files_by_hash("abc")], ["f1"])
+            self.assertEqual(db.find_files_by_hash("other"), [])
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.job_queue import JobQueue
+from services.background_jobs import DIFFICULTY_JOB, INDEX_JOB, VECTOR_JOB, register_default_jobs
+
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "files.db")
+        self.db = DBManager(self.db_path)
+        self.queue = JobQueue(self.db_path, retry_delay=0)
+        register_default_jobs(self.queue)
+        self.db.add_content_listener(self.queue.content_changed)
+        self.db.insert_file("a", "a.txt", "a.txt", ".txt", 1, "Plants need light and water.", "")
+
+    def tearDown(self):
+        self.queue.stop()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_content_change_runs_pipeline(self):
+        """测试内容变化后排队并执行查重、索引、难度评估与相似检索等任务"""
+        self.assertEqual(self.queue.status_counts(), {"pending": 7})
+        self.assertEqual(self.queue.run_pending(), 7)
+        self.assertEqual(json.loads(self.queue.get_result(DIFFICULTY_JOB, "a"))["level"][0], "A")
+        self.assertEqual(self.queue.get_result(INDEX_JOB, "a"), "indexed")
+        self.assertEqual(self.queue.get_result(VECTOR_JOB, "a"), "indexed")
+
+    def test_enqueue_is_idempotent(self):
+        """测试相同内容不会重复排队，新内容取代旧任务"""
+        self.queue.run_pending()
+        self.queue.content_changed("a")
+        self.assertEqual(self.queue.run_pending(), 0)
+
+        self.db.update_file("a", "Different text.", "")
+        self.db.update_file("a", "Different text again.", "")
+        self.assertEqual(self.queue.status_counts()["pending"], 7)
+
+    def test_retry_then_fail(self):
+        """测试失败任务重试后标记为失败，并可以重新排队"""
+        calls = []
+
+        def flaky(db_manager, file_id):
+            calls.append(file_id)
+            raise RuntimeError("boom")
+
+        self.queue.register("flaky", flaky, priority=0)
+        self.queue.enqueue("flaky", "a")
+        self.queue.run_pending()
+        self.assertEqual(len(calls), self.queue.max_attempts)
+        failed = [job for job in self.queue.list_jobs() if job[1] == "flaky"][0]
+        self.assertEqual((failed[3], failed[6]), ("failed", "boom"))
+        self.assertEqual(self.queue.retry_failed(), 1)
+
+    def test_survives_restart(self):
+        """测试任务持久化，重启后由后台线程完成"""
+        restarted = JobQueue(self.db_path, poll_interval=0.05)
+        register_default_jobs(restarted)
+        restarted.start()
+        try:
+            deadline = time.time() + 5
+            while restarted.status_counts().get("done", 0) < 7 and time.time() < deadline:
+                time.sleep(0.05)
+        finally:
+            restarted.stop()
+        self.assertEqual(restarted.status_counts(), {"done": 7})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from models.user import User
+from services.learning_service import LearningService
+
+
+class TestLearningService(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.db.add_words((f"word{i}", f"词{i}", i % 5 + 1, [f"Example {i}."]) for i in range(100))
+        self.user_id = self.db.add_user("learner", "learner@example.com", level=2)
+        self.user = User.from_dict(self.db.get_user(self.user_id))
+        self.service = LearningService(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_recommend_skips_studied_words(self):
+        """测试推荐只返回用户等级下还没学过的单词"""
+        first = self.service.recommend_words_for_user(self.user, limit=3)
+        self.assertEqual([w["text"] for w in first], ["word1", "word6", "word11"])
+        self.assertEqual(first[0]["examples"], ["Example 1."])
+
+        self.service.process_word_answer(self.user_id, first[0]["id"], True)
+        again = self.service.recommend_words_for_user(self.user, limit=3)
+        self.assertEqual([w["text"] for w in again], ["word6", "word11", "word16"])
+
+    def test_recommendation_uses_indexes(self):
+        """测试推荐查询走索引而不是扫描整张表"""
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        self.service.recommend_words_for_user(self.user)
+        self.db.conn.set_trace_callback(None)
+
+        plan = " ".join(row[-1] for row in self.db.conn.execute("EXPLAIN QUERY PLAN " + statements[-1]))
+        self.assertIn("idx_words_difficulty", plan)
+        self.assertIn("user_id=? AND word_id=?", plan)
+        self.assertNotIn("SCAN", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_answers_update_status(self):
+        """测试答题次数累计并按正确次数改变状态"""
+        word_id = self.db.get_words_by_difficulty(2, limit=1)[0]["id"]
+        for _ in range(3):
+            self.assertTrue(self.service.process_word_answer(self.user_id, word_id, True))
+        progress = self.db.get_user_progress(self.user_id, word_id)
+        self.assertEqual((progress["attempts"], progress["correct_attempts"]), (3, 3))
+        self.assertEqual(progress["status"], "reviewing")
+
+        self.service.process_word_answer(self.user_id, word_id, False)
+        self.assertEqual(self.db.get_user_words(self.user_id, "reviewing")[0]["attempts"], 4)
+
+    def test_level_follows_mastered_words(self):
+        """测试掌握足够单词后用户升级"""
+        user_id = self.db.add_user("beginner", "beginner@example.com")
+        for word in self.db.get_words_by_difficulty(1, limit=20) + self.db.get_words_by_difficulty(2, limit=20):
+            self.db.update_user_progress(user_id, word["id"], "mastered", 5, 5)
+        self.assertFalse(self.service.check_and_update_user_level(user_id))
+
+        for word in self.db.get_words_by_difficulty(3, limit=10):
+            self.db.update_user_progress(user_id, word["id"], "mastered", 5, 5)
+        self.assertTrue(self.service.check_and_update_user_level(user_id))
+        self.assertEqual(self.db.get_user(user_id)["level"], 2)
+
+    def test_due_words_see_answers_after_first_load(self):
+        """测试复习队列载入后，普通答题写入的单词也会出现在待复习列表中"""
+        word_ids = [word["id"] for word in self.db.get_words_by_difficulty(2, limit=5)]
+        self.service.process_word_answer(self.user_id, word_ids[0], True)
+        self.assertEqual([card["id"] for card in self.service.get_due_words(self.user_id)], word_ids[:1])
+
+        self.service.process_word_answer(self.user_id, word_ids[1], True)
+        expected = [card["id"] for card in self.db.get_review_queue(self.user_id, 10)]
+        self.assertEqual(sorted(expected), sorted(word_ids[:2]))
+        self.assertEqual([card["id"] for card in self.service.get_due_words(self.user_id)], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
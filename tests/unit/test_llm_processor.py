@@ -0,0 +1,88 @@
+import unittest
+import sys
+import os
+import tempfile
+import json
+from unittest.mock import patch, MagicMock
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.llm_processor import LLMProcessor
+from services.quiz_bank import QuizFormatError
+
+
+class TestLLMProcessor(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.processor = LLMProcessor(api_key="test-key",
+                                      cache_db=os.path.join(self.temp_dir.name, "cache.db"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_messages_share_prefix(self):
+        """测试同一文档的不同问题拥有相同的前缀消息"""
+        first = self.processor.build_messages("Some content.", "meta", "What is it?")
+        second = self.processor.build_messages("Some content.", "meta", "Who wrote it?")
+        self.assertEqual(first[:-1], second[:-1])
+        self.assertNotEqual(first[-1], second[-1])
+        self.assertNotIn("Query", first[1]["content"])
+
+    @patch('services.llm_processor.requests.post')
+    def test_usage_recorded(self, mock_post):
+        """测试记录每次请求的用量与前缀缓存命中"""
+        response = MagicMock()
+        response.json.return_value = {
+            "choices": [{"message": {"content": "answer"}}],
+            "usage": {"prompt_tokens": 1000, "completion_tokens": 50,
+                      "prompt_cache_hit_tokens": 800, "prompt_cache_miss_tokens": 200}
+        }
+        mock_post.return_value = response
+
+        self.assertEqual(self.processor.answer_query("Some content.", "meta", "What?"), "answer")
+        # 第二次命中本地缓存，不再请求 API
+        self.assertEqual(self.processor.answer_query("Some content.", "meta", "What?"), "answer")
+        self.assertEqual(mock_post.call_count, 1)
+
+        summary = self.processor.get_usage_summary()
+        self.assertEqual(summary["calls"], 2)
+        self.assertEqual(summary["local_cache_hits"], 1)
+        self.assertEqual(summary["prompt_tokens"], 1000)
+        self.assertAlmostEqual(summary["prompt_cache_hit_rate"], 0.8)
+
+    @patch('services.llm_processor.requests.post')
+    def test_generate_quiz_json(self, mock_post):
+        """测试出题使用 JSON 模式并返回校验过的题目，格式错误的回复不缓存"""
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "1. Not JSON"}}]}
+        mock_post.return_value = response
+
+        with self.assertRaises(QuizFormatError):
+            self.processor.generate_quiz("Some content.")
+        self.assertEqual(mock_post.call_args.kwargs["json"]["response_format"], {"type": "json_object"})
+
+        questions = {"questions": [{"type": "open", "skill": "reading", "difficulty": 2,
+                                    "question": "What is it about?", "answer": "Content."}]}
+        response.json.return_value = {"choices": [{"message": {"content": json.dumps(questions)}}]}
+        items = self.processor.generate_quiz("Some content.")
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(items[0]["answer"], "Content.")
+        self.assertEqual(items[0]["options"], [])
+
+    @patch('services.llm_processor.requests.post')
+    def test_explain_grammar_flagged_sentences(self, mock_post):
+        """测试指定句子时只把这些句子交给 LLM"""
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "explanation"}}]}
+        mock_post.return_value = response
+
+        content = "Unrelated opening paragraph. " * 50 + "She had already left."
+        self.processor.explain_grammar(content, "past perfect", sentences=["She had already left."])
+        sent = json.dumps(mock_post.call_args.kwargs["json"]["messages"])
+        self.assertIn("1. She had already left.", sent)
+        self.assertNotIn("Unrelated opening paragraph", sent)
+
+
+if __name__ == "__main__":
+    unittest.main()
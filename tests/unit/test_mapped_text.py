@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.mapped_text import MappedTextFile, TextLines
+
+
+class TestMappedTextFile(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, data, name="doc.txt"):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def open_file(self, data, encoding="utf-8"):
+        mapped = MappedTextFile(self.write_file(data), encoding)
+        self.addCleanup(mapped.close)
+        return mapped
+
+    def test_line_index(self):
+        """测试行索引在有无结尾换行时都正确"""
+        self.assertEqual(self.open_file(b"one\ntwo\nthree\n").line_count, 3)
+        mapped = self.open_file(b"one\ntwo\nthree")
+        self.assertEqual(mapped.line_count, 3)
+        self.assertEqual(mapped.get_lines(0, 10), ["one", "two", "three"])
+
+    def test_empty_file(self):
+        """测试空文件没有任何行"""
+        mapped = self.open_file(b"")
+        self.assertEqual(mapped.line_count, 0)
+        self.assertEqual(mapped.get_lines(0, 10), [])
+
+    def test_window_ranges(self):
+        """测试按窗口读取任意位置的行，越界部分被截掉"""
+        lines = [f"line {i}" for i in range(1000)]
+        mapped = self.open_file(("\r\n".join(lines) + "\r\n").encode())
+        self.assertEqual(mapped.line_count, 1000)
+        self.assertEqual(mapped.get_lines(500, 3), lines[500:503])
+        self.assertEqual(mapped.get_lines(998, 10), lines[998:])
+        self.assertEqual(mapped.get_lines(2000, 10), [])
+
+    def test_detects_gbk(self):
+        """测试自动检测中文编码"""
+        text = "全国普通高等学校招生统一考试英语试卷\n第一部分 听力理解\n" * 20
+        mapped = MappedTextFile(self.write_file(text.encode("gbk")))
+        self.addCleanup(mapped.close)
+        self.assertEqual(mapped.get_lines(1, 1), ["第一部分 听力理解"])
+
+    def test_rejects_utf16(self):
+        """测试不支持按字节查找换行的编码"""
+        path = self.write_file("hello\nworld".encode("utf-16"))
+        with self.assertRaises(ValueError):
+            MappedTextFile(path, "utf-16")
+
+    def test_text_lines_same_interface(self):
+        """测试内存文本与映射文件按行读取的结果一致"""
+        text = "a\nb\nc"
+        self.assertEqual(TextLines(text).get_lines(1, 5), self.open_file(text.encode()).get_lines(1, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
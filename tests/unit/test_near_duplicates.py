@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import random
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.background_jobs import dedupe_job, sentence_job
+from services.near_duplicates import DuplicateIndex, minhash, shingles, similarity
+
+PAPER = (
+    "Part I Listening Comprehension. Section A. Directions: In this section, you will hear ten short "
+    "conversations. At the end of each conversation, a question will be asked about what was said. "
+    "1. A) She will go to the library. B) She has finished her homework. C) She is looking for a job. "
+    "2. A) The train was late again. B) The weather was terrible yesterday. C) The museum is closed today. "
+    "Part II Reading Comprehension. Read the passage and answer the questions that follow it. "
+    "The history of the city goes back more than two thousand years, when traders settled by the river."
+)
+# 同一份试卷从扫描件识别出的文本：换行、标点不同，个别词识别错误
+SCANNED = PAPER.replace(". ", ".\n").replace("conversations", "conversatlons").replace("museum", "rnuseum")
+OTHER = (
+    "Unit 3 Writing. Write a letter to your friend describing your last holiday. You should write at "
+    "least 120 words and use the hints given below. Remember to mention where you went, who you went with, "
+    "what you did there and how you felt about the trip. Marks are given for organization and grammar."
+)
+
+
+class TestNearDuplicates(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.temp_dir.name, "files.db"))
+        self.index = DuplicateIndex(self.db)
+        for file_id, content in (("doc", PAPER), ("scan", SCANNED), ("other", OTHER)):
+            path = os.path.join(self.temp_dir.name, file_id + ".txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.db.insert_file(file_id, file_id + ".txt", path, ".txt", len(content), content, "")
+
+    def tearDown(self):
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_signature_estimates_jaccard(self):
+        """测试签名相似度接近真实的 Jaccard 相似度"""
+        a, b = set(shingles(PAPER).tolist()), set(shingles(SCANNED).tolist())
+        jaccard = len(a & b) / len(a | b)
+        estimate = similarity(minhash(shingles(PAPER)), minhash(shingles(SCANNED)))
+        self.assertAlmostEqual(estimate, jaccard, delta=0.12)
+        self.assertLess(similarity(minhash(shingles(PAPER)), minhash(shingles(OTHER))), 0.1)
+
+    def test_detects_duplicate_of_earlier_file(self):
+        """测试后上传的近似副本指向原件，不相关的文件不受影响"""
+        self.assertIsNone(self.index.add_document("doc"))
+        original, score = self.index.add_document("scan")
+        self.assertEqual(original, "doc")
+        self.assertGreaterEqual(score, 0.7)
+        self.assertIsNone(self.index.add_document("other"))
+        self.assertEqual(self.index.original_of("scan"), "doc")
+        self.assertEqual([file_id for file_id, _ in self.index.find_duplicates("doc")], ["scan"])
+        # 内容不变时直接返回已有结果
+        self.assertEqual(self.index.add_document("scan"), (original, score))
+
+    def test_jobs_do_not_wait_for_dedupe(self):
+        """测试查重作业还没执行时，例句索引作业也能识别并跳过副本"""
+        self.assertEqual(sentence_job(self.db, "doc"), "indexed")
+        self.assertEqual(sentence_job(self.db, "scan"), "skipped: duplicate")
+        self.assertEqual(self.index.original_of("scan"), "doc")
+        # 之后执行的查重作业直接沿用已有的结果
+        self.assertTrue(dedupe_job(self.db, "scan").startswith("duplicate of doc"))
+
+    def test_short_text_ignored(self):
+        """测试文字太少的文件（如未识别的图片）不参与查重"""
+        self.assertIsNone(self.index.add_document("a", "Page 1"))
+        self.assertIsNone(self.index.add_document("b", "Page 1"))
+        self.assertEqual(self.index.report(), [])
+
+    def test_report_and_merge(self):
+        """测试查重报告按组列出副本，合并后删除副本记录和存储文件"""
+        for file_id in ("doc", "scan", "other"):
+            self.index.add_document(file_id)
+        report = self.index.report()
+        self.assertEqual(len(report), 1)
+        self.assertEqual([file_id for file_id, _ in report[0]], ["doc", "scan"])
+
+        stored_path = self.db.get_file_for_query("scan", with_content=False)["stored_path"]
+        self.assertEqual(self.index.merge("doc", ["scan"]), 1)
+        self.assertIsNone(self.db.get_file_content("scan"))
+        self.assertFalse(os.path.exists(stored_path))
+        self.assertEqual(self.index.report(), [])
+        self.assertIsNotNone(self.db.get_file_content("doc"))
+
+    def test_lookup_is_sublinear(self):
+        """测试大量文件时查找候选仍然很快"""
+        rng = random.Random(0)
+        words = sorted(set((PAPER + OTHER).lower().split()))
+        for i in range(1000):
+            self.index.add_document(f"f{i}", " ".join(rng.choice(words) for _ in range(200)))
+        start = time.perf_counter()
+        self.index.add_document("doc")
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.passage_retriever import PassageRetriever, estimate_tokens, split_passages
+
+DOCUMENT = "\n".join(
+    f"{i}. This question is about topic {i} and the weather in city {i}." for i in range(1, 300)
+) + "\n\n450. The photosynthesis question asks about chlorophyll in leaves.\n"
+
+
+class TestPassageRetriever(unittest.TestCase):
+    def setUp(self):
+        self.retriever = PassageRetriever(passage_chars=400)
+
+    def test_split_passages(self):
+        """测试分段保持原文顺序和偏移"""
+        passages = split_passages(DOCUMENT, max_chars=400)
+        self.assertGreater(len(passages), 10)
+        self.assertTrue(all(len(text) <= 400 for _, text in passages))
+        start, text = passages[-1]
+        self.assertTrue(DOCUMENT[start:].startswith(text.split("\n")[0]))
+
+    def test_retrieve_relevant_passage(self):
+        """测试只返回相关段落且不超过预算"""
+        passages = self.retriever.retrieve(DOCUMENT, "What is chlorophyll?", top_k=2, token_budget=300)
+        joined = "\n".join(text for _, text in passages)
+        self.assertIn("chlorophyll", joined)
+        self.assertLessEqual(sum(estimate_tokens(text) for _, text in passages), 300)
+
+    def test_chinese_question_matches_number(self):
+        """测试中文问题可以按题号命中"""
+        passages = self.retriever.retrieve(DOCUMENT, "第450题讲的是什么？", top_k=1)
+        self.assertIn("450.", passages[0][1])
+
+    def test_index_cached_until_content_changes(self):
+        """测试索引按文件缓存，内容变化才重建"""
+        first = self.retriever.get_index(DOCUMENT, "f1")
+        self.assertIs(self.retriever.get_index(DOCUMENT, "f1"), first)
+        self.assertIsNot(self.retriever.get_index(DOCUMENT + "more", "f1"), first)
+        self.retriever.invalidate("f1")
+        self.assertIsNot(self.retriever.get_index(DOCUMENT, "f1"), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import json
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.quiz_bank import QuizBank, QuizFormatError, parse_quiz_response, validate_quiz_item
+from services.quiz_generator import QuizGenerator
+
+CHOICE = {"type": "choice", "skill": "vocabulary", "difficulty": 2, "question": "Pick the synonym of 'big'.",
+          "options": ["large", "small", "thin"], "answer": "large", "explanation": "large = big"}
+OPEN = {"type": "open", "skill": "reading", "difficulty": 4, "question": "What is the main idea?",
+        "answer": "Energy policy."}
+
+
+class TestQuizValidation(unittest.TestCase):
+    def test_valid_items_normalized(self):
+        """测试合法题目被规范化并补全默认值"""
+        item = validate_quiz_item({"type": "cloze", "question": " The ___ is blue. ", "answer": "sky"})
+        self.assertEqual(item["question"], "The ___ is blue.")
+        self.assertEqual((item["skill"], item["difficulty"], item["options"]), ("vocabulary", 3, []))
+
+    def test_invalid_items_rejected(self):
+        """测试不符合格式的题目被拒绝"""
+        for bad in (dict(CHOICE, answer="huge"), dict(CHOICE, options=["large"]), dict(CHOICE, difficulty=9),
+                    dict(CHOICE, type="essay"), dict(OPEN, answer=""), dict(OPEN, skill="math"), "text"):
+            with self.assertRaises(QuizFormatError):
+                validate_quiz_item(bad)
+
+    def test_parse_response(self):
+        """测试解析 JSON 回复：跳过错误题目，全部错误或不是 JSON 时报错"""
+        items, errors = parse_quiz_response(json.dumps({"questions": [CHOICE, dict(OPEN, answer=None)]}))
+        self.assertEqual(len(items), 1)
+        self.assertEqual(len(errors), 1)
+        with self.assertRaises(QuizFormatError):
+            parse_quiz_response("1. What is the main idea?")
+        with self.assertRaises(QuizFormatError):
+            parse_quiz_response(json.dumps({"questions": [dict(OPEN, type="essay")]}))
+
+
+class TestQuizBank(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.bank = QuizBank(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_store_and_practice(self):
+        """测试存储题目并按文件、技能和难度组卷"""
+        self.assertEqual(self.bank.add_items("f1", [CHOICE, OPEN], "deepseek-chat", "d1"), 2)
+        self.assertEqual(self.bank.add_items("f1", [CHOICE], "deepseek-chat", "d1"), 0)
+        self.assertTrue(self.bank.has_items("f1", "deepseek-chat", "d1"))
+
+        practice = self.bank.practice_set(file_id="f1", skill="vocabulary")
+        self.assertEqual(len(practice), 1)
+        self.assertEqual(practice[0]["options"], CHOICE["options"])
+        self.assertEqual(len(self.bank.practice_set(difficulty=(3, 5))), 1)
+        self.assertEqual(self.bank.practice_set(file_id="f2"), [])
+        self.assertEqual(self.bank.counts("f1"), {("vocabulary", 2): 1, ("reading", 4): 1})
+
+    def test_new_content_replaces_items(self):
+        """测试文件内容变化后旧题目被替换"""
+        self.bank.add_items("f1", [CHOICE, OPEN], "deepseek-chat", "d1")
+        self.bank.add_items("f1", [OPEN], "local", "d2")
+        self.assertFalse(self.bank.has_items("f1", "deepseek-chat", "d1"))
+        self.assertEqual(len(self.bank.practice_set(file_id="f1")), 1)
+
+    def test_local_items_accepted(self):
+        """测试本地生成的题目符合题库格式"""
+        text = ("Scientists have discovered that the climate is changing faster than predicted. "
+                "She carefully examined the ancient manuscripts in the museum library.")
+        items = QuizGenerator().generate(text)
+        self.assertEqual(self.bank.add_items("f1", items, "local", "d1"), len(items))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import time
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.quiz_generator import BLANK, QuizGenerator, format_quiz
+
+SAMPLE = (
+    "The government announced a series of measures to encourage investment in renewable energy. "
+    "Scientists have discovered that the climate is changing faster than predicted. "
+    "Many students struggled with the difficult examination questions last week.\n\n"
+    "The committee recommended several improvements to the public transport system. "
+    "Farmers are worried about the increasing costs of fertilizer and equipment. "
+    "She carefully examined the ancient manuscripts in the museum library. "
+    "The company is developing new technologies to reduce pollution in cities. "
+    "Too short. "
+)
+
+
+class TestQuizGenerator(unittest.TestCase):
+    def setUp(self):
+        self.generator = QuizGenerator()
+
+    def test_items_blank_the_answer(self):
+        """测试每道题挖空的位置正好是答案"""
+        items = self.generator.generate(SAMPLE)
+        self.assertEqual(len(items), 7)
+        for item in items:
+            self.assertIn(BLANK, item["question"])
+            start = item["question"].index(BLANK)
+            self.assertEqual(item["sentence"][start:start + len(item["answer"])], item["answer"])
+
+    def test_item_kinds(self):
+        """测试生成选择题和词形变换题，选择题包含答案且选项不重复"""
+        items = self.generator.generate(SAMPLE)
+        kinds = {item["type"] for item in items}
+        self.assertEqual(kinds, {"cloze", "choice", "word_form"})
+        for item in items:
+            if item["type"] == "choice":
+                self.assertEqual(len(item["options"]), 4)
+                self.assertEqual(len(set(item["options"])), 4)
+                self.assertIn(item["answer"], item["options"])
+            if item["type"] == "word_form":
+                self.assertIn(f"({item['word']})", item["question"])
+                self.assertNotEqual(item["word"], item["answer"])
+
+    def test_deterministic_and_limited(self):
+        """测试相同文本结果一致，并限制题目数量"""
+        self.assertEqual(self.generator.generate(SAMPLE), self.generator.generate(SAMPLE))
+        self.assertEqual(len(self.generator.generate(SAMPLE, max_items=3)), 3)
+        self.assertEqual([i["type"] for i in self.generator.generate(SAMPLE, kinds=["cloze"])], ["cloze"] * 7)
+
+    def test_speed(self):
+        """测试长文档也能快速出题"""
+        text = "\n\n".join(SAMPLE.replace("The ", f"The {i} ") for i in range(300))
+        start = time.perf_counter()
+        self.generator.generate(text, max_items=200)
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_format(self):
+        """测试题目和答案分开显示"""
+        text = format_quiz(self.generator.generate(SAMPLE))
+        questions, answers = text.split("答案：")
+        self.assertIn("1.", questions)
+        self.assertEqual(len(answers.strip().splitlines()), 7)
+        self.assertIn("未能", format_quiz([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.review_scheduler import ReviewScheduler, sm2, TIME_FORMAT
+
+
+class TestSM2(unittest.TestCase):
+    def test_intervals_grow(self):
+        """测试连续答对时间隔按 1 天、6 天、再乘以难度系数增长"""
+        state = (0, 0, 2.5)
+        intervals = []
+        for _ in range(4):
+            state = sm2(5, *state)
+            intervals.append(state[1])
+        self.assertEqual(intervals[:2], [1, 6])
+        self.assertGreater(intervals[2], 6 * 2.5)
+        self.assertGreater(intervals[3], intervals[2])
+
+    def test_failure_resets(self):
+        """测试答错时重新开始，难度系数不低于 1.3"""
+        repetitions, interval, ease = sm2(0, 4, 30, 1.4)
+        self.assertEqual((repetitions, interval), (0, 0))
+        self.assertEqual(ease, 1.3)
+
+
+class TestReviewScheduler(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.db.add_words((f"word{i}", f"词{i}", 1, None) for i in range(300))
+        self.user_id = self.db.add_user("learner", "learner@example.com")
+        self.now = datetime(2025, 3, 3, 9, 0, 0)
+        # 第 i 个单词在 now 之前 i 分钟到期，单词 0 最晚
+        for word_id in range(1, 301):
+            due = (self.now - timedelta(minutes=300 - word_id)).strftime(TIME_FORMAT)
+            self.db.save_review(self.user_id, word_id, "learning", 1, 1, None, 2.5, 1, 1, due)
+        self.scheduler = ReviewScheduler(self.db, self.user_id, batch_size=40)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_due_order_across_pages(self):
+        """测试分页载入时仍按到期顺序给出所有卡片，且不重复"""
+        seen = []
+        while True:
+            card = self.scheduler.next_card(self.now)
+            if card is None:
+                break
+            seen.append(card["id"])
+            self.scheduler.answer(card["id"], 5, self.now)
+        self.assertEqual(seen, list(range(1, 301)))
+
+    def test_wrong_answer_comes_back(self):
+        """测试答错的卡片十分钟后重新到期，答对的推迟到几天后"""
+        first = self.scheduler.next_card(self.now)
+        self.scheduler.answer(first["id"], 1, self.now)
+        second = self.scheduler.next_card(self.now)
+        self.scheduler.answer(second["id"], 4, self.now)
+
+        later = self.now + timedelta(minutes=10)
+        due_ids = [card["id"] for card in self.scheduler.due_cards(400, later)]
+        self.assertIn(first["id"], due_ids)
+        self.assertNotIn(second["id"], due_ids)
+        self.assertEqual(len(due_ids), 299)
+
+        stored = self.db.get_review_card(self.user_id, second["id"])
+        self.assertEqual(stored["repetitions"], 2)
+        self.assertEqual(stored["due_at"], (self.now + timedelta(days=6)).strftime(TIME_FORMAT))
+        self.assertEqual(stored["attempts"], 2)
+
+    def test_new_word_enters_queue(self):
+        """测试第一次复习的新单词进入队列"""
+        word_id = self.db.add_word("fresh", "新的", 1)
+        card = self.scheduler.answer(word_id, 2, self.now)
+        self.assertEqual(card["status"], "learning")
+        self.assertEqual(self.db.get_user_progress(self.user_id, word_id)["attempts"], 1)
+        due_ids = [c["id"] for c in self.scheduler.due_cards(400, self.now + timedelta(minutes=10))]
+        self.assertIn(word_id, due_ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
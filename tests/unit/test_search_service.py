@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.search_service import SearchService
+
+
+class TestSearchService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+        self.db = DBManager(self.db_path)
+        for i, name in enumerate(["2024北京高考英语.docx", "2024全国甲卷.docx", "reading_100%.txt"]):
+            self.db.insert_file(str(i), name, f"storage/{i}", os.path.splitext(name)[1], 10, "", "")
+        self.service = SearchService(self.db_path)
+
+    def tearDown(self):
+        self.service.close()
+        self.db.close()
+        self.tmpdir.cleanup()
+
+    def search(self, name, file_type=""):
+        generation, future = self.service.submit(name, file_type)
+        return future.result(timeout=5)
+
+    def test_background_query(self):
+        """测试后台查询返回匹配结果"""
+        rows = self.search("2024")
+        self.assertEqual({row[0] for row in rows}, {"0", "1"})
+
+    def test_wildcards_are_literal(self):
+        """测试 % 和 _ 按字面匹配"""
+        rows = self.search("100%")
+        self.assertEqual([row[0] for row in rows], ["2"])
+        self.assertEqual(self.search("_"), [self.search("reading")[0]])
+
+    def test_prefix_refinement_uses_cache(self):
+        """测试扩展查询时在内存中收窄已有结果"""
+        self.search("2024")
+        self.db.insert_file("3", "2024新增.docx", "storage/3", ".docx", 10, "", "")
+
+        # 未失效的缓存上收窄，不会看到新插入的记录
+        rows = self.service.lookup("2024北京", "")
+        self.assertEqual([row[0] for row in rows], ["0"])
+        self.assertEqual(len(self.service.lookup("2024", "")), 2)
+
+        # 失效后需要重新查询数据库
+        self.service.invalidate()
+        self.assertIsNone(self.service.lookup("2024北京", ""))
+        self.assertEqual(len(self.search("2024")), 3)
+
+    def test_stale_generation(self):
+        """测试新查询提交后旧查询被标记为过期"""
+        first, _ = self.service.submit("2024", "")
+        second, future = self.service.submit("2024全国", "")
+        self.assertFalse(self.service.is_current(first))
+        self.assertTrue(self.service.is_current(second))
+        self.assertEqual([row[0] for row in future.result(timeout=5)], ["1"])
+
+    def test_running_query_dropped_after_cache_hit(self):
+        """测试缓存命中或缓存失效后，仍在执行的慢查询结果被丢弃"""
+        self.search("2024")
+        started, release = threading.Event(), threading.Event()
+        search_files = self.service._worker_db.search_files
+
+        def slow_search(*args):
+            started.set()
+            release.wait(5)
+            return search_files(*args)
+
+        self.service._worker_db.search_files = slow_search
+        for query, drop in (("reading", lambda: self.service.lookup("2024北京", "") and self.service.cancel_pending()),
+                            ("100%", self.service.invalidate)):
+            started.clear()
+            release.clear()
+            generation, future = self.service.submit(query, "")
+            self.assertTrue(started.wait(5))
+            drop()
+            release.set()
+            self.assertEqual([row[0] for row in future.result(timeout=5)], ["2"])
+            self.assertFalse(self.service.is_current(generation))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import re
+import tempfile
+import time
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.sentence_index import SentenceIndex
+
+PAPER_A = (
+    "Despite the heavy rain, the match went ahead as planned.\n"
+    "By the time we arrived, the film had already started. A) yes B) no\n"
+    "She is looking forward to visiting her grandparents."
+)
+PAPER_B = (
+    "He finished the race despite having hurt his ankle. "
+    "They had lived in Paris for ten years before they moved to London."
+)
+
+
+class TestSentenceIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db = DBManager(os.path.join(self.temp_dir.name, "files.db"))
+        self.index = SentenceIndex(self.db)
+        self.db.insert_file("a", "a.txt", "a.txt", ".txt", 1, PAPER_A, "")
+        self.db.insert_file("b", "b.txt", "b.txt", ".txt", 1, PAPER_B, "")
+        self.assertTrue(self.index.index_document("a"))
+        self.assertTrue(self.index.index_document("b"))
+
+    def tearDown(self):
+        self.index.close()
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_phrase_search(self):
+        """测试按词和词组检索例句，偏移量指向原文中的句子"""
+        hits = self.index.search("despite")
+        self.assertEqual(sorted(hit[1] for hit in hits), ["a", "b"])
+        for _, file_id, offset, sentence in hits:
+            content = PAPER_A if file_id == "a" else PAPER_B
+            self.assertEqual(content[offset:offset + len(sentence)], sentence)
+
+        # 词组按顺序匹配，词尾变化也能匹配
+        self.assertEqual(len(self.index.search("look forward to")), 1)
+        self.assertEqual(self.index.search("forward look"), [])
+        self.assertEqual([hit[1] for hit in self.index.search("despite", file_id="b")], ["b"])
+        self.assertEqual(self.index.search('"'), [])
+
+    def test_regex_search(self):
+        """测试正则表达式检索（过去完成时），并忽略大小写"""
+        hits = self.index.regex_search(r"\bhad\s+(?:already\s+)?\w+(?:ed|en)\b")
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(len(self.index.regex_search(r"^DESPITE")), 1)
+        self.assertEqual(self.index.regex_search(r"^DESPITE", ignore_case=False), [])
+        with self.assertRaises(re.error):
+            self.index.regex_search("(")
+
+    def test_short_fragments_skipped(self):
+        """测试选项之类的短碎片不收录"""
+        self.assertEqual(self.index.search("yes"), [])
+
+    def test_paging(self):
+        """测试按 id 翻页，结果不重复不遗漏"""
+        for i in range(30):
+            self.index.index_document(f"f{i}", f"Sentence number {i} uses despite in it. Nothing here at all.")
+        for search in (self.index.search, self.index.regex_search):
+            seen, after = [], 0
+            while True:
+                page = search("despite", limit=7, after=after)
+                if not page:
+                    break
+                seen.extend(hit[0] for hit in page)
+                after = page[-1][0]
+            self.assertEqual(len(seen), 32)
+            self.assertEqual(seen, sorted(set(seen)))
+
+    def test_update_and_remove(self):
+        """测试内容修改后旧句子被替换，删除后不再出现"""
+        self.assertFalse(self.index.index_document("a"))
+        self.index.index_document("a", "Nothing to see in this sentence.")
+        self.assertEqual([hit[1] for hit in self.index.search("despite")], ["b"])
+        self.index.remove_document("b")
+        self.assertEqual(self.index.search("despite"), [])
+        self.assertEqual(self.index.regex_search("despite"), [])
+
+    def test_first_page_fast(self):
+        """测试大量句子时第一页结果仍能很快返回"""
+        text = " ".join(f"Line {i}: the students had finished their homework despite the noise." for i in range(2000))
+        for i in range(20):
+            self.index.index_document(f"big{i}", text)
+        start = time.perf_counter()
+        self.assertEqual(len(self.index.search("despite the noise", limit=50)), 50)
+        self.assertEqual(len(self.index.regex_search(r"had \w+ed", limit=50)), 50)
+        self.assertLess(time.perf_counter() - start, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest import mock
+
+from PIL import Image
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.thumbnails import ThumbnailCache, make_thumbnail
+
+
+class TestThumbnails(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ThumbnailCache(os.path.join(self.temp_dir.name, "thumbs"), size=(200, 200))
+        self.jpeg_path = os.path.join(self.temp_dir.name, "scan.jpg")
+        Image.new("RGB", (3000, 4000), "white").save(self.jpeg_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_thumbnail_fits_size(self):
+        """测试缩略图按比例缩小到指定尺寸内"""
+        thumbnail = make_thumbnail(self.jpeg_path, (200, 200))
+        self.assertEqual(thumbnail.size, (150, 200))
+
+    def test_source_file_closed(self):
+        """测试生成缩略图后关闭原图文件，图片本来就很小时也能继续使用缩略图"""
+        small_path = os.path.join(self.temp_dir.name, "small.png")
+        Image.new("RGB", (50, 40), "red").save(small_path)
+        opened = []
+        original_open = Image.open
+        with mock.patch.object(Image, "open", side_effect=lambda *args: opened.append(original_open(*args))
+                               or opened[-1]):
+            thumbnail = make_thumbnail(small_path, (200, 200))
+        self.assertIsNone(opened[0].fp)
+        self.assertEqual(thumbnail.size, (50, 40))
+        self.assertEqual(thumbnail.getpixel((0, 0)), (255, 0, 0))
+
+    def test_cached_by_content_hash(self):
+        """测试缩略图按内容哈希缓存，相同内容的副本共用"""
+        path = self.cache.get_thumbnail(self.jpeg_path)
+        mtime = os.path.getmtime(path)
+        copy_path = os.path.join(self.temp_dir.name, "copy.jpg")
+        with open(self.jpeg_path, "rb") as src, open(copy_path, "wb") as dst:
+            dst.write(src.read())
+        self.assertEqual(self.cache.get_thumbnail(copy_path), path)
+        self.assertEqual(os.path.getmtime(path), mtime)
+        self.assertEqual(len(os.listdir(self.cache.cache_dir)), 1)
+
+    def test_transparent_image_kept_as_png(self):
+        """测试带透明通道的图片保存为 PNG 缩略图"""
+        png_path = os.path.join(self.temp_dir.name, "scan.png")
+        Image.new("RGBA", (800, 400), (255, 0, 0, 128)).save(png_path)
+        path = self.cache.get_thumbnail(png_path)
+        self.assertTrue(path.endswith(".png"))
+        with Image.open(path) as thumbnail:
+            self.assertEqual(thumbnail.size, (200, 100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from services.vector_index import HashingVectorizer, VectorIndex, VectorStore
+
+PLANTS = "Plants need sunlight and water to grow. Photosynthesis turns light into energy in the leaves."
+PLANTS_2 = "Green leaves use sunlight for photosynthesis, so plants grow towards the light."
+TRAINS = "The railway timetable changed and the trains to the city now leave every ten minutes."
+
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.index = VectorIndex(os.path.join(self.temp_dir.name, "files.db"),
+                                 os.path.join(self.temp_dir.name, "vectors"))
+
+    def tearDown(self):
+        self.index.close()
+        self.temp_dir.cleanup()
+
+    def test_vectors_normalized(self):
+        """测试向量为归一化的 float32，数字不参与计算"""
+        vector = HashingVectorizer().transform(PLANTS)
+        self.assertEqual(vector.dtype, np.float32)
+        self.assertAlmostEqual(float(np.linalg.norm(vector)), 1.0, places=5)
+        self.assertFalse(HashingVectorizer().transform("12 345").any())
+
+    def test_similar_documents_and_passages(self):
+        """测试按相似度返回文档和段落，并可排除当前文件"""
+        self.index.index_document("plants", PLANTS)
+        self.index.index_document("plants2", PLANTS_2)
+        self.index.index_document("trains", TRAINS)
+
+        documents = self.index.similar_documents(PLANTS, k=3)
+        self.assertEqual(documents[0][0], "plants")
+        self.assertEqual(documents[1][0], "plants2")
+        self.assertEqual(self.index.similar_documents(PLANTS, k=3, exclude_file_id="plants")[0][0], "plants2")
+
+        file_id, start, length, score = self.index.similar_passages("trains leave for the city", k=1)[0]
+        self.assertEqual((file_id, start, length), ("trains", 0, len(TRAINS)))
+        self.assertGreater(score, 0)
+
+    def test_incremental_update_and_remove(self):
+        """测试内容不变时跳过，内容变化后替换旧向量，删除后不再返回"""
+        self.assertTrue(self.index.index_document("a", PLANTS))
+        self.assertFalse(self.index.index_document("a", PLANTS))
+        self.assertTrue(self.index.index_document("a", TRAINS))
+        self.assertEqual(self.index.passages.live_count, 1)
+        self.assertGreater(self.index.similar_documents(TRAINS)[0][1], 0.9)
+        # 只剩哈希碰撞带来的微弱相似度
+        self.assertLess(max([score for _, score in self.index.similar_documents(PLANTS)] + [0]), 0.2)
+
+        self.index.remove_document("a")
+        self.assertEqual(self.index.similar_passages(TRAINS), [])
+        self.assertEqual(self.index.documents.live_count, 0)
+
+    def test_reopen(self):
+        """测试重新打开后索引仍然可用"""
+        self.index.index_document("plants", PLANTS)
+        self.index.index_document("trains", TRAINS)
+        self.index.remove_document("trains")
+        self.index.close()
+
+        self.index = VectorIndex(os.path.join(self.temp_dir.name, "files.db"),
+                                 os.path.join(self.temp_dir.name, "vectors"))
+        self.assertEqual(self.index.similar_documents(PLANTS_2)[0][0], "plants")
+        self.assertEqual(self.index.passages.live_count, 1)
+        self.assertFalse(self.index.index_document("plants", PLANTS))
+
+    def test_store_grows_and_searches_fast(self):
+        """测试存储按需扩容，十万段落的检索在毫秒级完成"""
+        store = VectorStore(os.path.join(self.temp_dir.name, "big.f32"), 512, initial_capacity=16)
+        rng = np.random.default_rng(0)
+        for _ in range(40):
+            store.add(rng.standard_normal(512).astype(np.float32))
+        self.assertEqual(store.row_count, 40)
+        self.assertGreaterEqual(len(store.vectors), 40)
+
+        rows = rng.standard_normal((100000, 512), dtype=np.float32)
+        rows[rows < 1.5] = 0  # 与真实的稀疏向量相近
+        rows /= np.maximum(np.linalg.norm(rows, axis=1, keepdims=True), 1e-6)
+        big = VectorStore(os.path.join(self.temp_dir.name, "bulk.f32"), 512, initial_capacity=len(rows))
+        big.vectors[:] = rows
+        big.load(list(range(len(rows))))
+
+        query = rows[123]
+        big.search(query, 10)
+        start = time.perf_counter()
+        hits = big.search(query, 10)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(hits[0][0], 123)
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+
+# 添加项目根目录到 Python 路径，以便导入模块
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from database.db_manager import DBManager
+from services.vocabulary_index import VocabularyIndex, decode_positions, encode_positions
+
+
+class TestVocabularyIndex(unittest.TestCase):
+    def setUp(self):
+        self.db = DBManager(":memory:")
+        self.index = VocabularyIndex(self.db)
+        self.db.add_content_listener(self.index.index_document)
+        self.db.insert_file("a", "a.txt", "storage/a.txt", ".txt", 1,
+                            "The photosynthesis of plants. Plants need light and water.", "")
+        self.db.insert_file("b", "b.txt", "storage/b.txt", ".txt", 1,
+                            "Water is important. Students studied the water cycle.", "")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_position_encoding(self):
+        """测试位置的差分变长编码"""
+        positions = [0, 3, 200, 70000]
+        self.assertEqual(decode_positions(encode_positions(positions)), positions)
+
+    def test_positions_and_frequency(self):
+        """测试词位置与全库频率"""
+        self.assertEqual(self.index.word_positions("a", "plant"), [3, 4])
+        self.assertEqual(self.index.library_frequency(["water", "studies"]),
+                         {"water": (2, 3), "studies": (1, 1)})
+
+    def test_files_containing(self):
+        """测试按单词查找文件"""
+        self.assertEqual(self.index.files_containing(["water"]), [("b", 2), ("a", 1)])
+        self.assertEqual(self.index.files_containing(["water", "plants"]), [("a", 3)])
+        self.assertEqual(self.index.files_containing(["water", "unknownword"]), [])
+        self.assertEqual(len(self.index.files_containing(["plant", "study"], match_all=False)), 2)
+
+    def test_rare_words(self):
+        """测试文件中的生僻词排在前面"""
+        lemmas = [row[0] for row in self.index.rare_words("a", n=3)]
+        self.assertEqual(lemmas[0], "photosynthesis")
+        self.assertNotIn("the", lemmas)
+
+    def test_incremental_update(self):
+        """测试内容修改后索引增量更新"""
+        self.db.update_file("b", "Nothing about rivers.", "")
+        self.assertEqual(self.index.files_containing(["water"]), [("a", 1)])
+        self.assertEqual(self.index.library_frequency(["water"])["water"], (1, 1))
+        self.assertFalse(self.index.index_document("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class DictionaryPopup:
+    """Shows offline dictionary entries for the word under the mouse or the selected text.
+
+    Attach it to any number of Text widgets. Hovering over a word shows its
+    entry after a short pause; selecting a word or phrase shows the entry
+    right away (or says it is not in the dictionary). The popup follows the
+    mouse and disappears when it leaves the word.
+    """
+
+    HOVER_DELAY_MS = 500
+    MAX_SELECTION_CHARS = 40
+    WRAP_LENGTH = 320
+
+    def __init__(self, root, dictionary):
+        self.root = root
+        self.dictionary = dictionary
+        self.enabled = True
+        self._popup = None
+        self._after_id = None
+        self._shown_word = None
+
+    def attach(self, text_widget):
+        """Enable hover and selection lookups in a Text widget."""
+        text_widget.bind("<Motion>", self.on_motion, add="+")
+        text_widget.bind("<Leave>", lambda e: self.hide(), add="+")
+        text_widget.bind("<ButtonRelease-1>", self.on_release, add="+")
+        text_widget.bind("<KeyPress>", lambda e: self.hide(), add="+")
+
+    def _cancel(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def on_motion(self, event):
+        """Schedule a lookup of the word under the mouse once it stops moving."""
+        self._cancel()
+        widget = event.widget
+        word = widget.get(f"@{event.x},{event.y} wordstart", f"@{event.x},{event.y} wordend").strip()
+        if word != self._shown_word:
+            self.hide()
+        if self.enabled and word.isalpha() and word.isascii() and word != self._shown_word:
+            self._after_id = self.root.after(self.HOVER_DELAY_MS, self.show_entry, word,
+                                             event.x_root, event.y_root, False)
+
+    def on_release(self, event):
+        """Look up the selected word or phrase."""
+        self._cancel()
+        try:
+            selection = event.widget.get(tk.SEL_FIRST, tk.SEL_LAST).strip()
+        except tk.TclError:
+            return
+        if self.enabled and selection and len(selection) <= self.MAX_SELECTION_CHARS \
+                and any(char.isascii() and char.isalpha() for char in selection):
+            self.show_entry(selection, event.x_root, event.y_root, True)
+
+    def show_entry(self, word, x, y, report_missing):
+        """Show the entry for `word` near screen position (x, y)."""
+        self._after_id = None
+        if not self.dictionary.is_ready():
+            # 词表在后台编译，不在界面线程里等待
+            error = self.dictionary.error
+            self.dictionary.prepare()
+            entry, missing = None, f"离线词典不可用：{str(error)}" if error else "词典编译中…"
+            report_missing = True
+        else:
+            try:
+                entry = self.dictionary.lookup(word)
+                missing = "（离线词典中没有该词）"
+            except Exception as e:
+                entry, missing = None, f"离线词典不可用：{str(e)}"
+        if entry is None and not report_missing:
+            return
+        headword, translation = entry if entry else (word, missing)
+
+        self.hide()
+        self._popup = popup = tk.Toplevel(self.root)
+        popup.wm_overrideredirect(True)
+        popup.wm_geometry(f"+{x + 12}+{y + 16}")
+        frame = ttk.Frame(popup, padding=6, relief=tk.SOLID, borderwidth=1)
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text=headword, font=('Segoe UI', 10, 'bold')).pack(anchor=tk.W)
+        ttk.Label(frame, text=translation, wraplength=self.WRAP_LENGTH, justify=tk.LEFT).pack(anchor=tk.W)
+        popup.bind("<Button-1>", lambda e: self.hide())
+        self._shown_word = word
+
+    def hide(self):
+        if self._popup is not None:
+            self._popup.destroy()
+            self._popup = None
+        self._shown_word = None
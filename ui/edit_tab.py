@@ -1,19 +1,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import re
 from file_utils import FileUtils
+from services.text_processing import iter_segments
 import os
 
 class EditTab(ttk.Frame):
     """Tab for editing files in the system."""
     
+    MAX_SEGMENT_LENGTH = 2000
+    
     def __init__(self, parent, app):
         """Initialize the edit tab."""
         super().__init__(parent)
         self.app = app
         self.edit_file_id = None
-        self.current_content = None  # 存储完整内容
-        self.current_segments = []   # 存储分段后的内容
+        self.current_segments = []   # 分段内容，None 表示尚未从数据库加载
+        self.segment_hashes = []     # 各段加载时的哈希，用于判断是否修改
+        self.dirty_segments = set()  # 已修改、待保存的段落序号
+        self.segments_persisted = False  # 分段是否已存入数据库
         self.current_segment_index = 0  # 当前显示的段落索引
         self.setup_ui()
     
@@ -68,47 +72,42 @@ class EditTab(ttk.Frame):
         self.edit_metadata_text = scrolledtext.ScrolledText(metadata_frame, width=80, height=5)
         self.edit_metadata_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Save button
-        save_button = ttk.Button(self, text="保存修改", command=self.save_edit)
-        save_button.pack(pady=10)
+        # Save and history buttons
+        button_frame = ttk.Frame(self)
+        button_frame.pack(pady=10)
+        
+        ttk.Button(button_frame, text="保存修改", command=self.save_edit).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="历史版本...", command=self.show_revisions).pack(side=tk.LEFT, padx=5)
     
     def smart_split_content(self, content):
         """智能分段内容"""
-        if not content:
-            return []
+        return list(self.iter_split_content(content))
+    
+    def iter_split_content(self, content):
+        """逐段产出分段结果，不必一次性处理整篇文档"""
+        # 按空行分段，过长的段落再按句子分割
+        return iter_segments(content, self.MAX_SEGMENT_LENGTH)
+    
+    def get_segment_text(self, index):
+        """获取段落内容，必要时从数据库按需加载"""
+        if self.current_segments[index] is None:
+            text, segment_hash = self.app.db_manager.get_segment(self.edit_file_id, index)
+            self.current_segments[index] = text
+            self.segment_hashes[index] = segment_hash
+        return self.current_segments[index]
+    
+    def commit_current_segment(self):
+        """把编辑框中的内容写回当前段落，并记录是否修改"""
+        if not self.current_segments:
+            return
             
-        # 首先按空行分段
-        segments = re.split(r'\n\s*\n', content)
-        
-        # 如果段落太长，进一步分割
-        MAX_SEGMENT_LENGTH = 2000
-        final_segments = []
-        
-        for segment in segments:
-            if len(segment) > MAX_SEGMENT_LENGTH:
-                # 按句子分割长段落
-                sentences = re.split(r'([.!?。！？]\s*)', segment)
-                current_segment = ""
-                
-                for i in range(0, len(sentences), 2):
-                    sentence = sentences[i]
-                    # 添加标点符号（如果有）
-                    if i + 1 < len(sentences):
-                        sentence += sentences[i + 1]
-                        
-                    if len(current_segment) + len(sentence) > MAX_SEGMENT_LENGTH:
-                        if current_segment:
-                            final_segments.append(current_segment)
-                        current_segment = sentence
-                    else:
-                        current_segment += sentence
-                
-                if current_segment:
-                    final_segments.append(current_segment)
-            else:
-                final_segments.append(segment)
-        
-        return final_segments
+        index = self.current_segment_index
+        text = self.edit_content_text.get(1.0, tk.END).rstrip()
+        self.current_segments[index] = text
+        if self.app.db_manager.segment_hash(text) != self.segment_hashes[index]:
+            self.dirty_segments.add(index)
+        else:
+            self.dirty_segments.discard(index)
     
     def display_current_segment(self):
         """显示当前段落"""
@@ -116,7 +115,7 @@ class EditTab(ttk.Frame):
             return
             
         self.edit_content_text.delete(1.0, tk.END)
-        self.edit_content_text.insert(tk.END, self.current_segments[self.current_segment_index])
+        self.edit_content_text.insert(tk.END, self.get_segment_text(self.current_segment_index))
         
         # 更新段落信息
         total_segments = len(self.current_segments)
@@ -126,7 +125,7 @@ class EditTab(ttk.Frame):
         """显示上一段"""
         if self.current_segment_index > 0:
             # 保存当前段落的修改
-            self.current_segments[self.current_segment_index] = self.edit_content_text.get(1.0, tk.END).rstrip()
+            self.commit_current_segment()
             self.current_segment_index -= 1
             self.display_current_segment()
     
@@ -134,10 +133,41 @@ class EditTab(ttk.Frame):
         """显示下一段"""
         if self.current_segments and self.current_segment_index < len(self.current_segments) - 1:
             # 保存当前段落的修改
-            self.current_segments[self.current_segment_index] = self.edit_content_text.get(1.0, tk.END).rstrip()
+            self.commit_current_segment()
             self.current_segment_index += 1
             self.display_current_segment()
     
+    def load_segments(self, file_id, result):
+        """加载文件的分段：已存储的分段按需读取，否则从原始内容分段"""
+        db_manager = self.app.db_manager
+        self.dirty_segments = set()
+        self.current_segment_index = 0
+        
+        segment_count = db_manager.get_segment_count(file_id)
+        if segment_count:
+            self.current_segments = [None] * segment_count
+            self.segment_hashes = [None] * segment_count
+            self.segments_persisted = True
+            return "已保存的分段"
+        
+        file_type = os.path.splitext(result["original_name"])[1].lower()
+        # 文本文件或已编辑过的文件以数据库内容为准
+        if file_type in FileUtils.TEXT_EXTENSIONS or db_manager.list_revisions(file_id):
+            content = db_manager.get_file_content(file_id)
+        else:
+            content = None
+        if content:
+            encoding = "数据库内容"
+        else:
+            # 二进制文档从原文件提取完整文本（不截断）
+            encoding = FileUtils.preview_file(result["stored_path"], self.edit_content_text, max_chars=None)
+            content = self.edit_content_text.get(1.0, tk.END).strip()
+        
+        self.current_segments = list(self.iter_split_content(content))
+        self.segment_hashes = [db_manager.segment_hash(text) for text in self.current_segments]
+        self.segments_persisted = False
+        return encoding
+    
     def select_file_to_edit(self):
         """Open dialog to select a file for editing."""
         # Create file selection dialog
@@ -174,7 +204,7 @@ class EditTab(ttk.Frame):
                 return
                 
             file_id = selection[0]
-            result = self.app.db_manager.get_file_for_query(file_id)  # 使用 get_file_for_query 替代 get_file_for_edit
+            result = self.app.db_manager.get_file_for_query(file_id, with_content=False)  # 内容按需分段加载
             if result:
                 try:
                     # 更新文件信息
@@ -182,16 +212,15 @@ class EditTab(ttk.Frame):
                     file_type, file_size = os.path.splitext(result["original_name"])[1], os.path.getsize(result["stored_path"])
                     self.filetype_var.set(f"{file_type} ({file_size} 字节)")
                     
-                    # 使用 FileUtils 预览文件内容
-                    encoding = FileUtils.preview_file(result["stored_path"], self.edit_content_text)
-                    self.encoding_var.set(encoding or "未知")
+                    # 保存文件ID
+                    self.edit_file_id = file_id
                     
-                    # 获取文件内容并分段
-                    self.current_content = self.edit_content_text.get(1.0, tk.END).strip()
-                    self.current_segments = self.smart_split_content(self.current_content)
-                    self.current_segment_index = 0
+                    # 加载分段（已存储的分段不会一次性全部读取）
+                    encoding = self.load_segments(file_id, result)
+                    self.encoding_var.set(encoding or "未知")
                     
                     # 显示第一段
+                    self.edit_content_text.delete(1.0, tk.END)
                     if self.current_segments:
                         self.display_current_segment()
                     
@@ -200,8 +229,6 @@ class EditTab(ttk.Frame):
                     if result["metadata"]:
                         self.edit_metadata_text.insert(tk.END, result["metadata"])
                     
-                    # 保存文件ID
-                    self.edit_file_id = file_id
                     select_dialog.destroy()
                     
                 except Exception as e:
@@ -219,20 +246,111 @@ class EditTab(ttk.Frame):
             return
             
         try:
+            metadata = self.edit_metadata_text.get(1.0, tk.END).strip()
+            db_manager = self.app.db_manager
+            
+            if not self.current_segments:
+                content = self.edit_content_text.get(1.0, tk.END).strip()
+                self.current_segments = [content]
+                self.segment_hashes = [None]
+                self.segments_persisted = False
+            
             # 保存当前段落的修改
-            if self.current_segments:
-                self.current_segments[self.current_segment_index] = self.edit_content_text.get(1.0, tk.END).rstrip()
-                
-                # 合并所有段落
-                content = "\n\n".join(self.current_segments)
+            self.commit_current_segment()
+            
+            if self.segments_persisted:
+                # 只写入修改过的段落
+                changes = {index: self.current_segments[index] for index in sorted(self.dirty_segments)}
+                db_manager.save_segments(self.edit_file_id, changes, metadata)
             else:
-                content = self.edit_content_text.get(1.0, tk.END).strip()
-                
-            metadata = self.edit_metadata_text.get(1.0, tk.END).strip()
+                # 首次保存：一次性写入全部分段
+                db_manager.store_segments(self.edit_file_id, self.current_segments, metadata)
+                self.segments_persisted = True
+                self.dirty_segments = set(range(len(self.current_segments)))
             
-            # 更新数据库
-            self.app.db_manager.update_file(self.edit_file_id, content, metadata)
+            for index in self.dirty_segments:
+                self.segment_hashes[index] = db_manager.segment_hash(self.current_segments[index])
+            self.dirty_segments = set()
             messagebox.showinfo("成功", "文件修改已保存")
             
         except Exception as e:
             messagebox.showerror("错误", f"保存修改时出错：{str(e)}")
+    
+    def show_revisions(self):
+        """Show the revision history of the current file and allow reverting."""
+        if not self.edit_file_id:
+            messagebox.showerror("错误", "请先选择要编辑的文件")
+            return
+        
+        file_id = self.edit_file_id
+        revisions = self.app.db_manager.list_revisions(file_id)
+        if not revisions:
+            messagebox.showinfo("提示", "该文件还没有历史版本")
+            return
+        
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title("历史版本")
+        dialog.geometry("700x500")
+        dialog.transient(self.app.root)
+        dialog.grab_set()
+        
+        columns = ('版本', '保存时间', '存储方式', '内容大小')
+        revision_tree = ttk.Treeview(dialog, columns=columns, show='headings', height=8)
+        for col in columns:
+            revision_tree.heading(col, text=col)
+            revision_tree.column(col, width=100)
+        revision_tree.pack(fill=tk.X, padx=5, pady=5)
+        
+        for revision, kind, content_size, stored_size, created_at in revisions:
+            kind_text = "完整快照" if kind == 'full' else f"差异 ({stored_size} 字节)"
+            revision_tree.insert('', tk.END, iid=str(revision),
+                                 values=(revision, created_at, kind_text, f"{content_size} 字符"))
+        
+        preview_text = scrolledtext.ScrolledText(dialog, width=80, height=15)
+        preview_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        def on_preview(event=None):
+            selection = revision_tree.selection()
+            if not selection:
+                return
+            content, metadata = self.app.db_manager.get_revision(file_id, int(selection[0]))
+            preview_text.delete(1.0, tk.END)
+            preview_text.insert(tk.END, content or "")
+        
+        def on_revert():
+            selection = revision_tree.selection()
+            if not selection:
+                messagebox.showerror("错误", "请选择一个版本")
+                return
+            if not messagebox.askyesno("确认", f"恢复到版本 {selection[0]}？当前内容会保留为新的历史版本。"):
+                return
+            try:
+                self.app.db_manager.revert_to_revision(file_id, int(selection[0]))
+                self.reload_current_file()
+                dialog.destroy()
+                messagebox.showinfo("成功", "已恢复到所选版本")
+            except Exception as e:
+                messagebox.showerror("错误", f"恢复版本时出错：{str(e)}")
+        
+        revision_tree.bind('<<TreeviewSelect>>', on_preview)
+        
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=5, pady=5)
+        ttk.Button(button_frame, text="关闭", command=dialog.destroy).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(button_frame, text="恢复此版本", command=on_revert).pack(side=tk.RIGHT, padx=5)
+    
+    def reload_current_file(self):
+        """Reload the current file's segments and metadata from the database."""
+        result = self.app.db_manager.get_file_for_query(self.edit_file_id, with_content=False)
+        if not result:
+            return
+        encoding = self.load_segments(self.edit_file_id, result)
+        self.encoding_var.set(encoding or "未知")
+        
+        self.edit_content_text.delete(1.0, tk.END)
+        if self.current_segments:
+            self.display_current_segment()
+        
+        self.edit_metadata_text.delete(1.0, tk.END)
+        if result["metadata"]:
+            self.edit_metadata_text.insert(tk.END, result["metadata"])
@@ -1,14 +1,36 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import json
+import re
+from services.difficulty_estimator import DifficultyEstimator
+from services.quiz_generator import QuizGenerator, format_quiz
+from services.quiz_bank import SKILL_LABELS
+from services.background_jobs import GRAMMAR_JOB, LOCAL_MODEL
+from services.grammar_patterns import points_for, select_sentences, tag_text
+from services.exam_sections import section_label
 
 class LearnTab(ttk.Frame):
     """Learning assistant tab with various learning tools."""
     
+    EXAMPLES_PER_PAGE = 30
+    GRAMMAR_MAX_SENTENCES = 40  # 交给 LLM 的句子上限
+    DICTIONARY_COMPLETIONS = 20
+    
     def __init__(self, parent, main_window):
         """Initialize the learning tab."""
         super().__init__(parent)
         self.main_window = main_window
+        self.difficulty_estimator = DifficultyEstimator()
+        self.quiz_generator = QuizGenerator()
+        
+        # 从文件载入的文本：内容未被修改时优先读取已保存的分析结果
+        self.current_file_id = None
+        self.loaded_content = None
+        self.loaded_digest = None
+        # 载入的是试卷的某一部分时为该部分的信息，保存的结果按部分区分
+        self.file_content = None
+        self.sections = []
+        self.current_section = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -23,6 +45,23 @@ class LearnTab(ttk.Frame):
         tools_frame.grid(row=0, column=0, rowspan=2, sticky="nsew", padx=5, pady=5)
         
         # Tool buttons
+        ttk.Button(
+            tools_frame,
+            text="载入所选文件",
+            command=self.load_selected_file,
+            style="Modern.TButton"
+        ).pack(fill=tk.X, pady=5)
+        
+        self.loaded_file_var = tk.StringVar(value="未载入文件")
+        ttk.Label(tools_frame, textvariable=self.loaded_file_var, wraplength=180).pack(fill=tk.X)
+        
+        # 试卷结构：只学习其中一部分（如完形填空）
+        self.section_var = tk.StringVar(value="全文")
+        self.section_combo = ttk.Combobox(tools_frame, textvariable=self.section_var, values=["全文"],
+                                          state="readonly")
+        self.section_combo.pack(fill=tk.X, pady=(5, 10))
+        self.section_combo.bind("<<ComboboxSelected>>", lambda e: self.select_section())
+        
         ttk.Button(
             tools_frame,
             text="分析难度级别",
@@ -30,6 +69,13 @@ class LearnTab(ttk.Frame):
             style="Modern.TButton"
         ).pack(fill=tk.X, pady=5)
         
+        self.explain_difficulty_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            tools_frame,
+            text="附加 AI 解释",
+            variable=self.explain_difficulty_var
+        ).pack(fill=tk.X)
+        
         ttk.Button(
             tools_frame,
             text="生成练习题",
@@ -37,6 +83,48 @@ class LearnTab(ttk.Frame):
             style="Modern.TButton"
         ).pack(fill=tk.X, pady=5)
         
+        self.explain_quiz_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            tools_frame,
+            text="附加 AI 讲解",
+            variable=self.explain_quiz_var
+        ).pack(fill=tk.X)
+        
+        ttk.Button(
+            tools_frame,
+            text="AI 出题",
+            command=self.generate_ai_quiz,
+            style="Modern.TButton"
+        ).pack(fill=tk.X, pady=5)
+        
+        # 题库组卷：从已保存的题目中抽题，不调用 LLM
+        bank_frame = ttk.LabelFrame(tools_frame, text="题库练习", padding="5")
+        bank_frame.pack(fill=tk.X, pady=5)
+        
+        self.skill_options = {"全部": None}
+        self.skill_options.update({label: skill for skill, label in SKILL_LABELS.items()})
+        ttk.Label(bank_frame, text="技能:").grid(row=0, column=0, sticky="w")
+        self.bank_skill_var = tk.StringVar(value="全部")
+        ttk.Combobox(bank_frame, textvariable=self.bank_skill_var, values=list(self.skill_options),
+                     state="readonly", width=10).grid(row=0, column=1, sticky="ew", pady=2)
+        
+        ttk.Label(bank_frame, text="难度:").grid(row=1, column=0, sticky="w")
+        self.bank_difficulty_var = tk.StringVar(value="全部")
+        ttk.Combobox(bank_frame, textvariable=self.bank_difficulty_var, values=["全部", "1", "2", "3", "4", "5"],
+                     state="readonly", width=10).grid(row=1, column=1, sticky="ew", pady=2)
+        
+        ttk.Label(bank_frame, text="题数:").grid(row=2, column=0, sticky="w")
+        self.bank_count_var = tk.IntVar(value=10)
+        ttk.Spinbox(bank_frame, from_=1, to=100, textvariable=self.bank_count_var, width=10).grid(
+            row=2, column=1, sticky="ew", pady=2)
+        
+        self.bank_current_file_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(bank_frame, text="仅当前文件", variable=self.bank_current_file_var).grid(
+            row=3, column=0, columnspan=2, sticky="w")
+        ttk.Button(bank_frame, text="从题库组卷", command=self.show_practice_set).grid(
+            row=4, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        bank_frame.columnconfigure(1, weight=1)
+        
         ttk.Button(
             tools_frame,
             text="语法解析",
@@ -49,6 +137,36 @@ class LearnTab(ttk.Frame):
         self.grammar_point = ttk.Entry(tools_frame)
         self.grammar_point.pack(fill=tk.X, pady=5)
         
+        # 例句检索：在全部文件的句子中查找词组或正则表达式
+        example_frame = ttk.LabelFrame(tools_frame, text="例句检索", padding="5")
+        example_frame.pack(fill=tk.X, pady=5)
+        
+        self.example_query_var = tk.StringVar()
+        example_entry = ttk.Entry(example_frame, textvariable=self.example_query_var)
+        example_entry.grid(row=0, column=0, columnspan=2, sticky="ew", pady=2)
+        example_entry.bind("<Return>", lambda e: self.search_examples())
+        
+        self.example_regex_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(example_frame, text="正则表达式", variable=self.example_regex_var).grid(
+            row=1, column=0, columnspan=2, sticky="w")
+        ttk.Button(example_frame, text="检索", command=self.search_examples).grid(
+            row=2, column=0, sticky="ew", pady=(5, 0))
+        ttk.Button(example_frame, text="下一页", command=lambda: self.search_examples(next_page=True)).grid(
+            row=2, column=1, sticky="ew", pady=(5, 0))
+        example_frame.columnconfigure(0, weight=1)
+        example_frame.columnconfigure(1, weight=1)
+        self.example_last_id = 0
+        
+        # 离线词典：输入单词或前缀，列出词条
+        dictionary_frame = ttk.LabelFrame(tools_frame, text="离线词典", padding="5")
+        dictionary_frame.pack(fill=tk.X, pady=5)
+        self.dictionary_query_var = tk.StringVar()
+        dictionary_entry = ttk.Entry(dictionary_frame, textvariable=self.dictionary_query_var)
+        dictionary_entry.pack(fill=tk.X)
+        dictionary_entry.bind("<Return>", lambda e: self.lookup_word())
+        ttk.Button(dictionary_frame, text="重新载入词表", command=self.main_window.dictionary.reload).pack(
+            fill=tk.X, pady=(5, 0))
+        
         # Right panel - Content
         content_frame = ttk.Frame(self)
         content_frame.grid(row=0, column=1, rowspan=2, sticky="nsew", padx=5, pady=5)
@@ -80,6 +198,73 @@ class LearnTab(ttk.Frame):
             font=('Segoe UI', 10)
         )
         self.results_text.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
+        
+        # 悬停或选中单词时显示离线词典释义
+        for widget in (self.input_text, self.results_text):
+            self.main_window.dictionary_popup.attach(widget)
+    
+    def load_selected_file(self):
+        """Load the file selected in the query tab into the input area."""
+        file_id = self.main_window.get_selected_file_id()
+        if not file_id:
+            messagebox.showwarning("警告", "请先在查询文件页面选择一个文件")
+            return
+        
+        file_info = self.main_window.db_manager.get_file_for_query(file_id)
+        if not file_info:
+            messagebox.showerror("错误", "未找到文件")
+            return
+        
+        content = file_info["content"] or ""
+        self.current_file_id = file_id
+        self.file_content = content
+        self.loaded_digest = self.main_window.db_manager.segment_hash(content)
+        self.loaded_file_var.set(f"当前文件：{file_info['original_name']}")
+        
+        exam_sections = self.main_window.exam_sections
+        exam_sections.index_document(file_id, content)
+        self.sections = exam_sections.get_sections(file_id)
+        self.section_combo["values"] = ["全文"] + [section_label(section) for section in self.sections]
+        self.section_var.set("全文")
+        self.select_section()
+    
+    def select_section(self):
+        """Put the whole loaded file, or the exam section chosen in the list, into the input area."""
+        if self.file_content is None:
+            return
+        index = self.section_combo.current()
+        if index > 0:
+            # 用载入时按 file_content 解析出的偏移量，不再查询可能已被后台任务更新的索引
+            self.current_section = self.sections[index - 1]
+            text = self.file_content[self.current_section["start"]:self.current_section["end"]]
+        else:
+            self.current_section = None
+            text = self.file_content
+        self.input_text.delete("1.0", tk.END)
+        self.input_text.insert("1.0", text)
+        self.loaded_content = text.strip()
+    
+    def get_artifact_or_compute(self, content, kind, model, compute, params=''):
+        """Return the stored result for the loaded file, or compute and store it.
+        
+        Stored results are only used while the input text is exactly the
+        loaded file's content (or section); returns (result, from_store).
+        """
+        db_manager = self.main_window.db_manager
+        use_store = self.current_file_id is not None and content == self.loaded_content
+        if self.current_section is not None:
+            params = f"{params}@section:{self.current_section['ordinal']}"
+        if use_store:
+            result = db_manager.get_artifact(self.current_file_id, kind, model, params,
+                                             content_digest=self.loaded_digest)
+            if result is not None:
+                return result, True
+        
+        result = compute()
+        if use_store and not result.startswith("Error"):
+            db_manager.save_artifact(self.current_file_id, kind, model, result, params,
+                                     content_digest=self.loaded_digest)
+        return result, False
     
     def analyze_difficulty(self):
         """Analyze the difficulty level of the input text."""
@@ -88,19 +273,33 @@ class LearnTab(ttk.Frame):
             messagebox.showwarning("警告", "请先输入要分析的文本")
             return
             
-        if not self.main_window.llm_processor:
-            messagebox.showerror("错误", "LLM处理器未初始化")
-            return
-            
         try:
+            # 本地估计，毫秒级完成，不需要 LLM；后台任务可能已经算好
+            result, _ = self.get_artifact_or_compute(
+                content, "difficulty", LOCAL_MODEL,
+                lambda: json.dumps(self.difficulty_estimator.estimate(content), ensure_ascii=False)
+            )
+            estimate = self.difficulty_estimator.format_estimate(json.loads(result))
             self.results_text.delete("1.0", tk.END)
-            self.results_text.insert("1.0", "分析中...\n")
+            self.results_text.insert("1.0", estimate)
+            
+            if not self.explain_difficulty_var.get():
+                return
+            if not self.main_window.llm_processor:
+                messagebox.showerror("错误", "LLM处理器未初始化")
+                return
+            
+            self.results_text.insert(tk.END, "\nAI 解释生成中...\n")
             self.update()
             
-            result = self.main_window.llm_processor.analyze_difficulty(content)
+            llm_processor = self.main_window.llm_processor
+            explanation, _ = self.get_artifact_or_compute(
+                content, "difficulty", llm_processor.current_model,
+                lambda: llm_processor.explain_difficulty(content, estimate)
+            )
             
             self.results_text.delete("1.0", tk.END)
-            self.results_text.insert("1.0", result)
+            self.results_text.insert("1.0", estimate + "\n" + explanation)
             
         except Exception as e:
             messagebox.showerror("错误", f"分析过程中出错: {str(e)}")
@@ -112,23 +311,172 @@ class LearnTab(ttk.Frame):
             messagebox.showwarning("警告", "请先输入要生成练习题的文本")
             return
             
-        if not self.main_window.llm_processor:
-            messagebox.showerror("错误", "LLM处理器未初始化")
-            return
-            
         try:
+            # 本地从文本中出题（完形填空、词汇选择、词形变换），不需要 LLM；题目存入题库
+            items = self.quiz_generator.generate(content)
+            self.store_quiz_items(content, items, LOCAL_MODEL)
+            quiz = format_quiz(items)
             self.results_text.delete("1.0", tk.END)
-            self.results_text.insert("1.0", "生成练习题中...\n")
+            self.results_text.insert("1.0", quiz)
+            
+            if not self.explain_quiz_var.get():
+                return
+            if not self.main_window.llm_processor:
+                messagebox.showerror("错误", "LLM处理器未初始化")
+                return
+            
+            self.results_text.insert(tk.END, "\n\nAI 讲解生成中...\n")
             self.update()
             
-            result = self.main_window.llm_processor.generate_quiz(content)
+            llm_processor = self.main_window.llm_processor
+            explanation, _ = self.get_artifact_or_compute(
+                content, "quiz", llm_processor.current_model,
+                lambda: llm_processor.explain_quiz(content, quiz),
+                params="explain"
+            )
             
             self.results_text.delete("1.0", tk.END)
-            self.results_text.insert("1.0", result)
+            self.results_text.insert("1.0", quiz + "\n\n" + explanation)
             
         except Exception as e:
             messagebox.showerror("错误", f"生成练习题时出错: {str(e)}")
     
+    def store_quiz_items(self, content, items, source):
+        """Add generated items to the quiz bank when the input is the loaded file's content."""
+        if self.current_file_id is not None and content == self.loaded_content and items:
+            self.main_window.quiz_bank.add_items(self.current_file_id, items, source,
+                                                 content_digest=self.loaded_digest)
+    
+    def generate_ai_quiz(self):
+        """Generate reading and grammar questions with the LLM (JSON mode) and store them in the quiz bank."""
+        content = self.input_text.get("1.0", tk.END).strip()
+        if not content:
+            messagebox.showwarning("警告", "请先输入要生成练习题的文本")
+            return
+        
+        if not self.main_window.llm_processor:
+            messagebox.showerror("错误", "LLM处理器未初始化")
+            return
+        
+        try:
+            llm_processor = self.main_window.llm_processor
+            quiz_bank = self.main_window.quiz_bank
+            model = llm_processor.current_model
+            # 当前文件已有该模型出的题时直接从题库读取（题库按文件保存，选了某一部分时重新出题）
+            if (self.current_file_id is not None and content == self.loaded_content
+                    and self.current_section is None
+                    and quiz_bank.has_items(self.current_file_id, model, self.loaded_digest)):
+                items = quiz_bank.practice_set(self.current_file_id, source=model, limit=20)
+                header = "（题库中已保存的 AI 练习题）\n\n"
+            else:
+                self.results_text.delete("1.0", tk.END)
+                self.results_text.insert("1.0", "生成练习题中...\n")
+                self.update()
+                items = llm_processor.generate_quiz(content)
+                self.store_quiz_items(content, items, model)
+                header = ""
+            
+            self.results_text.delete("1.0", tk.END)
+            self.results_text.insert("1.0", header + format_quiz(items))
+            
+        except Exception as e:
+            messagebox.showerror("错误", f"生成练习题时出错: {str(e)}")
+    
+    def show_practice_set(self):
+        """Assemble a practice set from the quiz bank by skill and difficulty."""
+        if self.bank_current_file_var.get() and self.current_file_id is None:
+            messagebox.showwarning("警告", "请先载入文件，或取消“仅当前文件”")
+            return
+        
+        try:
+            difficulty = self.bank_difficulty_var.get()
+            items = self.main_window.quiz_bank.practice_set(
+                file_id=self.current_file_id if self.bank_current_file_var.get() else None,
+                skill=self.skill_options.get(self.bank_skill_var.get()),
+                difficulty=int(difficulty) if difficulty.isdigit() else None,
+                limit=self.bank_count_var.get()
+            )
+            self.results_text.delete("1.0", tk.END)
+            if items:
+                self.results_text.insert("1.0", format_quiz(items))
+            else:
+                self.results_text.insert("1.0", "题库中没有符合条件的题目，请先生成练习题。")
+        except (tk.TclError, ValueError):
+            messagebox.showerror("错误", "题数必须是整数")
+    
+    def search_examples(self, next_page=False):
+        """Show library sentences containing a phrase (or matching a regex), one page at a time."""
+        query = self.example_query_var.get().strip()
+        if not query:
+            messagebox.showwarning("警告", "请输入要检索的词组或正则表达式")
+            return
+        
+        after = self.example_last_id if next_page else 0
+        sentence_index = self.main_window.sentence_index
+        try:
+            if self.example_regex_var.get():
+                hits = sentence_index.regex_search(query, self.EXAMPLES_PER_PAGE, after)
+            else:
+                hits = sentence_index.search(query, self.EXAMPLES_PER_PAGE, after)
+        except re.error as e:
+            messagebox.showerror("错误", f"正则表达式无效: {str(e)}")
+            return
+        
+        if next_page and not hits:
+            messagebox.showinfo("提示", "没有更多例句了")
+            return
+        if hits:
+            self.example_last_id = hits[-1][0]
+        
+        names = {}
+        lines = []
+        db_manager = self.main_window.db_manager
+        for number, (_, file_id, _, sentence) in enumerate(hits, 1):
+            if file_id not in names:
+                info = db_manager.get_file_for_query(file_id, with_content=False)
+                names[file_id] = info["original_name"] if info else file_id
+            lines.append(f"{number}. {sentence}\n    —— {names[file_id]}")
+        
+        self.results_text.delete("1.0", tk.END)
+        if lines:
+            page = "（续）" if next_page else ""
+            self.results_text.insert("1.0", f"“{query}”的例句{page}：\n\n" + "\n".join(lines))
+        else:
+            self.results_text.insert("1.0", "没有找到例句（新上传的文件需等待后台建立索引）。")
+    
+    def lookup_word(self):
+        """Show the offline dictionary entry for the typed word and the entries it is a prefix of."""
+        query = self.dictionary_query_var.get().strip()
+        if not query:
+            return
+        
+        dictionary = self.main_window.dictionary
+        if not dictionary.is_ready():
+            error = dictionary.error
+            dictionary.prepare()
+            self.results_text.delete("1.0", tk.END)
+            self.results_text.insert("1.0", f"离线词典不可用: {str(error)}" if error else "离线词典编译中，请稍后再查…")
+            return
+        try:
+            entry = dictionary.lookup(query)
+            completions = dictionary.complete(query, self.DICTIONARY_COMPLETIONS)
+        except Exception as e:
+            messagebox.showerror("错误", f"离线词典不可用: {str(e)}")
+            return
+        
+        lines = []
+        if entry:
+            lines.append(f"{entry[0]}\n{entry[1]}\n")
+        lines += [f"{word}：{' '.join(translation.split())}" for word, translation in completions
+                  if not entry or word != entry[0]]
+        self.results_text.delete("1.0", tk.END)
+        if lines:
+            self.results_text.insert("1.0", "\n".join(lines))
+        elif not dictionary.entry_count:
+            self.results_text.insert("1.0", "离线词典为空：请把词表（如 ECDICT 的 CSV）放入 storage/dictionary 目录。")
+        else:
+            self.results_text.insert("1.0", f"离线词典中没有“{query}”。")
+    
     def explain_grammar(self):
         """Explain grammar points in the input text."""
         content = self.input_text.get("1.0", tk.END).strip()
@@ -146,10 +494,32 @@ class LearnTab(ttk.Frame):
             self.update()
             
             specific_point = self.grammar_point.get().strip()
-            result = self.main_window.llm_processor.explain_grammar(
-                content,
-                specific_point if specific_point else None
+            llm_processor = self.main_window.llm_processor
+            
+            # 能识别的语法点只把本地检测到的句子交给 LLM
+            points = points_for(specific_point)
+            sentences = None
+            if points:
+                tagged, _ = self.get_artifact_or_compute(
+                    content, GRAMMAR_JOB, LOCAL_MODEL,
+                    lambda: json.dumps(tag_text(content), ensure_ascii=False)
+                )
+                # 本地没有检测到时仍按全文解析，检测器漏掉的句子交给 LLM 判断
+                sentences = select_sentences(json.loads(tagged), points, limit=self.GRAMMAR_MAX_SENTENCES) or None
+            
+            result, from_store = self.get_artifact_or_compute(
+                content, "grammar", llm_processor.current_model,
+                lambda: llm_processor.explain_grammar(
+                    content,
+                    specific_point if specific_point else None,
+                    sentences=sentences
+                ),
+                params=specific_point
             )
+            if from_store:
+                result = "（已保存的语法解析）\n\n" + result
+            elif sentences:
+                result = f"（仅分析检测到的 {len(sentences)} 个句子）\n\n" + result
             
             self.results_text.delete("1.0", tk.END)
             self.results_text.insert("1.0", result)
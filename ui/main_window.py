@@ -6,6 +6,15 @@ from ui.upload_tab import UploadTab
 from ui.query_tab import QueryTab
 from ui.edit_tab import EditTab
 from ui.learn_tab import LearnTab
+from services.vocabulary_index import VocabularyIndex
+from services.quiz_bank import QuizBank
+from services.near_duplicates import DuplicateIndex
+from services.sentence_index import SentenceIndex
+from services.exam_sections import ExamSectionIndex
+from services.dictionary import get_dictionary
+from ui.dictionary_popup import DictionaryPopup
+from services.job_queue import JobQueue
+from services.background_jobs import JOB_LABELS, register_default_jobs
 
 class MainWindow:
     """Main application window with modern UI."""
@@ -16,12 +25,45 @@ class MainWindow:
         self.db_manager = db_manager
         self.llm_processor = llm_processor
         
+        # 词汇索引：由后台任务在文件上传或内容修改后增量更新
+        self.vocabulary_index = VocabularyIndex(db_manager)
+        
+        # 题库：保存生成过的练习题，按文件、技能和难度组卷
+        self.quiz_bank = QuizBank(db_manager)
+        
+        # 近似重复检测：同一份试卷的 .doc/.docx/扫描件只需处理一次
+        self.duplicate_index = DuplicateIndex(db_manager)
+        
+        # 例句索引：按词组或正则表达式在全部文件中查找真实例句
+        self.sentence_index = SentenceIndex(db_manager)
+        
+        # 试卷结构：各部分（听力、阅读、完形……）的起止位置，学习和问答可只针对其中一部分
+        self.exam_sections = ExamSectionIndex(db_manager)
+        
+        # 离线词典：在后台线程中编译和映射词表，启动时不读取任何数据
+        self.dictionary = get_dictionary(db_manager)
+        self.dictionary_popup = DictionaryPopup(root, self.dictionary)
+        
+        # 后台任务队列：上传或编辑后在后台完成提取、索引、难度评估和摘要
+        self.auto_summary = False
+        self.job_queue = JobQueue(db_manager.db_path)
+        register_default_jobs(
+            self.job_queue,
+            get_llm_processor=lambda: self.llm_processor,
+            auto_summary=lambda: self.auto_summary
+        )
+        db_manager.add_content_listener(self.job_queue.content_changed)
+        db_manager.add_content_listener(self.on_content_changed)
+        
         # Set up storage directory
         self.storage_dir = "storage"
         if not os.path.exists(self.storage_dir):
             os.makedirs(self.storage_dir)
             
         self.setup_ui()
+        self.job_queue.start()
+        # 启动后在后台检查词表是否变化并映射词典，第一次查词时不必等待
+        self.root.after(1000, self.dictionary.prepare)
     
     def setup_ui(self):
         """Set up the modern main window UI."""
@@ -65,6 +107,35 @@ class MainWindow:
             style="Modern.TButton"
         ).pack(side=tk.LEFT, padx=5)
         
+        ttk.Button(
+            buttons_frame,
+            text="用量统计",
+            command=self.show_usage_summary,
+            style="Modern.TButton"
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        ttk.Button(
+            buttons_frame,
+            text="查重报告",
+            command=self.show_duplicate_report,
+            style="Modern.TButton"
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        ttk.Button(
+            buttons_frame,
+            text="后台任务",
+            command=self.show_job_status,
+            style="Modern.TButton"
+        ).pack(side=tk.RIGHT, padx=5)
+        
+        self.auto_summary_var = tk.BooleanVar(value=self.auto_summary)
+        ttk.Checkbutton(
+            buttons_frame,
+            text="上传后自动生成摘要",
+            variable=self.auto_summary_var,
+            command=lambda: setattr(self, 'auto_summary', self.auto_summary_var.get())
+        ).pack(side=tk.RIGHT, padx=5)
+        
         # API Key setup if LLM processor is not initialized
         if not self.llm_processor:
             self.show_api_key_dialog()
@@ -168,17 +239,155 @@ class MainWindow:
         else:
             messagebox.showwarning("警告", "请输入有效的 API 密钥")
             
+    def on_content_changed(self, file_id):
+        """Drop per-file caches that depend on a document's content."""
+        if self.llm_processor:
+            self.llm_processor.retriever.invalidate(file_id)
+    
+    def show_usage_summary(self):
+        """Show API token usage and prefix-cache hit rate."""
+        if not self.llm_processor:
+            messagebox.showwarning("警告", "请先设置 API 密钥")
+            return
+        
+        summary = self.llm_processor.get_usage_summary()
+        messagebox.showinfo("用量统计", (
+            f"请求次数: {summary['calls']}（本地缓存命中 {summary['local_cache_hits']} 次）\n"
+            f"输入 tokens: {summary['prompt_tokens']}\n"
+            f"输出 tokens: {summary['completion_tokens']}\n"
+            f"前缀缓存命中 tokens: {summary['prompt_cache_hit_tokens']}\n"
+            f"前缀缓存未命中 tokens: {summary['prompt_cache_miss_tokens']}\n"
+            f"前缀缓存命中率: {summary['prompt_cache_hit_rate']:.1%}\n"
+            f"平均响应时间: {summary['avg_latency_ms']} ms"
+        ))
+    
+    def show_job_status(self):
+        """Show the background job queue with live refresh."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("后台任务")
+        dialog.geometry("760x420")
+        dialog.transient(self.root)
+        
+        summary_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=summary_var, padding=(10, 5)).pack(fill=tk.X)
+        
+        columns = ("kind", "file", "status", "attempts", "updated", "error")
+        tree = ttk.Treeview(dialog, columns=columns, show="headings")
+        for column, heading, width in zip(
+            columns,
+            ("任务", "文件", "状态", "尝试次数", "更新时间", "错误"),
+            (90, 200, 70, 70, 140, 190)
+        ):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        status_labels = {"pending": "等待", "running": "运行中", "done": "完成", "failed": "失败"}
+        
+        def refresh():
+            if not dialog.winfo_exists():
+                return
+            counts = self.job_queue.status_counts()
+            summary_var.set("  ".join(
+                f"{label}: {counts.get(status, 0)}" for status, label in status_labels.items()
+            ))
+            tree.delete(*tree.get_children())
+            for job_id, kind, file_name, status, attempts, updated_at, error in self.job_queue.list_jobs():
+                tree.insert("", tk.END, iid=str(job_id), values=(
+                    JOB_LABELS.get(kind, kind), file_name, status_labels.get(status, status),
+                    attempts, updated_at, error or ""
+                ))
+            dialog.after(1000, refresh)
+        
+        ttk.Button(
+            dialog,
+            text="重试失败任务",
+            command=self.job_queue.retry_failed,
+            style="Modern.TButton"
+        ).pack(pady=10)
+        
+        refresh()
+    
+    def show_duplicate_report(self):
+        """Show groups of near-duplicate files and merge a selected group into its earliest upload."""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("查重报告")
+        dialog.geometry("760x420")
+        dialog.transient(self.root)
+        
+        summary_var = tk.StringVar()
+        ttk.Label(dialog, textvariable=summary_var, padding=(10, 5)).pack(fill=tk.X)
+        
+        columns = ("name", "similarity", "uploaded")
+        tree = ttk.Treeview(dialog, columns=columns, show="tree headings")
+        tree.column("#0", width=60)
+        for column, heading, width in zip(columns, ("文件", "相似度", "上传时间"), (400, 90, 160)):
+            tree.heading(column, text=heading)
+            tree.column(column, width=width)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        groups = []
+        
+        def refresh():
+            groups[:] = self.duplicate_index.report()
+            tree.delete(*tree.get_children())
+            for number, group in enumerate(groups):
+                keep_id = group[0][0]
+                for file_id, score in group:
+                    info = self.db_manager.get_file_for_query(file_id, with_content=False) or {}
+                    values = (info.get("original_name", file_id), f"{score:.0%}", info.get("upload_date", ""))
+                    if file_id == keep_id:
+                        tree.insert("", tk.END, iid=str(number), text="保留", values=values, open=True)
+                    else:
+                        tree.insert(str(number), tk.END, text="副本", values=values)
+            duplicates = sum(len(group) - 1 for group in groups)
+            summary_var.set(f"{len(groups)} 组近似重复文件，共 {duplicates} 个副本" if groups
+                            else "没有发现近似重复的文件")
+        
+        def merge():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showwarning("警告", "请先选择一组文件", parent=dialog)
+                return
+            item = selection[0]
+            group = groups[int(tree.parent(item) or item)]
+            duplicate_ids = [file_id for file_id, _ in group[1:]]
+            if not messagebox.askyesno(
+                "合并重复文件",
+                f"将保留最早上传的文件，删除其余 {len(duplicate_ids)} 个副本及其存储文件。\n确定吗？",
+                parent=dialog
+            ):
+                return
+            merged = self.duplicate_index.merge(group[0][0], duplicate_ids)
+            self.set_status(f"已合并 {merged} 个重复文件")
+            self.refresh_file_list()
+            refresh()
+        
+        ttk.Button(
+            dialog,
+            text="合并所选组",
+            command=merge,
+            style="Modern.TButton"
+        ).pack(pady=10)
+        
+        refresh()
+    
     def set_status(self, message):
         """Set status bar message."""
         self.status_var.set(message)
         
     def refresh_file_list(self):
         """Refresh the file list in query tab."""
-        if hasattr(self.query_tab, 'load_all_files'):
-            self.query_tab.load_all_files()
+        if hasattr(self.query_tab, 'load_file_list'):
+            self.query_tab.load_file_list()
             
     def on_closing(self):
         """Handle application closing."""
+        self.query_tab.search_service.close()
+        self.query_tab.text_view.close()
+        self.sentence_index.close()
+        self.dictionary.close()
+        self.job_queue.stop()
         self.root.destroy()
     
     def get_selected_file_id(self):
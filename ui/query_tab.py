@@ -1,12 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from file_utils import FileUtils
+from services.search_service import SearchService
+from services.mapped_text import MappedTextFile, TextLines
+from services.vector_index import get_vector_index
+from services.exam_sections import section_label
+from ui.windowed_text_view import WindowedTextView
 import os
 
 class QueryTab(ttk.Frame):
+    SEARCH_DEBOUNCE_MS = 250  # 输入停顿多久后才执行查询
+    SEARCH_POLL_MS = 30
+    SIMILAR_RESULTS = 8
+    
     def __init__(self, parent, app):
         super().__init__(parent)
         self.app = app
+        self.search_service = SearchService(app.db_manager.db_path)
+        self._search_after_id = None
+        self.current_file_id = None
+        self.sections = []
         self.setup_ui()
         
     def setup_ui(self):
@@ -35,6 +48,24 @@ class QueryTab(ttk.Frame):
         self.encoding_var = tk.StringVar()
         ttk.Entry(type_frame, textvariable=self.encoding_var, width=20, state='readonly').pack(side=tk.LEFT, padx=5)
         
+        # 搜索区域（输入即搜索）
+        search_frame = ttk.Frame(select_frame)
+        search_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(search_frame, text="搜索文件名：").pack(side=tk.LEFT)
+        self.search_name_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_name_var, width=30).pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(search_frame, text="类型：").pack(side=tk.LEFT)
+        self.search_type_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_type_var, width=10).pack(side=tk.LEFT, padx=5)
+        
+        self.search_status_var = tk.StringVar()
+        ttk.Label(search_frame, textvariable=self.search_status_var).pack(side=tk.LEFT, padx=5)
+        
+        self.search_name_var.trace_add("write", lambda *args: self.schedule_search())
+        self.search_type_var.trace_add("write", lambda *args: self.schedule_search())
+        
         # File list (Treeview)
         tree_frame = ttk.Frame(self)
         tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -61,6 +92,9 @@ class QueryTab(ttk.Frame):
         self.content_text = scrolledtext.ScrolledText(content_frame, width=80, height=10)
         self.content_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # 文本文件按窗口分段显示，与 content_text 互相切换
+        self.text_view = WindowedTextView(content_frame, width=80, height=10)
+        
         # 添加元数据显示区域
         metadata_frame = ttk.LabelFrame(self, text="元数据")
         metadata_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -68,11 +102,45 @@ class QueryTab(ttk.Frame):
         self.metadata_text = scrolledtext.ScrolledText(metadata_frame, width=80, height=5)
         self.metadata_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # 智能问答区域
+        ask_frame = ttk.LabelFrame(self, text="智能问答")
+        ask_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        question_frame = ttk.Frame(ask_frame)
+        question_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(question_frame, text="问题：").pack(side=tk.LEFT)
+        self.question_var = tk.StringVar()
+        question_entry = ttk.Entry(question_frame, textvariable=self.question_var, width=60)
+        question_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        question_entry.bind("<Return>", lambda e: self.ask_question())
+        # 试卷文件可以只针对其中一部分提问或生成摘要
+        self.section_var = tk.StringVar(value="全文")
+        self.section_combo = ttk.Combobox(question_frame, textvariable=self.section_var, values=["全文"],
+                                          state="readonly", width=24)
+        self.section_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Button(question_frame, text="提问", command=self.ask_question).pack(side=tk.LEFT, padx=5)
+        ttk.Button(question_frame, text="文档摘要", command=self.show_summary).pack(side=tk.LEFT, padx=5)
+        ttk.Button(question_frame, text="相似内容", command=self.show_similar).pack(side=tk.LEFT, padx=5)
+        
+        self.answer_text = scrolledtext.ScrolledText(ask_frame, width=80, height=6, wrap=tk.WORD)
+        self.answer_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # 悬停或选中单词时显示离线词典释义
+        for widget in (self.content_text, self.text_view.text, self.answer_text):
+            self.app.dictionary_popup.attach(widget)
+        
         # Load file list
         self.load_file_list()
     
     def load_file_list(self):
         """Load files into the Treeview."""
+        # 文件已变更，缓存的搜索结果全部失效
+        self.search_service.invalidate()
+        if self.search_name_var.get().strip() or self.search_type_var.get().strip():
+            self.run_search()
+            return
+        
         # 清空现有内容
         for item in self.file_tree.get_children():
             self.file_tree.delete(item)
@@ -83,6 +151,56 @@ class QueryTab(ttk.Frame):
             file_id, name, file_type, upload_date = file
             self.file_tree.insert("", tk.END, iid=file_id, values=(name, file_type, upload_date))
     
+    def schedule_search(self):
+        """Debounce keystrokes: run the search once typing pauses."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(self.SEARCH_DEBOUNCE_MS, self.run_search)
+    
+    def run_search(self):
+        """Run the current search, from cache if possible, otherwise in the background."""
+        self._search_after_id = None
+        name_search = self.search_name_var.get()
+        type_search = self.search_type_var.get()
+        
+        # 缓存命中或可在已有结果上收窄时，直接在内存中完成
+        rows = self.search_service.lookup(name_search, type_search)
+        if rows is not None:
+            # 仍在后台执行的旧查询不能再覆盖这次的结果
+            self.search_service.cancel_pending()
+            self.show_search_results(rows)
+            return
+        
+        self.search_status_var.set("搜索中...")
+        generation, future = self.search_service.submit(name_search, type_search)
+        self.after(self.SEARCH_POLL_MS, self.poll_search, generation, future)
+    
+    def poll_search(self, generation, future):
+        """Deliver a background search result on the UI thread, dropping stale ones."""
+        if not self.search_service.is_current(generation):
+            return
+        if not future.done():
+            self.after(self.SEARCH_POLL_MS, self.poll_search, generation, future)
+            return
+        
+        try:
+            rows = future.result()
+        except Exception as e:
+            self.search_status_var.set(f"搜索出错：{str(e)}")
+            return
+        if rows is not None:
+            self.show_search_results(rows)
+    
+    def show_search_results(self, rows):
+        """Replace the Treeview contents with search results."""
+        for item in self.file_tree.get_children():
+            self.file_tree.delete(item)
+        
+        for file_id, name, file_type, file_size, upload_date, last_modified in rows:
+            self.file_tree.insert("", tk.END, iid=file_id, values=(name, file_type, upload_date))
+        
+        self.search_status_var.set(f"共找到 {len(rows)} 个文件")
+    
     def get_selected_file_id(self):
         """Get the selected file ID from the Treeview."""
         selection = self.file_tree.selection()
@@ -98,8 +216,8 @@ class QueryTab(ttk.Frame):
             messagebox.showerror("错误", "请选择一个文件")
             return
         
-        # 获取文件的完整信息
-        file_info = self.app.db_manager.get_file_for_query(file_id)
+        # 获取文件信息（内容按需读取）
+        file_info = self.app.db_manager.get_file_for_query(file_id, with_content=False)
         if file_info:
             try:
                 # 更新文件名和类型信息
@@ -107,8 +225,12 @@ class QueryTab(ttk.Frame):
                 file_type, file_size = os.path.splitext(file_info["original_name"])[1], os.path.getsize(file_info["stored_path"])
                 self.filetype_var.set(f"{file_type} ({file_size} 字节)")
                 
-                # 使用 FileUtils 预览文件内容
-                encoding = FileUtils.preview_file(file_info["stored_path"], self.content_text)
+                # 文本文件完整显示在窗口视图中，其他文件使用 FileUtils 预览
+                if file_type.lower() in FileUtils.TEXT_EXTENSIONS:
+                    encoding = self.show_text_document(file_id, file_info["stored_path"])
+                else:
+                    self.show_preview_widget(self.content_text)
+                    encoding = FileUtils.preview_file(file_info["stored_path"], self.content_text)
                 self.encoding_var.set(encoding or "未知")
                 
                 # 显示元数据
@@ -121,7 +243,184 @@ class QueryTab(ttk.Frame):
                 self.metadata_text.delete(1.0, tk.END)
                 self.metadata_text.insert(tk.END, metadata)
                 
+                self.current_file_id = file_id
+                self.load_sections(file_id)
+                
             except Exception as e:
                 messagebox.showerror("错误", f"预览文件时出错：{str(e)}")
         else:
             messagebox.showerror("错误", "未找到文件")
+    
+    def load_sections(self, file_id):
+        """Fill the section list with the exam sections of the selected file's current content."""
+        exam_sections = self.app.exam_sections
+        # 后台任务可能还没按最新内容重新解析
+        exam_sections.index_document(file_id)
+        self.sections = exam_sections.get_sections(file_id)
+        self.section_combo["values"] = ["全文"] + [section_label(section) for section in self.sections]
+        self.section_var.set("全文")
+    
+    def selected_section(self):
+        """The exam section chosen in the list, or None for the whole file."""
+        index = self.section_combo.current()
+        return self.sections[index - 1] if index > 0 else None
+    
+    def show_preview_widget(self, widget):
+        """Show either the plain preview or the windowed text view in the content area."""
+        other = self.text_view if widget is self.content_text else self.content_text
+        other.pack_forget()
+        if widget is self.content_text:
+            self.text_view.close()
+        widget.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    
+    def show_text_document(self, file_id, stored_path):
+        """Show a whole text document in the windowed view; returns the encoding label.
+        
+        Unedited files are memory-mapped from storage, so opening them costs a
+        single newline scan regardless of size; edited files are shown from
+        their current content in the database.
+        """
+        db_manager = self.app.db_manager
+        source = None
+        if not db_manager.get_segment_count(file_id) and not db_manager.list_revisions(file_id):
+            try:
+                source = MappedTextFile(stored_path)
+                encoding = source.encoding
+            except (OSError, ValueError, LookupError):
+                source = None
+        if source is None:
+            source = TextLines(db_manager.get_file_content(file_id) or "")
+            encoding = "数据库内容"
+        
+        self.show_preview_widget(self.text_view)
+        self.text_view.set_source(source)
+        return encoding
+    
+    def ask_question(self):
+        """Answer a question about the selected file using only its relevant passages."""
+        question = self.question_var.get().strip()
+        if not question:
+            messagebox.showwarning("警告", "请先输入问题")
+            return
+        if not self.current_file_id:
+            messagebox.showerror("错误", "请先双击选择一个文件")
+            return
+        if not self.app.llm_processor:
+            messagebox.showerror("错误", "LLM处理器未初始化")
+            return
+        
+        try:
+            self.answer_text.delete(1.0, tk.END)
+            self.answer_text.insert(tk.END, "回答生成中...\n")
+            self.update()
+            
+            answer = self.get_or_create_artifact(
+                "answer", question,
+                lambda info: self.app.llm_processor.answer_query(
+                    info["content"] or "",
+                    info["metadata"] or "",
+                    question,
+                    # 段落缓存按整个文件建立，只问某一部分时不能沿用
+                    file_id=self.current_file_id if self.selected_section() is None else None
+                )
+            )
+            
+            self.answer_text.delete(1.0, tk.END)
+            self.answer_text.insert(tk.END, answer)
+        except Exception as e:
+            messagebox.showerror("错误", f"回答问题时出错：{str(e)}")
+    
+    def show_summary(self):
+        """Show the selected file's summary, generating it only if none is stored."""
+        if not self.current_file_id:
+            messagebox.showerror("错误", "请先双击选择一个文件")
+            return
+        if not self.app.llm_processor:
+            messagebox.showerror("错误", "LLM处理器未初始化")
+            return
+        
+        try:
+            self.answer_text.delete(1.0, tk.END)
+            self.answer_text.insert(tk.END, "摘要生成中...\n")
+            self.update()
+            
+            summary = self.get_or_create_artifact(
+                "summary", "",
+                lambda info: self.app.llm_processor.summarize_document(
+                    info["content"] or "", info["metadata"] or ""
+                )
+            )
+            
+            self.answer_text.delete(1.0, tk.END)
+            self.answer_text.insert(tk.END, summary)
+        except Exception as e:
+            messagebox.showerror("错误", f"生成摘要时出错：{str(e)}")
+    
+    def show_similar(self):
+        """List library documents and passages similar to the question text, or to the selected file."""
+        db_manager = self.app.db_manager
+        text = self.question_var.get().strip()
+        exclude_file_id = None
+        if not text:
+            if not self.current_file_id:
+                messagebox.showwarning("警告", "请输入一段文字，或先双击选择一个文件")
+                return
+            text = db_manager.get_file_content(self.current_file_id) or ""
+            exclude_file_id = self.current_file_id
+        
+        try:
+            index = get_vector_index(db_manager.db_path)
+            documents = index.similar_documents(text, self.SIMILAR_RESULTS, exclude_file_id)
+            passages = index.similar_passages(text, self.SIMILAR_RESULTS, exclude_file_id)
+        except Exception as e:
+            messagebox.showerror("错误", f"相似内容检索出错：{str(e)}")
+            return
+        
+        names, contents = {}, {}
+        def name_of(file_id):
+            if file_id not in names:
+                info = db_manager.get_file_for_query(file_id, with_content=False)
+                names[file_id] = info["original_name"] if info else file_id
+            return names[file_id]
+        
+        lines = ["相似文档："]
+        lines += [f"  {score:.2f}  {name_of(file_id)}" for file_id, score in documents] or ["  （无）"]
+        lines.append("\n相似段落：")
+        for file_id, start, length, score in passages:
+            if file_id not in contents:
+                contents[file_id] = db_manager.get_file_content(file_id) or ""
+            snippet = " ".join(contents[file_id][start:start + length].split())
+            lines.append(f"  {score:.2f}  {name_of(file_id)}：{snippet[:200]}")
+        if not passages:
+            lines.append("  （无，新上传的文件需等待后台建立索引）")
+        
+        self.answer_text.delete(1.0, tk.END)
+        self.answer_text.insert(tk.END, "\n".join(lines))
+    
+    def get_or_create_artifact(self, kind, params, compute):
+        """Read a stored result for the current file first; compute(file_info) and store it otherwise.
+        
+        With an exam section selected, file_info["content"] is the section's
+        text and the result is stored per section.
+        """
+        db_manager = self.app.db_manager
+        model = self.app.llm_processor.current_model
+        file_info = db_manager.get_file_for_query(self.current_file_id)
+        digest = db_manager.segment_hash(file_info["content"] or "")
+        section = self.selected_section()
+        if section is not None:
+            # 列表载入后内容又被修改（编辑或后台提取）时，旧的偏移量不再对应当前文本
+            if self.app.exam_sections.index_document(self.current_file_id, file_info["content"] or ""):
+                self.load_sections(self.current_file_id)
+                raise ValueError("文件内容已变化，试卷结构已重新解析，请重新选择部分")
+            file_info["content"] = self.app.exam_sections.section_text(
+                self.current_file_id, section["ordinal"], file_info["content"] or "")
+            params = f"{params}@section:{section['ordinal']}"
+        
+        result = db_manager.get_artifact(self.current_file_id, kind, model, params, content_digest=digest)
+        if result is None:
+            result = compute(file_info)
+            if not result.startswith("Error"):
+                db_manager.save_artifact(self.current_file_id, kind, model, result, params,
+                                         content_digest=digest)
+        return result
@@ -3,6 +3,8 @@ from tkinter import ttk, filedialog, messagebox, scrolledtext
 import os
 import uuid
 from file_utils import FileUtils
+from services.background_jobs import EXTRACT_JOB
+from services.ingest import ingest_file
 
 class UploadTab(ttk.Frame):
     def __init__(self, parent, app):
@@ -104,30 +106,32 @@ class UploadTab(ttk.Frame):
             # 生成唯一文件ID
             file_id = str(uuid.uuid4())
             original_name = os.path.basename(self.selected_file_path)
-            file_type = os.path.splitext(original_name)[1]
-            file_size = os.path.getsize(self.selected_file_path)
             
-            # 读取文件内容
-            content, encoding = FileUtils.read_file_content(self.selected_file_path)
-            if not content:
-                messagebox.showerror("错误", "无法读取文件内容")
+            # 一次读取：分块复制到存储目录，同时计算哈希、检测编码并提取文本
+            ingested = ingest_file(self.selected_file_path, self.app.storage_dir, file_id)
+            
+            duplicates = self.app.db_manager.find_files_by_hash(ingested["content_hash"])
+            if duplicates and not messagebox.askyesno(
+                "重复文件",
+                f"已存在内容相同的文件：{duplicates[0][1]}（上传于 {duplicates[0][2]}）。\n仍要上传吗？"
+            ):
+                os.remove(ingested["stored_path"])
                 return
             
             # 获取元数据
             metadata = self.metadata_text.get(1.0, tk.END).strip()
             
-            # 保存到数据库
-            stored_path = os.path.join(self.app.storage_dir, file_id + file_type)
-            
-            # 复制文件到存储目录
-            import shutil
-            shutil.copy2(self.selected_file_path, stored_path)
-            
             # 插入数据库记录
             self.app.db_manager.insert_file(
-                file_id, original_name, stored_path, file_type, file_size, content, metadata
+                file_id, original_name, ingested["stored_path"], ingested["file_type"],
+                ingested["file_size"], ingested["content"], metadata,
+                content_hash=ingested["content_hash"]
             )
             
+            # 提取失败（超时等）的文件交给后台任务重试
+            if not ingested["extracted"] and hasattr(self.app, 'job_queue'):
+                self.app.job_queue.enqueue(EXTRACT_JOB, file_id)
+            
             messagebox.showinfo("成功", "文件上传成功")
             self.clear_preview()
             
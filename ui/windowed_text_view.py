@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class WindowedTextView(ttk.Frame):
+    """Read-only text view that keeps only a sliding window of lines in the widget.
+
+    The source is any object with `line_count` and `get_lines(start, count)`
+    (MappedTextFile for files on disk, TextLines for strings). The scrollbar
+    represents the whole document; scrolling near either edge of the window,
+    dragging the scrollbar or jumping to a line loads the neighbouring lines.
+    """
+
+    WINDOW_LINES = 600
+    EDGE_FRACTION = 0.15  # 可见区域距窗口边缘小于此比例时移动窗口
+
+    def __init__(self, parent, **text_options):
+        super().__init__(parent)
+        self.source = None
+        self.window_start = 0
+        self.window_lines = 0
+        self._recenter_pending = False
+
+        header = ttk.Frame(self)
+        header.pack(fill=tk.X)
+        self.position_var = tk.StringVar()
+        ttk.Label(header, textvariable=self.position_var).pack(side=tk.LEFT, padx=5)
+        self.goto_var = tk.StringVar()
+        goto_entry = ttk.Entry(header, textvariable=self.goto_var, width=10)
+        ttk.Button(header, text="跳转", command=self.goto_entered_line).pack(side=tk.RIGHT, padx=5)
+        goto_entry.pack(side=tk.RIGHT)
+        goto_entry.bind("<Return>", lambda e: self.goto_entered_line())
+        ttk.Label(header, text="行号：").pack(side=tk.RIGHT)
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(body, yscrollcommand=self.on_text_scrolled, **text_options)
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    def set_source(self, source):
+        """Show a new document (closing the previous source)."""
+        if self.source is not None:
+            self.source.close()
+        self.source = source
+        self.load_window(0)
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def load_window(self, start, top_line=None):
+        """Fill the widget with the window starting at `start` and show `top_line` at the top."""
+        total = self.source.line_count if self.source else 0
+        start = max(0, min(start, total - self.WINDOW_LINES))
+        lines = self.source.get_lines(start, self.WINDOW_LINES) if self.source else []
+
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state=tk.DISABLED)
+        self.window_start, self.window_lines = start, len(lines)
+
+        if top_line is not None:
+            self.text.yview(f"{top_line - start + 1}.0")
+        self.update_position()
+
+    def top_line(self):
+        """Document line number (0-based) at the top of the view."""
+        return self.window_start + int(self.text.index("@0,0").split(".")[0]) - 1
+
+    def goto_line(self, line):
+        """Jump to a document line (0-based)."""
+        total = self.source.line_count if self.source else 0
+        line = max(0, min(line, total - 1))
+        self.load_window(line - self.WINDOW_LINES // 2, top_line=line)
+
+    def goto_entered_line(self):
+        try:
+            self.goto_line(int(self.goto_var.get()) - 1)
+        except ValueError:
+            pass
+
+    def on_scrollbar(self, *args):
+        """Scrollbar commands address the whole document, not just the window."""
+        if not self.source:
+            return
+        if args[0] == "moveto":
+            self.goto_line(int(float(args[1]) * self.source.line_count))
+        else:
+            self.text.yview(*args)
+
+    def on_text_scrolled(self, first, last):
+        if not self.source or not self.window_lines:
+            self.scrollbar.set(0, 1)
+            return
+        first, last = float(first), float(last)
+        total = self.source.line_count
+        self.scrollbar.set((self.window_start + first * self.window_lines) / total,
+                           (self.window_start + last * self.window_lines) / total)
+
+        window_end = self.window_start + self.window_lines
+        if not self._recenter_pending and (
+                (first < self.EDGE_FRACTION and self.window_start > 0) or
+                (last > 1 - self.EDGE_FRACTION and window_end < total)):
+            # 滚动接近窗口边缘：以当前位置为中心重新载入
+            self._recenter_pending = True
+            self.after_idle(self.recenter)
+        self.update_position()
+
+    def recenter(self):
+        self._recenter_pending = False
+        top = self.top_line()
+        self.load_window(top - self.WINDOW_LINES // 2, top_line=top)
+
+    def update_position(self):
+        total = self.source.line_count if self.source else 0
+        if total:
+            self.position_var.set(f"第 {self.top_line() + 1} 行 / 共 {total} 行")
+        else:
+            self.position_var.set("")